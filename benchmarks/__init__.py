@@ -0,0 +1,38 @@
+"""
+Výkonnostní benchmarky (spouští se mimo testy, nad dočasnou testovací DB).
+
+    python -m benchmarks.suite                       # celá sada vs. benchmarks/baseline.json
+    python -m benchmarks.replace_document --rows 5000
+    python -m benchmarks.loadtest --users 20 --duration 60
+    python -m benchmarks.extraction                  # backendy extrakce textu z PDF
+"""
+import os
+
+
+def setup_django(test_db_name=None):
+    """
+    Nastaví Django a vytvoří dočasnou testovací databázi; vrací funkci pro úklid.
+    test_db_name = cesta k souboru testovací DB (u SQLite jinak sdílená paměťová
+    DB, na které se souběh zámků neprojeví).
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scb.settings")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    django.setup()
+    from scb.testing import isolate_caches
+
+    setup_test_environment()
+    restore_caches = isolate_caches()  # cache.clear() v případech nesmí mazat skutečnou cache
+    if test_db_name:
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(test_db_name)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    def teardown():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        restore_caches()
+        teardown_test_environment()
+
+    return teardown
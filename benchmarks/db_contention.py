@@ -0,0 +1,190 @@
+"""
+Souběžné zápisy a čtení nad SQLite z více procesů – srovnání profilů databáze
+(scb.database): "sqlite" (rollback journal, výchozí timeout, spojení na požadavek)
+proti "sqlite-wal" (WAL, pragmy, busy_timeout, BEGIN IMMEDIATE, trvalá spojení).
+
+Zapisující procesy napodobují upload_pdf: v jedné transakci zjistí, jestli dokument
+za rok existuje, založí Document, drží transakci --hold sekund (volání modelu)
+a uloží metriky. Čtoucí procesy pouštějí dotazy dashboardu (metriky vlastníka za
+rok). Po každé operaci se volá close_old_connections() jako na konci požadavku,
+takže se projeví i CONN_MAX_AGE profilu.
+
+    python -m benchmarks.db_contention
+    python -m benchmarks.db_contention --writers 4 --readers 8 --duration 10 --hold 0.1
+    python -m benchmarks.db_contention --profiles sqlite-wal --json out.json
+
+Pro každý profil vypíše vedle sebe zápisy a čtení: operace za sekundu, p50/p95
+latence a počet chyb "database is locked".
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.loadtest import percentile
+
+SQLITE_PROFILES = ("sqlite", "sqlite-wal")
+START_YEAR = 2019
+YEARS = 5
+METRICS_PER_WRITE = 30
+
+
+def _setup_django(profile: str, path: Path) -> None:
+    os.environ["DATABASE_PROFILE"] = profile
+    os.environ["SQLITE_PATH"] = str(path)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scb.settings")
+    import django
+
+    django.setup()
+
+
+def _prepare(profile: str, path: Path, owners: int) -> None:
+    """Schéma a seed data (běží ve vlastním procesu, aby nastavení platilo od startu)."""
+    _setup_django(profile, path)
+    from django.core.management import call_command
+
+    from ingestion.synthetic import generate
+
+    call_command("migrate", interactive=False, verbosity=0)
+    generate(owners, YEARS, START_YEAR, prefix="contention", seed=0)
+
+
+def _write(owner_id: int, year: int, hold: float) -> None:
+    from django.db import transaction
+
+    from ingestion.models import Document, FinancialMetric
+
+    with transaction.atomic():
+        Document.objects.filter(owner_id=owner_id, year=year, doc_type="income").exists()
+        doc = Document.objects.create(
+            owner_id=owner_id, year=year, doc_type="income", notes="contention",
+            file="contention.pdf", original_filename="contention.pdf",
+        )
+        time.sleep(hold)  # volání modelu uvnitř transakce upload_pdf
+        FinancialMetric.objects.bulk_create([
+            FinancialMetric(document=doc, owner_id=owner_id, year=year, code=f"{i:02d}", value=float(i))
+            for i in range(METRICS_PER_WRITE)
+        ])
+
+
+def _read(owner_id: int, year: int) -> None:
+    from ingestion.models import Document, FinancialMetric
+
+    list(FinancialMetric.objects.filter(owner_id=owner_id, year=year).values_list("code", "derived_key", "value"))
+    Document.objects.filter(owner_id=owner_id).count()
+
+
+def _worker(role, profile, path, seed, duration, hold, barrier, queue) -> None:
+    _setup_django(profile, path)
+    from django.contrib.auth import get_user_model
+    from django.db import OperationalError, close_old_connections, connection
+
+    owners = list(get_user_model().objects.values_list("pk", flat=True))
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        journal_mode = cursor.fetchone()[0]
+    close_old_connections()
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors: Counter = Counter()
+
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        owner_id, year = rng.choice(owners), rng.randrange(START_YEAR, START_YEAR + YEARS)
+        started = time.perf_counter()
+        try:
+            if role == "write":
+                _write(owner_id, year, hold)
+            else:
+                _read(owner_id, year)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError as e:
+            errors["locked" if "locked" in str(e) else "other"] += 1
+        finally:
+            close_old_connections()  # konec "požadavku"
+    queue.put({"role": role, "latencies": latencies, "errors": dict(errors), "journal_mode": journal_mode})
+
+
+def _summary(reports: List[dict], duration: float) -> dict:
+    latencies = sorted(x for r in reports for x in r["latencies"])
+    errors = Counter()
+    for r in reports:
+        errors.update(r["errors"])
+    return {
+        "ops": len(latencies),
+        "per_s": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "locked": errors["locked"],
+        "errors": errors["other"],
+    }
+
+
+def run_profile(profile: str, args) -> Dict[str, dict]:
+    ctx = multiprocessing.get_context("spawn")  # každý proces vlastní django.setup() s profilem
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "contention.sqlite3"
+        setup = ctx.Process(target=_prepare, args=(profile, path, args.owners))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            raise RuntimeError(f"Příprava DB pro profil {profile} selhala.")
+
+        roles = ["write"] * args.writers + ["read"] * args.readers
+        barrier, queue = ctx.Barrier(len(roles)), ctx.Queue()
+        workers = [
+            ctx.Process(target=_worker, args=(role, profile, path, args.seed + i, args.duration, args.hold, barrier, queue))
+            for i, role in enumerate(roles)
+        ]
+        for w in workers:
+            w.start()
+        reports = [queue.get() for _ in workers]
+        for w in workers:
+            w.join()
+
+    return {
+        "journal_mode": reports[0]["journal_mode"],
+        "write": _summary([r for r in reports if r["role"] == "write"], args.duration),
+        "read": _summary([r for r in reports if r["role"] == "read"], args.duration),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=SQLITE_PROFILES)
+    parser.add_argument("--writers", type=int, default=4, help="Počet zapisujících procesů.")
+    parser.add_argument("--readers", type=int, default=8, help="Počet čtoucích procesů.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Délka měření v sekundách.")
+    parser.add_argument("--hold", type=float, default=0.1, help="Jak dlouho zápis drží transakci (s).")
+    parser.add_argument("--owners", type=int, default=20, help="Počet vlastníků v seed datech.")
+    parser.add_argument("--json", type=Path, help="Výsledky uložit i do tohoto JSON souboru.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = {profile: run_profile(profile, args) for profile in args.profiles}
+
+    print(f"{args.writers} zapisujících + {args.readers} čtoucích procesů, {args.duration:g} s, hold {args.hold:g} s")
+    header = f"{'ops/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'locked':>8}{'chyby':>7}"
+    print(f"{'profil':<12}{'journal':<9}│{'zápisy':^41}│{'čtení':^41}")
+    print(f"{'':<21}│{header:>41}│{header:>41}")
+    for profile, r in results.items():
+        cells = [
+            f"{s['per_s']:>8.1f}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['locked']:>8}{s['errors']:>7}".rjust(41)
+            for s in (r["write"], r["read"])
+        ]
+        print(f"{profile:<12}{r['journal_mode']:<9}│{cells[0]}│{cells[1]}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
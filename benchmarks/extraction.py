@@ -0,0 +1,105 @@
+"""
+Porovnání backendů extrakce textu z PDF (ingestion.extraction) na ukázkových výkazech:
+medián času na dokument a kolik řádků výkazu (kód řádku + částky) text obsahuje
+oproti ručně ověřeným řádkům v benchmarks/extraction_truth.json.
+
+    python -m benchmarks.extraction
+    python -m benchmarks.extraction --backends pdfplumber pypdfium2 --repeat 10 --json out.json
+
+Řádek se počítá jako nalezený, když některý řádek textu (bez mezer) končí kódem
+a částkami v pořadí z výkazu – tzn. LLM i lokální parser ho dostanou vcelku.
+Nenainstalované backendy (camelot-py) se vypíšou jako přeskočené.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.suite import sample_pdfs
+
+TRUTH_PATH = Path(__file__).resolve().parent / "extraction_truth.json"
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s+", "", text)
+
+
+def recovered_rows(text: str, expected: List[List[str]]) -> int:
+    """Počet očekávaných řádků [kód, částky], které v textu najdeme (každý řádek textu jen jednou)."""
+    lines = [_compact(line) for line in text.splitlines()]
+    found = 0
+    for code, amounts in expected:
+        key = _compact(code + amounts)
+        for i, line in enumerate(lines):
+            if line and line.endswith(key):
+                lines[i] = ""
+                found += 1
+                break
+    return found
+
+
+def run(backends: List[str], repeat: int) -> Dict[str, dict]:
+    from ingestion.extraction import BACKENDS
+
+    truth = json.loads(TRUTH_PATH.read_text(encoding="utf-8"))
+    pdfs = [p for p in sample_pdfs() if hashlib.sha256(p.read_bytes()).hexdigest() in truth]
+    results = {}
+    for name in backends:
+        backend = BACKENDS[name]
+        if not backend.available():
+            results[name] = {"skipped": "backend není nainstalovaný"}
+            continue
+        times, found, expected = [], 0, 0
+        for pdf in pdfs:
+            rows = truth[hashlib.sha256(pdf.read_bytes()).hexdigest()]["rows"]
+            backend.extract_pages(str(pdf))  # zahřátí
+            per_doc = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = backend.extract_pages(str(pdf))
+                per_doc.append(time.perf_counter() - start)
+            times.append(statistics.median(per_doc))
+            found += recovered_rows("\n".join(pages), rows)
+            expected += len(rows)
+        results[name] = {
+            "time_ms": round(statistics.median(times) * 1000, 2),
+            "rows_found": found,
+            "rows_expected": expected,
+            "recall": round(found / expected, 4) if expected else None,
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scb.settings")
+    import django
+
+    django.setup()
+    from ingestion.extraction import BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=5, help="Počet měřených běhů na dokument (medián).")
+    parser.add_argument("--json", type=Path, help="Výsledky uložit i do tohoto JSON souboru.")
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.repeat)
+    print(f"{'backend':<18}{'čas/dok. [ms]':>14}  {'řádky':>9}  {'úspěšnost':>9}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<18}{'přeskočeno – ' + r['skipped']:>36}")
+            continue
+        print(f"{name:<18}{r['time_ms']:>14.2f}  {r['rows_found']:>4}/{r['rows_expected']:<4}  {r['recall']:>9.1%}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
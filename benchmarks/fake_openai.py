@@ -0,0 +1,373 @@
+"""
+Falešné OpenAI API (POST /v1/chat/completions) pro offline testy, benchmarky
+a zátěžové testy – přes HTTP server nebo přímo v procesu (httpx transport pro
+klienta OpenAI, bez socketů).
+
+Odpověď na požadavek se hledá v tomto pořadí:
+  1. nahrávka (cassette, JSON soubor) podle hashe model + messages,
+  2. s --record skutečné OpenAI (OPENAI_API_KEY) – odpověď se do nahrávky uloží,
+  3. se --strict chyba 500, jinak syntéza: výkazy (prompt s BALANCE SHEET /
+     INCOME STATEMENT) dostanou JSON řádků z ingestion.synthetic, deterministicky
+     podle promptu (stejné PDF = stejná čísla); ostatní prompty (suropen) krátký text.
+Streamované požadavky (stream=True) dostanou odpověď jako SSE po částech.
+
+Vstřikování chyb: latence ± jitter, zpoždění mezi částmi streamu, náhodné 500
+(--error-rate), limit požadavků za minutu (429 s retry-after) a fail_next()
+pro deterministické scénáře v testech.
+
+    python -m benchmarks.fake_openai --port 8765 --latency 2 --jitter 0.5 --rate-limit 60
+    python -m benchmarks.fake_openai --cassette openai.json --record   # nahrát
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python manage.py runserver
+
+    with patch_clients(latency=0.1) as fake:     # v procesu: ingestion + suropen
+        _process_document(...)
+    fake.statuses                                # Counter({200: 1})
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from unittest import mock
+
+UPSTREAM_URL = "https://api.openai.com/v1"
+STREAM_CHUNK_CHARS = 40
+
+
+def statement_rows(doc_type: str, seed: Union[int, str] = 0) -> List[dict]:
+    """Syntetické řádky výkazu ve tvaru odpovědi modelu (deterministické pro daný seed)."""
+    from ingestion.synthetic import statement_rows as rows, statement_values
+
+    rng = random.Random(seed)
+    revenue = rng.lognormvariate(16.5, 1.0)
+    out = rows(doc_type, statement_values(doc_type, revenue, rng))
+    # srovnávací sloupec (minulé období) – stejné kódy, jiné hodnoty
+    prior = statement_values(doc_type, revenue * rng.uniform(0.7, 1.0), rng)
+    for row in out:
+        row["prior_value"] = prior.get(row["code"])
+    return out
+
+
+def request_key(request: dict) -> str:
+    """Klíč nahrávky: model + messages (+ response_format), nezávislý na stream/temperature."""
+    data = {k: request.get(k) for k in ("model", "messages", "response_format")}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class FakeResponse:
+    status: int
+    headers: Dict[str, str]
+    body: Iterable[bytes]
+    stream: bool = False
+
+
+@dataclass
+class FakeOpenAI:
+    latency: float = 0.0
+    jitter: float = 0.0
+    chunk_delay: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: Optional[int] = None  # požadavků za minutu
+    cassette: Optional[Path] = None
+    record: bool = False
+    strict: bool = False
+    upstream_url: str = UPSTREAM_URL
+    seed: int = 0
+    calls: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    sources: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.seed)
+        self._window = deque()
+        self._scripted: List[int] = []
+        self._recordings: Dict[str, dict] = {}
+        if self.cassette:
+            self.cassette = Path(self.cassette)
+            if self.cassette.exists():
+                self._recordings = json.loads(self.cassette.read_text(encoding="utf-8"))["interactions"]
+
+    # --- vstřikování chyb ---
+
+    def fail_next(self, status: int = 500, count: int = 1) -> None:
+        """Příštích `count` požadavků skončí daným stavem (429 = rate limit)."""
+        with self._lock:
+            self._scripted.extend([status] * count)
+
+    def _fault(self) -> Optional[int]:
+        with self._lock:
+            self.calls += 1
+            if self._scripted:
+                return self._scripted.pop(0)
+            now = time.monotonic()
+            if self.rate_limit:
+                while self._window and now - self._window[0] >= 60:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    return 429
+                self._window.append(now)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return 500
+        return None
+
+    def _retry_after(self) -> float:
+        with self._lock:
+            if self.rate_limit and self._window:
+                return max(0.0, 60 - (time.monotonic() - self._window[0]))
+        return 0.05
+
+    # --- obsah odpovědi ---
+
+    def _synthesize(self, request: dict) -> str:
+        prompt = (request.get("messages") or [{}])[-1].get("content") or ""
+        for marker, doc_type in (("BALANCE SHEET", "balance"), ("INCOME STATEMENT", "income")):
+            if marker in prompt:
+                return json.dumps({"rows": statement_rows(doc_type, request_key(request))}, ensure_ascii=False)
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            return json.dumps({"rows": []})
+        return "Shrnutí: odpovědi jsou konzistentní, hlavní téma je řízení času a priorit. Doporučení: ..."
+
+    def _upstream(self, request: dict) -> str:
+        import httpx
+
+        payload = {**request, "stream": False}
+        payload.pop("stream_options", None)
+        response = httpx.post(
+            f"{self.upstream_url.rstrip('/')}/chat/completions", json=payload, timeout=300,
+            headers={"Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY', '')}"},
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    def content_for(self, request: dict) -> Optional[str]:
+        key = request_key(request)
+        recorded = self._recordings.get(key)
+        if recorded is not None:
+            with self._lock:
+                self.sources["replay"] += 1
+            return recorded["content"]
+        if self.record:
+            content = self._upstream(request)
+            with self._lock:
+                self._recordings[key] = {
+                    "model": request.get("model"),
+                    "prompt": ((request.get("messages") or [{}])[-1].get("content") or "")[:200],
+                    "content": content,
+                }
+            self.save()
+            with self._lock:
+                self.sources["record"] += 1
+            return content
+        if self.strict:
+            return None
+        with self._lock:
+            self.sources["synthetic"] += 1
+        return self._synthesize(request)
+
+    def save(self) -> None:
+        if not self.cassette:
+            return
+        with self._lock:
+            data = json.dumps({"version": 1, "interactions": self._recordings}, indent=2, ensure_ascii=False)
+        self.cassette.write_text(data + "\n", encoding="utf-8")
+
+    # --- HTTP ---
+
+    def _count(self, status: int) -> None:
+        with self._lock:
+            self.statuses[status] += 1
+
+    def _error(self, status: int, message: str, kind: str, headers=None) -> FakeResponse:
+        self._count(status)
+        body = json.dumps({"error": {"message": message, "type": kind, "code": None}}).encode("utf-8")
+        return FakeResponse(status, {"Content-Type": "application/json", **(headers or {})}, [body])
+
+    def handle(self, path: str, body: bytes) -> FakeResponse:
+        if not path.rstrip("/").endswith("/chat/completions"):
+            return self._error(404, f"Unknown path {path}", "invalid_request_error")
+        request = json.loads(body or b"{}")
+
+        fault = self._fault()
+        if fault == 429:
+            wait = self._retry_after()
+            return self._error(429, "Rate limit reached (fake)", "rate_limit_exceeded", {
+                "retry-after": str(max(1, round(wait))),
+                "retry-after-ms": str(round(wait * 1000)),
+                "x-ratelimit-limit-requests": str(self.rate_limit or 0),
+                "x-ratelimit-remaining-requests": "0",
+            })
+        time.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        if fault:
+            return self._error(fault, "Injected failure (fake)", "server_error")
+
+        content = self.content_for(request)
+        if content is None:
+            return self._error(500, "No recording for this request (--strict)", "server_error")
+
+        self._count(200)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "fake")
+        if request.get("stream"):
+            return FakeResponse(200, {"Content-Type": "text/event-stream"},
+                                self._sse(completion_id, model, content), stream=True)
+        data = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(body) + len(content)) // 4},
+        }, ensure_ascii=False).encode("utf-8")
+        return FakeResponse(200, {"Content-Type": "application/json"}, [data])
+
+    def _sse(self, completion_id: str, model: str, content: str) -> Iterator[bytes]:
+        def event(delta: dict, finish=None) -> bytes:
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield event({"content": content[start:start + STREAM_CHUNK_CHARS]})
+        yield event({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+
+# --- v procesu ---
+
+def transport(fake: FakeOpenAI):
+    """httpx transport, který požadavky klienta OpenAI předá přímo FakeOpenAI."""
+    import httpx
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = fake.handle(request.url.path, request.read())
+        body = response.body if response.stream else b"".join(response.body)
+        return httpx.Response(response.status, headers=response.headers, content=body)
+
+    return httpx.MockTransport(handler)
+
+
+def make_client(fake: FakeOpenAI, max_retries: int = 2):
+    """Klient OpenAI napojený na FakeOpenAI (bez sítě)."""
+    import httpx
+    from openai import OpenAI
+
+    return OpenAI(
+        base_url="http://fake-openai.local/v1", api_key="sk-fake", max_retries=max_retries,
+        http_client=httpx.Client(transport=transport(fake)),
+    )
+
+
+@contextmanager
+def patch_clients(fake: Optional[FakeOpenAI] = None, max_retries: int = 2, **options):
+    """Po dobu bloku ingestion.views i suropen.summaries volají FakeOpenAI; vrací ho."""
+    fake = fake or FakeOpenAI(**options)
+    client = make_client(fake, max_retries)
+    with mock.patch("ingestion.views.client", client), mock.patch("suropen.summaries._client", client):
+        yield fake
+
+
+# --- HTTP server ---
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), fake: Optional[FakeOpenAI] = None, **options):
+        super().__init__(address, _Handler)
+        self.fake = fake or FakeOpenAI(**options)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def calls(self) -> int:
+        return self.fake.calls
+
+    def start(self) -> "FakeOpenAIServer":
+        """Spustí server ve vlákně na pozadí (pro použití z jiného skriptu)."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        response = self.server.fake.handle(self.path, body)
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        if response.stream:
+            # délka není předem známá – konec odpovědi = zavření spojení
+            self.send_header("Connection", "close")
+            self.close_connection = True
+            self.end_headers()
+            for chunk in response.body:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+            return
+        data = b"".join(response.body)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="Zpoždění odpovědi v sekundách.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Náhodný rozptyl zpoždění ± sekund.")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Zpoždění mezi částmi streamu (s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Podíl požadavků, které skončí 500.")
+    parser.add_argument("--rate-limit", type=int, help="Max. požadavků za minutu, nad limit 429.")
+    parser.add_argument("--cassette", type=Path, help="JSON soubor s nahranými odpověďmi.")
+    parser.add_argument("--record", action="store_true", help="Chybějící odpovědi získat z OpenAI a nahrát.")
+    parser.add_argument("--strict", action="store_true", help="Bez nahrávky chyba 500 místo syntézy.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # syntéza výkazů používá ingestion.synthetic (modely Django, bez DB)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scb.settings")
+    import django
+
+    django.setup()
+    server = FakeOpenAIServer(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter, chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate, rate_limit=args.rate_limit, cassette=args.cassette, record=args.record,
+        strict=args.strict, seed=args.seed,
+    )
+    print(f"Falešný OpenAI server na {server.base_url} (latence {args.latency} s ± {args.jitter} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Požadavky: {dict(server.fake.statuses)}, zdroje odpovědí: {dict(server.fake.sources)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Zátěžový test: N souběžných virtuálních uživatelů po dobu --duration sekund
+posílá smíšený provoz – přihlášení, čtení dashboardů, exporty (PDF report,
+CSV) a uploady výkazů. Upload volá falešný OpenAI server (benchmarks.fake_openai)
+s nastavitelnou latencí, takže drží worker stejně jako skutečné volání modelu.
+Výstupem je propustnost, percentily latence po akcích a chyby (zamčená DB,
+timeouty, 5xx).
+
+Výchozí režim běží v procesu: Django na vlákenném WSGI serveru (jako
+runserver) nad dočasnou souborovou SQLite DB s daty z ingestion.synthetic.
+
+    python -m benchmarks.loadtest --users 20 --duration 60 --openai-latency 2
+    python -m benchmarks.loadtest --mix dashboard=70 export=10 upload=10 login=10
+
+S --url míří na už běžící server (gunicorn s -w N, jiná DB…); uživatele
+loadtest_* založí v DB podle aktuálního nastavení a na konci je smaže. Server
+musí volat falešný OpenAI (OPENAI_BASE_URL z výpisu fake_openai):
+
+    python -m benchmarks.fake_openai --latency 2 &
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 gunicorn scb.wsgi -w 4 &
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --users 40
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks import setup_django
+from benchmarks.fake_openai import FakeOpenAIServer
+
+PREFIX = "loadtest"
+PASSWORD = "loadtest-heslo"
+DEFAULT_MIX = {"dashboard": 60, "export": 15, "upload": 5, "login": 20}
+LOCK_MARKERS = (b"database is locked", b"database table is locked", b"could not obtain lock", b"deadlock detected")
+
+_CSRF_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@dataclass
+class Sample:
+    action: str
+    started: float
+    elapsed: float
+    status: int
+    error: Optional[str] = None
+
+
+@dataclass
+class Results:
+    samples: List[Sample] = field(default_factory=list)
+    server_errors: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, sample: Sample) -> None:
+        with self._lock:
+            self.samples.append(sample)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil metodou nejbližšího pořadí (values musí být seřazené)."""
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), round(pct / 100 * len(values) + 0.5)))
+    return values[rank - 1]
+
+
+def _multipart(fields: Dict[str, str], files: Dict[str, Path]):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, path in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{path.name}"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n".encode() + path.read_bytes() + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+@lru_cache(maxsize=None)
+def _overwrite_field(pdf: Path) -> str:
+    """Potvrzení přepsání výsledovky za rok, který upload rozpozná z `pdf`."""
+    from ingestion.classify import classify_pdf
+    from ingestion.views import overwrite_field
+
+    return overwrite_field("income", classify_pdf(pdf.read_bytes()).year)
+
+
+class VirtualUser:
+    """Jeden přihlášený prohlížeč (vlastní cookies) posílající náhodné akce podle mixu."""
+
+    def __init__(self, base_url: str, username: str, urls: Dict[str, str], pdf: Path,
+                 results: Results, timeout: float, rng: random.Random):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.urls = urls
+        self.pdf = pdf
+        self.results = results
+        self.timeout = timeout
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def _request(self, path: str, data: Optional[bytes] = None, content_type: Optional[str] = None):
+        request = urllib.request.Request(self.base_url + path, data=data)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        if data is not None:
+            request.add_header("Referer", self.base_url + path)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def _timed(self, action: str, path: str, data: Optional[bytes] = None, content_type: Optional[str] = None):
+        started = time.perf_counter()
+        error = None
+        try:
+            status, body = self._request(path, data, content_type)
+        except (socket.timeout, TimeoutError):
+            status, body, error = 0, b"", "timeout"
+        except (urllib.error.URLError, ConnectionError) as exc:
+            status, body, error = 0, b"", f"spojení: {getattr(exc, 'reason', exc)}"
+        if error is None and status >= 500:
+            error = "zamčená DB" if any(m in body for m in LOCK_MARKERS) else f"HTTP {status}"
+        self.results.add(Sample(action, started, time.perf_counter() - started, status, error))
+        return status, body
+
+    def _csrf(self, path: str) -> str:
+        status, body = self._request(path)
+        match = _CSRF_RE.search(body)
+        return match.group(1).decode() if match else ""
+
+    def login(self) -> None:
+        token = self._csrf(self.urls["login"])
+        data = urllib.parse.urlencode({
+            "username": self.username, "password": PASSWORD, "csrfmiddlewaretoken": token,
+        }).encode()
+        self._timed("login", self.urls["login"], data, "application/x-www-form-urlencoded")
+
+    def dashboard(self) -> None:
+        name = self.rng.choice(["dashboard", "metrics", "profitability", "report"])
+        self._timed(f"dashboard.{name}", self.urls[name])
+
+    def export(self) -> None:
+        name = self.rng.choice(["export_pdf", "export_csv"])
+        self._timed(f"export.{name}", self.urls[name])
+
+    def upload(self) -> None:
+        token = self._csrf(self.urls["upload"])
+        # rok se čte z výkazu (ingestion.classify) – jiný rok ve formuláři by upload odmítl
+        body, content_type = _multipart(
+            {"notes": "loadtest", "csrfmiddlewaretoken": token, _overwrite_field(self.pdf): "yes"},
+            {"income_files": self.pdf},
+        )
+        self._timed("upload", self.urls["upload"], body, content_type)
+
+    def run(self, mix: Dict[str, int], deadline: float) -> None:
+        self.login()
+        actions, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+
+
+def _seed(users: int, years: int, start_year: int) -> List[str]:
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    from ingestion.synthetic import generate
+
+    generate(users, years, start_year, prefix=PREFIX, seed=1)
+    accounts = get_user_model().objects.filter(username__startswith=f"{PREFIX}_")
+    accounts.update(password=make_password(PASSWORD))
+    return list(accounts.order_by("username").values_list("username", flat=True))
+
+
+def _urls() -> Dict[str, str]:
+    from django.urls import reverse
+
+    return {
+        "login": reverse("login"),
+        "dashboard": reverse("dashboard:index"),
+        "metrics": reverse("dashboard:metrics"),
+        "profitability": reverse("dashboard:profitability"),
+        "report": reverse("dashboard:report"),
+        "export_pdf": reverse("dashboard:export_pdf"),
+        "export_csv": reverse("hodnoty:export_csv"),
+        "upload": reverse("ingestion:upload_pdf"),
+    }
+
+
+def _start_wsgi_server(results: Results):
+    """Django na vlákenném WSGI serveru (stejný jako runserver) ve vlákně na pozadí."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.signals import got_request_exception
+
+    def on_exception(sender, request=None, **kwargs):
+        exc = sys.exc_info()[1]
+        if exc is not None:
+            results.server_errors[f"{type(exc).__name__}: {str(exc)[:80]}"] += 1
+
+    got_request_exception.connect(on_exception, weak=False)
+    logging.getLogger("django.server").setLevel(logging.CRITICAL)
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    server = ThreadedWSGIServer(("127.0.0.1", 0), WSGIRequestHandler, allow_reuse_address=True)
+    server.daemon_threads = True
+    server.set_app(WSGIHandler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def summarize(results: Results, duration: float) -> dict:
+    by_action = defaultdict(list)
+    for sample in results.samples:
+        by_action[sample.action].append(sample)
+
+    def stats(samples: List[Sample]) -> dict:
+        times = sorted(s.elapsed * 1000 for s in samples)
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for s in samples if s.error),
+            "rps": round(len(samples) / duration, 2),
+            **{f"p{p}_ms": round(percentile(times, p), 1) for p in (50, 90, 95, 99)},
+            "max_ms": round(times[-1], 1) if times else 0.0,
+        }
+
+    return {
+        "duration_s": round(duration, 1),
+        "total": stats(results.samples),
+        "actions": {name: stats(samples) for name, samples in sorted(by_action.items())},
+        "errors": dict(Counter(s.error for s in results.samples if s.error).most_common()),
+        "server_exceptions": dict(results.server_errors.most_common()),
+    }
+
+
+def print_report(report: dict) -> None:
+    header = f"{'akce':<26}{'požad.':>8}{'chyby':>7}{'req/s':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in [*report["actions"].items(), ("CELKEM", report["total"])]:
+        print(f"{name:<26}{row['requests']:>8}{row['errors']:>7}{row['rps']:>8}"
+              f"{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+    print(f"(latence v ms, doba běhu {report['duration_s']} s)")
+    for title, key in (("Chyby", "errors"), ("Výjimky na serveru", "server_exceptions")):
+        if report[key]:
+            print(f"\n{title}:")
+            for message, count in report[key].items():
+                print(f"  {count:>6}× {message}")
+
+
+def _parse_mix(items: List[str]) -> Dict[str, int]:
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"Neplatná položka mixu {item!r} (akce: {', '.join(DEFAULT_MIX)}).")
+        mix[name] = int(weight)
+    return {k: v for k, v in mix.items() if v}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Počet souběžných virtuálních uživatelů.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Délka měření v sekundách.")
+    parser.add_argument("--mix", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_MIX.items()],
+                        help="Váhy akcí, např. dashboard=60 export=15 upload=5 login=20.")
+    parser.add_argument("--years", type=int, default=5, help="Let výkazů na uživatele v seed datech.")
+    parser.add_argument("--openai-latency", type=float, default=1.0, help="Latence falešného OpenAI (s).")
+    parser.add_argument("--openai-jitter", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout jednoho požadavku (s).")
+    parser.add_argument("--url", help="Cíl – už běžící server místo serveru v procesu.")
+    parser.add_argument("--json", type=Path, help="Výsledky uložit i jako JSON.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    mix = _parse_mix(args.mix)
+
+    start_year = 2024 - args.years
+    results = Results()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_openai = None
+        if args.url:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scb.settings")
+            import django
+
+            django.setup()
+            teardown = None
+            base_url = args.url
+        else:
+            fake_openai = FakeOpenAIServer(latency=args.openai_latency, jitter=args.openai_jitter).start()
+            os.environ["OPENAI_BASE_URL"] = fake_openai.base_url
+            teardown = setup_django(test_db_name=Path(tmp) / "loadtest.sqlite3")
+
+        try:
+            from django.test.utils import override_settings
+
+            from benchmarks.suite import sample_pdfs
+            from ingestion.synthetic import clear
+
+            with override_settings(MEDIA_ROOT=tmp):
+                if fake_openai:
+                    from openai import OpenAI
+
+                    import ingestion.views
+
+                    ingestion.views.client = OpenAI(base_url=fake_openai.base_url, api_key="sk-loadtest")
+                usernames = _seed(args.users, args.years, start_year)
+                pdf = next((p for p in sample_pdfs() if p.name.startswith("Vykaz")), sample_pdfs()[0])
+                urls = _urls()
+                server = None
+                if not args.url:
+                    server, base_url = _start_wsgi_server(results)
+
+                print(f"{args.users} uživatelů, {args.duration:.0f} s, mix {mix}, cíl {base_url}")
+                deadline = time.perf_counter() + args.duration
+                started = time.perf_counter()
+                rng = random.Random(args.seed)
+                threads = [
+                    threading.Thread(
+                        target=VirtualUser(base_url, name, urls, pdf, results, args.timeout,
+                                           random.Random(rng.random())).run,
+                        args=(mix, deadline),
+                    )
+                    for name in usernames
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+                if server:
+                    server.shutdown()
+                if args.url:
+                    clear(PREFIX)
+        finally:
+            if teardown:
+                teardown()
+            if fake_openai:
+                fake_openai.shutdown()
+
+    report = summarize(results, elapsed)
+    report["meta"] = {"users": args.users, "mix": mix, "openai_latency": args.openai_latency, "target": base_url}
+    print_report(report)
+    if fake_openai:
+        print(f"\nVolání falešného OpenAI: {fake_openai.calls}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
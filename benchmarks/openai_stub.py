@@ -0,0 +1,19 @@
+"""
+Offline náhrada OpenAI pro benchmarky – skutečný klient OpenAI nad
+in-process transportem benchmarks.fake_openai (bez sítě).
+
+    from benchmarks.openai_stub import patch_openai
+    with patch_openai() as fake:
+        _process_document(...)
+    fake.calls
+"""
+from contextlib import contextmanager
+
+from benchmarks.fake_openai import patch_clients
+
+
+@contextmanager
+def patch_openai(latency: float = 0.0):
+    """Po dobu bloku volá pipeline FakeOpenAI; vrací ho (počet volání v .calls)."""
+    with patch_clients(latency=latency) as fake:
+        yield fake
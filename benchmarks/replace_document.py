@@ -0,0 +1,56 @@
+"""
+Benchmark mazání dokumentu při přepisu (Document.delete): čas a počet dotazů
+pro dokumenty s rostoucím počtem řádků a metrik. Počet dotazů musí být konstantní.
+
+    python -m benchmarks.replace_document --rows 100 1000 5000
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+
+def _seed(user, rows: int):
+    from ingestion.models import Document, ExtractedRow, ExtractedTable, FinancialMetric
+
+    doc = Document.objects.create(
+        file="documents/bench.pdf", original_filename="bench.pdf", owner=user, year=2023, doc_type="income"
+    )
+    table = ExtractedTable.objects.create(document=doc)
+    ExtractedRow.objects.bulk_create(
+        [ExtractedRow(table=table, code=f"{i:03d}", label=f"Řádek {i}", value=float(i), raw_data={}) for i in range(rows)],
+        batch_size=500,
+    )
+    FinancialMetric.objects.bulk_create(
+        [FinancialMetric(document=doc, owner=user, code=f"{i:03d}", value=float(i), year=2023) for i in range(rows)],
+        batch_size=500,
+    )
+    return doc
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args(argv)
+
+    teardown = setup_django()
+    try:
+        from django.contrib.auth.models import User
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+
+        user = User.objects.create_user("bench")
+        for rows in args.rows:
+            doc = _seed(user, rows)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                with transaction.atomic():
+                    doc.delete()
+                elapsed = time.perf_counter() - start
+            print(f"{rows:>7} řádků + {rows} metrik: {elapsed * 1000:8.1f} ms, {len(ctx.captured_queries)} dotazů")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
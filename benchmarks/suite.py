@@ -0,0 +1,250 @@
+"""
+Benchmark horkých cest: extrakce textu z PDF, zpracování dokumentu (se stubem
+OpenAI), přepis na metriky + derived, build_profitability_context, dashboardy
+přes testovacího klienta a export PDF. Pro každý případ měří medián času,
+počet SQL dotazů a špičku paměti (tracemalloc) a porovná je s baseline.
+
+    python -m benchmarks.suite                      # porovnání s benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline    # uložení nové baseline
+    python -m benchmarks.suite --only dashboard     # jen případy s prefixem
+
+Regrese = víc dotazů než v baseline, nebo čas / paměť horší o víc než
+--tolerance (výchozí 50 %; časy jsou závislé na stroji, baseline generujte na
+stejném stroji, na kterém se porovnává). Při regresi skončí s kódem 1.
+Data: jeden měřený uživatel + --users dalších, každý s --years lety výkazů
+(ingestion.synthetic, pevný seed).
+"""
+import argparse
+import hashlib
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import setup_django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+SAMPLE_PDF_DIR = BASE_DIR / "media" / "documents"
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], object]
+    # volá se před každým měřeným během (neměří se), např. úklid cache
+    setup: Optional[Callable[[], None]] = None
+    repeat: Optional[int] = None
+
+
+def sample_pdfs() -> List[Path]:
+    """Ukázkové PDF z media/documents (bez duplicit podle obsahu)."""
+    seen, out = set(), []
+    for path in sorted(SAMPLE_PDF_DIR.rglob("*.pdf")):
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if digest not in seen:
+            seen.add(digest)
+            out.append(path)
+    return out
+
+
+def measure(case: Case, repeat: int) -> Dict[str, float]:
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    def once():
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        return time.perf_counter() - start
+
+    once()  # zahřátí (importy, kompilace šablon)
+    times = [once() for _ in range(case.repeat or repeat)]
+
+    if case.setup:
+        case.setup()
+    # request_started (testovací klient) volá reset_queries – log musí začínat prázdný
+    reset_queries()
+    with CaptureQueriesContext(connection) as ctx:
+        case.run()
+
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    case.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "time_ms": round(statistics.median(times) * 1000, 2),
+        "queries": len(ctx.captured_queries),
+        "peak_kib": round(peak / 1024),
+    }
+
+
+def build_cases(users: int, years: int) -> List[Case]:
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import transaction
+    from django.test import Client, RequestFactory, override_settings
+    from django.urls import reverse
+
+    from benchmarks.openai_stub import patch_openai
+    from dashboard.views import build_profitability_context
+    from ingestion.models import Document, ExtractedText
+    from ingestion.synthetic import generate
+    from ingestion.views import _process_document, calculate_and_store_derived, extract_text_from_pdf, rewrite_to_metrics
+
+    generate(1, years, 2015, prefix="bench", seed=1)
+    if users:
+        generate(users, years, 2015, prefix="other", seed=2)
+    user = get_user_model().objects.get(username="bench_0001")
+
+    client = Client()
+    client.force_login(user)
+    request = RequestFactory().get("/dashboard/profitability/")
+    request.user = user
+
+    income_doc = Document.objects.filter(owner=user, doc_type="income").latest("year")
+    pdfs = sample_pdfs()
+
+    def get(url_name):
+        def run():
+            response = client.get(reverse(url_name))
+            assert response.status_code == 200, (url_name, response.status_code)
+            return b"".join(response) if response.streaming else response.content
+        return run
+
+    def process_sample(stream=False):
+        # celý upload pipeline nad ukázkovým PDF, OpenAI nahrazené stubem; rollback = stejný stav pro další běh
+        pdf = pdfs[0]
+        with patch_openai(), override_settings(OPENAI_STREAM_ROWS=stream), transaction.atomic():
+            _process_document(
+                SimpleUploadedFile(pdf.name, pdf.read_bytes(), content_type="application/pdf"),
+                user, 2099, "income",
+            )
+            transaction.set_rollback(True)
+
+    def rewrite_and_derive():
+        with transaction.atomic():
+            rewrite_to_metrics(income_doc)
+            calculate_and_store_derived(income_doc)
+
+    def clear_text_cache():
+        ExtractedText.objects.all().delete()
+
+    cases = [
+        Case(f"pdf.extract_text[{p.stem[:40]}]", lambda p=p: extract_text_from_pdf(str(p)), setup=clear_text_cache)
+        for p in pdfs
+    ]
+    # opakované zpracování stejného souboru – text z ExtractedText místo parsování PDF
+    cases += [
+        Case(f"pdf.extract_text[cached][{p.stem[:32]}]", lambda p=p: extract_text_from_pdf(str(p)))
+        for p in pdfs
+    ]
+    cases += [
+        Case("ingestion.process_document", process_sample),
+        Case("ingestion.process_document[stream]", lambda: process_sample(stream=True)),
+        Case("ingestion.rewrite_and_derive", rewrite_and_derive),
+        Case("dashboard.build_profitability_context", lambda: build_profitability_context(request),
+             setup=cache.clear),
+        Case("dashboard.index", get("dashboard:index"), setup=cache.clear),
+        Case("dashboard.metrics", get("dashboard:metrics"), setup=cache.clear),
+        Case("dashboard.profitability", get("dashboard:profitability"), setup=cache.clear),
+        Case("dashboard.report", get("dashboard:report"), setup=cache.clear),
+        # opakované zobrazení – tabulky a data grafů z fragment cache
+        Case("dashboard.profitability[cached]", get("dashboard:profitability")),
+        Case("dashboard.report[cached]", get("dashboard:report")),
+        Case("dashboard.export_pdf", get("dashboard:export_pdf"), setup=cache.clear),
+    ]
+    return cases
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Vrátí seznam regresí (prázdný = v pořádku)."""
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["queries"] > base["queries"]:
+            problems.append(f"{name}: dotazy {base['queries']} → {current['queries']}")
+        for metric in ("time_ms", "peak_kib"):
+            if base[metric] and current[metric] > base[metric] * (1 + tolerance):
+                problems.append(f"{name}: {metric} {base[metric]} → {current[metric]}")
+    return problems
+
+
+def _format_row(name, current, base):
+    def cell(metric):
+        value = current[metric]
+        if not base or not base.get(metric):
+            return f"{value:>10}"
+        return f"{value:>10} ({(value / base[metric] - 1) * 100:+5.0f} %)"
+    return f"{name:<52}{cell('time_ms')}  {cell('queries')}  {cell('peak_kib')}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Výsledky uložit jako novou baseline.")
+    parser.add_argument("--output", type=Path, help="Výsledky uložit i do tohoto JSON souboru.")
+    parser.add_argument("--only", nargs="+", default=[], help="Jen případy začínající některým z prefixů.")
+    parser.add_argument("--repeat", type=int, default=5, help="Počet měřených běhů (medián).")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Povolené zhoršení času/paměti (0.5 = 50 %%).")
+    parser.add_argument("--users", type=int, default=20, help="Počet dalších uživatelů v databázi.")
+    parser.add_argument("--years", type=int, default=5, help="Počet let výkazů na uživatele.")
+    args = parser.parse_args(argv)
+
+    teardown = setup_django()
+    try:
+        from django.test.utils import override_settings
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            cases = [c for c in build_cases(args.users, args.years)
+                     if not args.only or c.name.startswith(tuple(args.only))]
+            baseline = {}
+            if args.baseline.exists() and not args.update_baseline:
+                baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["cases"]
+
+            print(f"{'případ':<52}{'čas [ms]':>10}  {'dotazy':>10}  {'paměť [KiB]':>10}")
+            results = {}
+            for case in cases:
+                results[case.name] = measure(case, args.repeat)
+                print(_format_row(case.name, results[case.name], baseline.get(case.name)))
+    finally:
+        teardown()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "users": args.users,
+            "years": args.years,
+            "repeat": args.repeat,
+        },
+        "cases": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Baseline uložena do {args.baseline}.")
+        return 0
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESE {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Company
+from .search import search_companies
 
 
 @admin.register(Company)
@@ -25,3 +26,14 @@ class CompanyAdmin(admin.ModelAdmin):
         "industry",
     )
     ordering = ("-created_at",)
+
+    def get_search_results(self, request, queryset, search_term):
+        # fulltextový index místo icontains přes šest sloupců (sken celé tabulky);
+        # email a telefon se hledají přesnou shodou
+        if not search_term:
+            return queryset, False
+        term = search_term.strip()
+        matches = search_companies(queryset, term) | queryset.filter(respondent_email__iexact=term)
+        if term.replace(" ", "").lstrip("+").isdigit():
+            matches |= queryset.filter(phone=term)
+        return matches, False
@@ -0,0 +1,64 @@
+from django.db import migrations, models
+
+FIELDS = ("company_name", "respondent_name", "ico", "industry")
+COLUMNS = ", ".join(FIELDS)
+NEW_VALUES = ", ".join(f"new.{f}" for f in FIELDS)
+
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE company_search USING fts5(
+        company_id UNINDEXED, {COLUMNS}, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    # update/delete hledají řádek podle company_id (sken FTS obsahu – zápisy jsou
+    # vzácné, vyhledávání jde přes fulltextový index)
+    f"""CREATE TRIGGER company_search_ai AFTER INSERT ON company_company BEGIN
+        INSERT INTO company_search (company_id, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+    END""",
+    f"""CREATE TRIGGER company_search_au AFTER UPDATE OF {COLUMNS} ON company_company BEGIN
+        DELETE FROM company_search WHERE company_id = old.id;
+        INSERT INTO company_search (company_id, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+    END""",
+    """CREATE TRIGGER company_search_ad AFTER DELETE ON company_company BEGIN
+        DELETE FROM company_search WHERE company_id = old.id;
+    END""",
+    f"INSERT INTO company_search (company_id, {COLUMNS}) SELECT id, {COLUMNS} FROM company_company",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS company_search_ai",
+    "DROP TRIGGER IF EXISTS company_search_au",
+    "DROP TRIGGER IF EXISTS company_search_ad",
+    "DROP TABLE IF EXISTS company_search",
+]
+
+# icontains se na Postgresu překládá na UPPER(col::text) LIKE UPPER(%s)
+POSTGRES_CREATE = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f'CREATE INDEX IF NOT EXISTS company_{f}_trgm ON company_company USING gin (UPPER("{f}"::text) gin_trgm_ops)'
+    for f in FIELDS
+]
+
+POSTGRES_DROP = [f"DROP INDEX IF EXISTS company_{f}_trgm" for f in FIELDS]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="company",
+            index=models.Index(fields=["company_name", "id"], name="company_name_id_idx"),
+        ),
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_CREATE, "postgresql": POSTGRES_CREATE}),
+            _run({"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}),
+        ),
+    ]
@@ -31,5 +31,9 @@ class Company(models.Model):
 
     created_at = models.DateTimeField("Datum zpracování", default=timezone.now)
 
+    class Meta:
+        # adresář se stránkuje podle (název, id) – viz company.views.company_list
+        indexes = [models.Index(fields=["company_name", "id"], name="company_name_id_idx")]
+
     def __str__(self):
         return f"{self.company_name} ({self.respondent_name})"
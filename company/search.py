@@ -0,0 +1,47 @@
+"""
+Fulltextové vyhledávání v adresáři firem.
+
+SQLite: virtuální tabulka FTS5 `company_search` (název, respondent, IČO, odvětví),
+kterou drží v synchronu triggery nad company_company – funguje i pro
+bulk_create/update(), nejen pro save(). Postgres: pg_trgm GIN indexy, takže
+icontains nad stejnými poli nemusí procházet celou tabulku.
+Tabulku, triggery i indexy zakládá migrace 0002_company_search
+(SEARCH_FIELDS a FTS_TABLE se musí shodovat s ní).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = ("company_name", "respondent_name", "ico", "industry")
+
+FTS_TABLE = "company_search"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> str:
+    """
+    Převede uživatelský vstup na bezpečný FTS5 dotaz: každé slovo jako prefix,
+    všechna musí platit ("nov prah" → "nov"* "prah"*). Operátory a uvozovky
+    z inputu se nepropouštějí.
+    """
+    return " ".join(f'"{token}"*' for token in _TOKEN_RE.findall(text or ""))
+
+
+def search_companies(queryset, text: str):
+    """Zúží queryset firem na ty, které odpovídají hledanému textu."""
+    if connection.vendor == "sqlite":
+        match = fts_query(text)
+        if not match:
+            return queryset
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT company_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+
+    condition = Q()
+    for token in _TOKEN_RE.findall(text or ""):
+        condition &= Q(*(Q(**{f"{field}__icontains": token}) for field in SEARCH_FIELDS), _connector=Q.OR)
+    return queryset.filter(condition)
+
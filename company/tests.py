@@ -1,3 +1,81 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from . import views
+from .models import Company
+from .search import fts_query, search_companies
+
+
+def make_company(name, **extra):
+    defaults = {
+        "respondent_name": "Jan Novák",
+        "respondent_email": "jan@example.com",
+        "company_size": "small",
+        "coach": "coach1",
+    }
+    defaults.update(extra)
+    return Company.objects.create(company_name=name, **defaults)
+
+
+class CompanySearchTests(TestCase):
+    def _names(self, text):
+        return sorted(c.company_name for c in search_companies(Company.objects.all(), text))
+
+    def test_index_follows_create_update_delete(self):
+        pekarna = make_company("Pekárna Dvořák", ico="12345678", industry="Potravinářství")
+        make_company("Strojírna Brno", respondent_name="Eva Malá", industry="Strojírenství")
+
+        self.assertEqual(self._names("pekarna"), ["Pekárna Dvořák"])  # bez diakritiky
+        self.assertEqual(self._names("1234"), ["Pekárna Dvořák"])  # prefix IČO
+        self.assertEqual(self._names("eva stroj"), ["Strojírna Brno"])
+
+        pekarna.company_name = "Cukrárna Dvořák"
+        pekarna.save()
+        self.assertEqual(self._names("pekarna"), [])
+        self.assertEqual(self._names("cukrarna"), ["Cukrárna Dvořák"])
+
+        Company.objects.filter(pk=pekarna.pk).delete()
+        self.assertEqual(self._names("dvorak"), [])
+
+    def test_query_syntax_is_not_passed_through(self):
+        make_company("Alfa OR Beta")
+        self.assertEqual(fts_query('alfa" OR -beta*'), '"alfa"* "OR"* "beta"*')
+        self.assertEqual(self._names('"alfa'), ["Alfa OR Beta"])
+
+
+class CompanyListTests(TestCase):
+    def setUp(self):
+        Company.objects.bulk_create([
+            Company(company_name=f"Firma {i:02d}", respondent_name="R", respondent_email="r@example.com",
+                    company_size="micro", coach="coach1")
+            for i in range(views.DIRECTORY_PAGE_SIZE + 5)
+        ])
+
+    def test_keyset_pagination(self):
+        url = reverse("company:list")
+        first = self.client.get(url)
+        self.assertEqual(len(first.context["companies"]), views.DIRECTORY_PAGE_SIZE)
+        self.assertIsNotNone(first.context["next_cursor"])
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url, {"after": first.context["next_cursor"]})
+        names = [c.company_name for c in second.context["companies"]]
+        self.assertEqual(names[0], f"Firma {views.DIRECTORY_PAGE_SIZE:02d}")
+        self.assertEqual(len(names), 5)
+        self.assertIsNone(second.context["next_cursor"])
+
+        self.assertEqual(len(self.client.get(url, {"after": "garbage"}).context["companies"]),
+                         views.DIRECTORY_PAGE_SIZE)
+
+    def test_search_in_list_and_admin(self):
+        resp = self.client.get(reverse("company:list"), {"q": "firma 07"})
+        self.assertEqual([c.company_name for c in resp.context["companies"]], ["Firma 07"])
+
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resp = self.client.get(reverse("admin:company_company_changelist"), {"q": "firma 07"})
+        self.assertEqual(resp.context["cl"].result_count, 1)
+
+    def test_page_query_uses_index(self):
+        plan = Company.objects.order_by("company_name", "id")[:views.DIRECTORY_PAGE_SIZE + 1].explain()
+        self.assertIn("company_name_id_idx", plan)
@@ -5,6 +5,7 @@ app_name = "company"
 
 urlpatterns = [
     path("", views.company_list, name="list"),   # 🔹 přidáno
-    path("identification/", views.identification, name="identification"),
+    path("identification/", views.company_identification, name="identification"),
+    path("success/", views.success, name="success"),
     path("new/", views.company_create, name="create"),
 ]
\ No newline at end of file
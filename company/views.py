@@ -1,6 +1,9 @@
+from django.core import signing
+from django.db.models import Q
 from django.shortcuts import render, redirect
 from .forms import CompanyForm
 from .models import Company
+from .search import search_companies
 
 
 
@@ -18,14 +21,48 @@ def company_identification(request):
 def success(request):
     return render(request, "company/success.html")
 
-def company_list(request):
-    companies = Company.objects.all()
-    return render(request, "company/list.html", {"companies": companies})
+DIRECTORY_PAGE_SIZE = 25
+
+_CURSOR_SALT = "company.list"
+
+
+def _keyset_page(queryset, cursor):
+    """
+    Keyset stránkování podle (company_name, id): další stránka začíná za
+    posledním zobrazeným řádkem, takže cena nezávisí na tom, jak daleko se listuje
+    (na rozdíl od OFFSET). Vrací (firmy, kurzor další stránky nebo None).
+    """
+    if cursor:
+        try:
+            name, pk = signing.loads(cursor, salt=_CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            pass  # neplatný kurzor → první stránka
+        else:
+            # company_name >= name je rozsah, podle kterého SQLite skočí do indexu
+            queryset = queryset.filter(Q(company_name__gte=name), Q(company_name__gt=name) | Q(pk__gt=pk))
 
+    companies = list(queryset.order_by("company_name", "id")[:DIRECTORY_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(companies) > DIRECTORY_PAGE_SIZE:
+        companies = companies[:DIRECTORY_PAGE_SIZE]
+        last = companies[-1]
+        next_cursor = signing.dumps([last.company_name, str(last.pk)], salt=_CURSOR_SALT)
+    return companies, next_cursor
+
+
+def company_list(request):
+    query = request.GET.get("q", "").strip()
+    companies, next_cursor = _keyset_page(
+        search_companies(Company.objects.all(), query), request.GET.get("after")
+    )
+    return render(request, "company/list.html", {
+        "companies": companies,
+        "query": query,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("after"),
+    })
 
 
-def identification(request):
-    return render(request, "company/identification.html")
 
 def company_create(request):
     if request.method == "POST":
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.vendor import LOCK_PATH, VENDOR_ASSETS, cdn_url, read_lock
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stáhne připnuté verze knihoven z dashboard.vendor.VENDOR_ASSETS do static/vendor/ "
+        "a zapíše jejich sha256 do vendor.lock.json (při změně obsahu stejné verze skončí chybou)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Jen ověřit stažené soubory proti lock souboru.")
+        parser.add_argument("--force", action="store_true", help="Přijmout nový obsah i při neshodě s lockem.")
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.BASE_DIR) / "static"
+        lock = read_lock()
+        problems = []
+
+        for name, asset in VENDOR_ASSETS.items():
+            target = static_dir / asset["path"]
+            pinned = lock.get(name, {})
+            if options["check"]:
+                if not target.exists():
+                    problems.append(f"{name}: chybí {target}")
+                elif pinned.get("version") != asset["version"] or pinned.get("sha256") != _sha256(target.read_bytes()):
+                    problems.append(f"{name}: obsah neodpovídá {LOCK_PATH.name}")
+                continue
+
+            url = cdn_url(name)
+            with urllib.request.urlopen(url, timeout=60) as response:
+                data = response.read()
+            digest = _sha256(data)
+            if pinned.get("version") == asset["version"] and pinned.get("sha256") != digest and not options["force"]:
+                raise CommandError(f"{name} {asset['version']}: sha256 {digest} neodpovídá locku {pinned.get('sha256')}")
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            lock[name] = {"version": asset["version"], "url": url, "sha256": digest}
+            self.stdout.write(f"{name} {asset['version']} → {target.relative_to(settings.BASE_DIR)} ({len(data)} B)")
+
+        if options["check"]:
+            if problems:
+                raise CommandError("\n".join(problems))
+            self.stdout.write("Vendorované soubory odpovídají locku.")
+            return
+        LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        LOCK_PATH.write_text(json.dumps(lock, indent=2) + "\n", encoding="utf-8")
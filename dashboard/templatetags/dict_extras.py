@@ -1,8 +1,30 @@
+from collections.abc import Mapping
+
 from django import template
+
 register = template.Library()
 
+
 @register.filter
 def get_item(dictionary, key):
-    if dictionary and key in dictionary:
-        return dictionary.get(key)
+    """
+    Hodnota z dictu podle klíče, jinak prázdný string. Jediná verze filtru pro
+    všechny aplikace ({% load dict_extras %}); nové šablony ale raději dostávají
+    z view předpřipravené řádky (viz dashboard.utils.profitability_sections).
+    """
+    if isinstance(dictionary, Mapping) and key in dictionary:
+        return dictionary[key]
     return ""
+
+
+@register.filter
+def get_digit_diff(value, target):
+    """
+    Vrátí range rozdílu mezi target a value.
+    Umožňuje dopočítat prázdné buňky v tabulce.
+    """
+    try:
+        diff = target - int(value)
+        return range(diff) if diff > 0 else range(0)
+    except Exception:
+        return range(0)
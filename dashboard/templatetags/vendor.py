@@ -0,0 +1,12 @@
+from django import template
+from django.utils.html import format_html
+
+from ..vendor import asset_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_script(name):
+    """<script> pro knihovnu z dashboard.vendor.VENDOR_ASSETS, např. {% vendor_script "chart.js" %}."""
+    return format_html('<script src="{}"></script>', asset_url(name))
@@ -0,0 +1,150 @@
+import json
+import re
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from dashboard.vendor import LOCK_PATH, asset_url, cdn_url, is_vendored
+from ingestion.models import Document, FinancialMetric
+from ingestion.utils import invalidate_metrics_cache, metrics_cache_version
+from ingestion.views import backfill_prior_period, calculate_and_store_derived
+
+
+class UpdateMetricTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.doc = Document.objects.create(
+            file="documents/test.pdf", original_filename="test.pdf",
+            owner=self.admin, year=2023, doc_type="income",
+        )
+        FinancialMetric.objects.bulk_create([
+            FinancialMetric(document=self.doc, owner=self.admin, code=c, value=v, year=2023)
+            for c, v in (("01", 1000.0), ("04", 400.0), ("12", 200.0))
+        ])
+        calculate_and_store_derived(self.doc)
+
+    def test_edit_recomputes_dependent_metrics(self):
+        metric = FinancialMetric.objects.get(document=self.doc, code="04")
+        self.client.force_login(self.admin)
+        resp = self.client.post(reverse("dashboard:update_metric", args=[metric.id]), {"value": "500"})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["derived"]["gross_margin"], 500.0)
+        ebit = FinancialMetric.objects.get(document=self.doc, derived_key="ebit")
+        self.assertEqual(ebit.value, 300.0)
+
+    def test_requires_superuser_and_numeric_value(self):
+        metric = FinancialMetric.objects.get(document=self.doc, code="04")
+        url = reverse("dashboard:update_metric", args=[metric.id])
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.post(url, {"value": "abc"}).status_code, 400)
+
+        self.client.force_login(User.objects.create_user("user", password="x"))
+        self.assertEqual(self.client.post(url, {"value": "1"}).status_code, 403)
+        self.assertEqual(FinancialMetric.objects.get(pk=metric.pk).value, 400.0)
+
+
+class PriorPeriodYearsTests(TestCase):
+    """Rok doplněný ze srovnávacího sloupce (bez vlastního dokumentu) je v dashboardech vidět."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner", password="x")
+        doc = Document.objects.create(
+            file="documents/test.pdf", original_filename="test.pdf",
+            owner=self.user, year=2023, doc_type="income",
+        )
+        rows = [
+            {"code": "01", "label": "Tržby", "value": 1000.0, "prior_value": 800.0},
+            {"code": "04", "label": "Výkonová spotřeba", "value": 400.0, "prior_value": 300.0},
+        ]
+        FinancialMetric.objects.bulk_create([
+            FinancialMetric(document=doc, owner=self.user, code=r["code"], value=r["value"], year=2023)
+            for r in rows
+        ])
+        calculate_and_store_derived(doc)
+        backfill_prior_period(doc, rows)
+        self.client.force_login(self.user)
+
+    def test_index_and_report_include_backfilled_year(self):
+        index = self.client.get(reverse("dashboard:index"))
+        self.assertEqual(index.context["years"], [2022, 2023])
+        self.assertEqual(index.context["income_series"]["revenue"], [800.0, 1000.0])
+
+        report = self.client.get(reverse("dashboard:report"))
+        data = json.loads(re.search(r'id="report-data"[^>]*>(.*?)</script>', report.content.decode(), re.S).group(1))
+        self.assertEqual(data["years"], [2022, 2023])
+        self.assertEqual(data["datasets"]["Revenue"], [800.0, 1000.0])
+
+    def test_metrics_dashboard_keys_by_metric_year(self):
+        response = self.client.get(reverse("dashboard:metrics"))
+        self.assertEqual(dict(zip(response.context["revenue_years"], response.context["revenue_values"])),
+                         {2022: 800.0, 2023: 1000.0})
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner", password="x")
+        for year, revenue in ((2022, 1000.0), (2023, 1500.0)):
+            doc = Document.objects.create(
+                file="documents/test.pdf", original_filename="test.pdf",
+                owner=self.user, year=year, doc_type="income",
+            )
+            FinancialMetric.objects.bulk_create([
+                FinancialMetric(document=doc, owner=self.user, code=c, value=v, year=year)
+                for c, v in (("01", revenue), ("04", 400.0))
+            ])
+            calculate_and_store_derived(doc)
+        self.client.force_login(self.user)
+
+    def test_profitability_tables_are_prerendered_and_cached(self):
+        url = reverse("dashboard:profitability")
+        first = self.client.get(url)
+        self.assertContains(first, "<td>1,500 (+50.0 %)</td>", html=True)
+
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url)
+        self.assertContains(second, "<td>1,500 (+50.0 %)</td>", html=True)
+        self.assertEqual(len(ctx.captured_queries), 2)  # jen session + uživatel
+
+    def test_new_data_version_rerenders(self):
+        url = reverse("dashboard:profitability")
+        self.client.get(url)
+        FinancialMetric.objects.filter(owner=self.user, year=2023, derived_key="revenue").update(value=3000.0)
+        invalidate_metrics_cache(self.user.id)
+        self.assertContains(self.client.get(url), "<td>3,000 (+200.0 %)</td>", html=True)
+
+    def test_lost_version_key_does_not_reuse_old_fragments(self):
+        url = reverse("dashboard:profitability")
+        self.client.get(url)
+        version = metrics_cache_version(self.user.id)
+        FinancialMetric.objects.filter(owner=self.user, year=2023, derived_key="revenue").update(value=3000.0)
+        cache.delete(f"metrics-version:{self.user.id}")  # vypršel / vytlačený klíč verze
+        self.assertNotEqual(metrics_cache_version(self.user.id), version)
+        self.assertContains(self.client.get(url), "<td>3,000 (+200.0 %)</td>", html=True)
+
+    def test_report_series_are_json(self):
+        response = self.client.get(reverse("dashboard:report"))
+        data = json.loads(re.search(r'id="report-data"[^>]*>(.*?)</script>', response.content.decode(), re.S).group(1))
+        self.assertEqual(data["years"], [2022, 2023])
+        self.assertEqual(data["datasets"]["Revenue"], [1000.0, 1500.0])
+        self.assertEqual(data["datasets"]["Net Cash Flow"], [None, None])
+
+
+@skipUnless(LOCK_PATH.exists(), "static/vendor/ ještě není commitnuté – spusťte `manage.py vendor_static`")
+class VendoredAssetTests(TestCase):
+    def test_chart_js_is_served_locally(self):
+        self.assertTrue(is_vendored("chart.js"))
+        self.assertNotEqual(asset_url("chart.js"), cdn_url("chart.js"))
+
+    def test_vendored_files_match_lock(self):
+        call_command("vendor_static", "--check", stdout=StringIO())
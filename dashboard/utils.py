@@ -1,4 +1,7 @@
-from ingestion.models import ExtractedRow
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from ingestion.models import ExtractedTable, FinancialMetric
 
 # Výsledovka (doc_type='income')
 ROW_MAP_INCOME = {
@@ -30,10 +33,10 @@ def _value_for(rows, code: str, section: str | None = None) -> float:
     return 0.0
 
 def calculate_metrics(user, year: int) -> dict:
-    rows = ExtractedRow.objects.filter(
-        table__document__owner=user,
-        table__document__year=year
-    ).select_related("table__document")
+    tables = ExtractedTable.objects.filter(
+        document__owner=user,
+        document__year=year
+    ).select_related("document").prefetch_related("rows")
 
     metrics = {
         # income
@@ -46,8 +49,8 @@ def calculate_metrics(user, year: int) -> dict:
         "Gross_Margin": 0.0, "Gross_Margin_Pct": 0.0,
     }
 
-    income_rows = [r for r in rows if r.table.document.doc_type == "income"]
-    balance_rows = [r for r in rows if r.table.document.doc_type == "balance"]
+    income_rows = [r for t in tables if t.document.doc_type == "income" for r in t.iter_rows()]
+    balance_rows = [r for t in tables if t.document.doc_type == "balance" for r in t.iter_rows()]
 
     # Income
     for code, metric in ROW_MAP_INCOME.items():
@@ -86,3 +89,108 @@ def calculate_growth(metrics_by_year: dict[int, dict]) -> dict[int, dict]:
             "Net_Profit_Pct":       growth(m["Net_Profit"],       mp["Net_Profit"]),
         }
     return growth_by_year
+
+
+class MetricIndex:
+    """
+    Všechny metriky vlastníka načtené jedním dotazem a zaindexované podle roku,
+    aby dashboardy a export nepouštěly dotaz za každý rok × metriku.
+
+    Dopočítané hodnoty se berou z výsledovek (rozvaha má derived metriky nulové),
+    při více dokumentech za rok vyhrává nejstarší metrika – stejně jako dřív .first().
+    """
+
+    def __init__(self, owner):
+        self._derived: dict = {}
+        self._raw = defaultdict(list)
+        self._raw_balance = defaultdict(list)
+        self._income_years: set = set()
+        rows = (
+            FinancialMetric.objects.filter(owner=owner)
+            .order_by("id")
+            .values_list("year", "document__doc_type", "is_derived", "code", "derived_key", "value")
+        )
+        for year, doc_type, is_derived, code, derived_key, value in rows:
+            if doc_type == "income" and year is not None:
+                self._income_years.add(year)
+            if is_derived:
+                if doc_type == "income":
+                    self._derived.setdefault((year, derived_key), value)
+                continue
+            self._raw[(year, code)].append(value)
+            if doc_type == "balance":
+                self._raw_balance[(year, code)].append(value)
+
+    @property
+    def years(self) -> list:
+        return sorted(({year for year, _ in self._raw} | {year for year, _ in self._derived}) - {None})
+
+    @property
+    def income_years(self) -> list:
+        """Roky s metrikami výsledovky – vlastní i doplněné ze srovnávacího sloupce další výsledovky."""
+        return sorted(self._income_years)
+
+    def derived(self, year: int, key: str) -> Optional[float]:
+        return self._derived.get((year, key))
+
+    def sum_raw(self, year: int, codes: Iterable[str], doc_type: Optional[str] = None) -> Optional[float]:
+        """Součet vyplněných hodnot kódů za rok; None, pokud žádná není (doc_type="balance" = jen rozvaha)."""
+        source = self._raw_balance if doc_type == "balance" else self._raw
+        nums = [float(v) for code in codes for v in source.get((year, code), ()) if v is not None]
+        return sum(nums) if nums else None
+
+    def first_raw(self, year: int, code: str) -> Optional[float]:
+        values = self._raw.get((year, code))
+        return values[0] if values else None
+
+
+# Tabulky profitability dashboardu: (id, nadpis, [(popisek řádku, klíč série z build_profitability_context)])
+PROFITABILITY_SECTIONS = [
+    ("profitStory", "Your Profit Story", [
+        ("Revenue", "revenue"), ("COGS", "cogs"), ("Gross Margin", "gross_margin"),
+        ("Overheads", "overheads"), ("EBIT", "ebit"),
+    ]),
+    ("profitTrends", "Profitability Trends", [
+        ("Gross Margin %", "gross_margin_pct"), ("Operating Profit %", "operating_profit_pct"),
+        ("Net Profit %", "net_profit_pct"),
+    ]),
+    ("mainMetrics", "Hlavní metriky (Revenue, COGS, Gross Margin, Overheads, EBIT, Net Profit)", [
+        ("Revenue", "revenue"), ("COGS", "cogs"), ("Gross Margin", "gross_margin"),
+        ("Overheads", "overheads"), ("EBIT", "ebit"), ("Net Profit", "net_profit"),
+    ]),
+    ("margins", "Marže (%)", [
+        ("Gross Margin %", "gross_margin_pct"), ("EBIT Margin %", "operating_profit_pct"),
+        ("Net Profit %", "net_profit_pct"),
+    ]),
+    ("cashFlow", "Cash Flow (OCF, Customers, Suppliers)", [
+        ("Operating Cash Flow", "ocf"), ("Cash from Customers", "cash_from_customers"),
+        ("Cash to Suppliers", "cash_to_suppliers"),
+    ]),
+]
+
+
+def series_list(context: dict, key: str, missing=0) -> list:
+    """Série {rok: hodnota} jako seznam podle context["years"] (chybějící -> missing)."""
+    series = context.get(key) or {}
+    return [missing if series.get(y) is None else series[y] for y in context.get("years", [])]
+
+
+def table_row(label: str, values: list) -> dict:
+    """Řádek tabulky s buňkami {value, change}; change = meziroční změna v % jako text (nebo "")."""
+    cells = []
+    for i, value in enumerate(values):
+        change = ""
+        prev = values[i - 1] if i else 0
+        if i and prev:
+            diff = (value - prev) / abs(prev) * 100
+            change = f"{diff:+.1f} %"
+        cells.append({"value": value, "change": change})
+    return {"label": label, "cells": cells}
+
+
+def profitability_sections(context: dict) -> list:
+    """Předpřipravené tabulky pro profitability.html (šablona jen iteruje, žádné lookupy po buňkách)."""
+    return [
+        {"id": section_id, "title": title, "rows": [table_row(label, series_list(context, key)) for label, key in rows]}
+        for section_id, title, rows in PROFITABILITY_SECTIONS
+    ]
@@ -0,0 +1,62 @@
+"""
+Knihovny třetích stran servírované z našich statických souborů místo CDN
+(static/vendor/, stahuje `manage.py vendor_static`). Dokud soubor v repu není,
+šablony odkazují na stejnou připnutou verzi na CDN – `manage.py check --deploy`
+na to upozorní (dashboard.W001).
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core import checks
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+VENDOR_ASSETS = {
+    "chart.js": {
+        "version": "4.4.0",
+        "url": "https://cdn.jsdelivr.net/npm/chart.js@{version}/dist/chart.umd.min.js",
+        "path": "vendor/chart.js/chart.umd.min.js",
+    },
+}
+
+# sha256 stažených souborů (kontrola při dalším stažení a v `vendor_static --check`)
+LOCK_PATH = Path(settings.BASE_DIR) / "static" / "vendor" / "vendor.lock.json"
+
+
+def cdn_url(name: str) -> str:
+    asset = VENDOR_ASSETS[name]
+    return asset["url"].format(version=asset["version"])
+
+
+def read_lock() -> dict:
+    if LOCK_PATH.exists():
+        return json.loads(LOCK_PATH.read_text(encoding="utf-8"))
+    return {}
+
+
+@lru_cache(maxsize=None)
+def is_vendored(name: str) -> bool:
+    return finders.find(VENDOR_ASSETS[name]["path"]) is not None
+
+
+def asset_url(name: str) -> str:
+    """URL knihovny: lokální statický soubor (s hashem po collectstatic), jinak CDN."""
+    if is_vendored(name):
+        return static(VENDOR_ASSETS[name]["path"])
+    return cdn_url(name)
+
+
+@checks.register(checks.Tags.staticfiles, deploy=True)
+def check_vendored_assets(app_configs=None, **kwargs):
+    """Deploy check: knihovny, které se servírují z CDN, protože v static/vendor/ chybí."""
+    return [
+        checks.Warning(
+            f"{name} {asset['version']} není ve statických souborech ({asset['path']}), šablony ho načítají z CDN.",
+            hint="Spusťte `manage.py vendor_static` a commitněte static/vendor/ včetně vendor.lock.json.",
+            id="dashboard.W001",
+        )
+        for name, asset in VENDOR_ASSETS.items()
+        if not is_vendored(name)
+    ]
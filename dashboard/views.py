@@ -1,21 +1,38 @@
 # dashboard/views.py
 from __future__ import annotations
+import base64
 import io
 from typing import Dict, List, Optional
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse
-from django.shortcuts import render
+from django.db import transaction
+from django.http import FileResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 # ReportLab – hezký tabulkový export
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
-from ingestion.models import Document, ExtractedRow, FinancialMetric
-from ingestion.utils import DERIVED_FORMULAS
-from django.http import JsonResponse
-import base64
-from reportlab.platypus import Image
+from ingestion.models import Document, FinancialMetric
+from ingestion.utils import DERIVED_FORMULAS, invalidate_metrics_cache, metrics_cache_version, recalculate_derived
+from scb.tenants import use_tenant
+
+from .utils import MetricIndex, profitability_sections, series_list
+
+# série pro grafy profitability (klíče z build_profitability_context)
+PROFITABILITY_CHART_SERIES = [
+    "revenue", "cogs", "gross_margin", "overheads", "ebit", "net_profit",
+    "gross_margin_pct", "operating_profit_pct", "net_profit_pct",
+    "ocf", "cash_from_customers", "cash_to_suppliers",
+]
+# (název datasetu v report.html, klíč série)
+REPORT_CHART_SERIES = [
+    ("Revenue", "revenue"), ("COGS", "cogs"), ("Gross Margin", "gross_margin"), ("EBIT", "ebit"),
+    ("Net Profit", "net_profit"), ("Operating CF", "ocf"), ("Net Cash Flow", "net_cash_flow"),
+]
 
 
 # -----------------------------------------------------------------------------
@@ -26,27 +43,22 @@ def build_profitability_context(request):
     Vrátí dictionary se všemi daty pro profitability i report (profit & cash bloky,
     meziroční růsty a pracovní kapitál).
     """
-    # --- roky dostupných výsledovek
-    income_docs = Document.objects.filter(owner=request.user, doc_type="income").order_by("year")
-    years = sorted({d.year for d in income_docs if d.year})
+    # Všechny metriky uživatele – jeden dotaz, dál se čte z indexu v paměti
+    index = MetricIndex(request.user)
 
+    # --- roky s daty výsledovky (i doplněné ze srovnávacího sloupce, bez vlastního dokumentu)
+    years = index.income_years
     if not years:
         return {"years": []}
 
-    # Všechny metriky uživatele
-    fm = FinancialMetric.objects.filter(document__owner=request.user)
-
     # Helpers
     def get_derived(year: int, key: str) -> Optional[float]:
-        x = fm.filter(year=year, is_derived=True, derived_key=key).first()
-        return x.value if x else None
+        return index.derived(year, key)
 
     def sum_raw_codes(year: int, codes: List[str]) -> Optional[float]:
         if not codes:
             return None
-        vals = fm.filter(year=year, is_derived=False, code__in=codes).values_list("value", flat=True)
-        nums = [float(v) for v in vals if v is not None]
-        return sum(nums) if nums else None
+        return index.sum_raw(year, codes)
 
     # --- 1) Základní bloky + výpočty
     revenue: Dict[int, Optional[float]] = {}
@@ -110,11 +122,7 @@ def build_profitability_context(request):
     def bal_by_codes(year: int, codes: List[str]) -> Optional[float]:
         if not codes:
             return None
-        vals = fm.filter(year=year, is_derived=False, code__in=codes, document__doc_type="balance").values_list(
-            "value", flat=True
-        )
-        nums = [float(v) for v in vals if v is not None]
-        return sum(nums) if nums else None
+        return index.sum_raw(year, codes, doc_type="balance")
 
     inv_codes = DERIVED_FORMULAS.get("balance", {}).get("inventories", [])
     rec_codes = DERIVED_FORMULAS.get("balance", {}).get("receivables_trade", [])
@@ -162,7 +170,7 @@ def build_profitability_context(request):
 
     # OCF ≈ Net Profit + Depreciation (ř. 17) ± Δ Working Capital
     def depreciation(year: int) -> Optional[float]:
-        v = fm.filter(year=year, is_derived=False, code="17").values_list("value", flat=True).first()
+        v = index.first_raw(year, "17")
         return float(v) if v is not None else None
 
     ocf: Dict[int, Optional[float]] = {}
@@ -224,22 +232,26 @@ def dashboard(request):
     """
     Hlavní dashboard – vývoj vybraných metrik a rozvaha podle zvoleného roku.
     """
-    docs = Document.objects.filter(owner=request.user).order_by("year")
-    years = sorted({d.year for d in docs if d.year})
+    # roky podle metrik – doplněné minulé období (source=prior_period) nemá vlastní dokument
+    years = [
+        y for y in FinancialMetric.objects.filter(owner=request.user).order_by("year")
+        .values_list("year", flat=True).distinct() if y
+    ]
 
-    # --- Vývoj (Revenue, EBIT, Net Profit) přes derived metriky
+    # --- Vývoj (Revenue, EBIT, Net Profit) přes derived metriky (jeden dotaz pro všechny roky)
     tracked_income = ["revenue", "ebit", "net_profit"]
     income_series = {k: [] for k in tracked_income}
+    derived = {
+        (year, key): value
+        for year, key, value in FinancialMetric.objects.filter(
+            owner=request.user, year__in=years, derived_key__in=tracked_income, is_derived=True,
+            document__doc_type="income",
+        ).order_by("-id").values_list("year", "derived_key", "value")  # -id: vyhraje nejstarší, jako .first()
+    }
 
     for y in years:
         for key in tracked_income:
-            val = FinancialMetric.objects.filter(
-                document__owner=request.user,
-                year=y,
-                derived_key=key,
-                is_derived=True,
-            ).first()
-            income_series[key].append(val.value if val else None)
+            income_series[key].append(derived.get((y, key)))
 
     # --- Rozvaha podle zvoleného roku
     selected_year = request.GET.get("year")
@@ -252,7 +264,7 @@ def dashboard(request):
     if selected_year:
         metrics = (
             FinancialMetric.objects.filter(
-                document__owner=request.user, year=selected_year, document__doc_type="balance", is_derived=False
+                owner=request.user, year=selected_year, document__doc_type="balance", is_derived=False
             )
             .exclude(value__isnull=True)
         )
@@ -283,17 +295,17 @@ def dashboard(request):
 @login_required(login_url="/login/")
 def metrics_dashboard(request):
     docs = Document.objects.filter(owner=request.user).order_by("-year")
-    rows = ExtractedRow.objects.filter(table__document__owner=request.user)
-    metrics = FinancialMetric.objects.filter(document__owner=request.user)
+    metrics = FinancialMetric.objects.filter(owner=request.user).select_related("document")
 
     revenue_by_year = {}
     costs_by_year = {}
 
     for m in metrics:
+        # m.year, ne m.document.year – doplněné minulé období patří k dokumentu následujícího roku
         if m.derived_key == "revenue":
-            revenue_by_year[m.document.year] = m.value
+            revenue_by_year[m.year] = m.value
         elif m.derived_key == "cogs":
-            costs_by_year[m.document.year] = m.value
+            costs_by_year[m.year] = m.value
 
     context = {
         "documents": docs,
@@ -312,47 +324,38 @@ def metrics_dashboard(request):
 # -----------------------------------------------------------------------------
 @login_required(login_url="/login/")
 def profitability_dashboard(request):
-    context = build_profitability_context(request)
-
-    # všechna dostupná léta = sjednocený seznam z context["years"]
-    years = sorted(context.get("years", []))
-
-    # převod dictů {year: val} -> list (vyplní 0 pokud chybí)
-    def as_list(d: dict) -> list:
-        return [d.get(y, 0) for y in years]   # ✅ chybějící roky -> 0
-
-    context.update({
-        "years_list": years,
-        "revenue_list": as_list(context.get("revenue", {})),
-        "cogs_list": as_list(context.get("cogs", {})),
-        "overheads_list": as_list(context.get("overheads", {})),
-        "gross_margin_list": as_list(context.get("gross_margin", {})),
-        "gross_margin_pct_list": as_list(context.get("gross_margin_pct", {})),
-        "ebit_list": as_list(context.get("ebit", {})),
-        "net_profit_list": as_list(context.get("net_profit", {})),
-        "revenue_growth_pct_list": as_list(context.get("revenue_growth_pct", {})),
-        "cogs_growth_pct_list": as_list(context.get("cogs_growth_pct", {})),
-        "overheads_growth_pct_list": as_list(context.get("overheads_growth_pct", {})),
-        "operating_profit_pct_list": as_list(context.get("operating_profit_pct", {})),
-        "net_profit_pct_list": as_list(context.get("net_profit_pct", {})),
-        "cash_from_customers_list": as_list(context.get("cash_from_customers", {})),
-        "cash_to_suppliers_list": as_list(context.get("cash_to_suppliers", {})),
-        "gross_cash_profit_list": as_list(context.get("gross_cash_profit", {})),
-        "ocf_list": as_list(context.get("ocf", {})),
+    def data():
+        context = build_profitability_context(request)
+        return {
+            "years": context["years"],
+            "sections": profitability_sections(context),
+            "charts": {"years": context["years"], **{k: series_list(context, k) for k in PROFITABILITY_CHART_SERIES}},
+        }
+
+    # data se počítají líně – při zásahu fragment cache v šabloně se vůbec nenačítají
+    return render(request, "dashboard/profitability.html", {
+        "data_version": metrics_cache_version(request.user.id),
+        "fragment_timeout": settings.DASHBOARD_CACHE_TIMEOUT,
+        "profitability": SimpleLazyObject(data),
     })
 
-    if not years:
-        return render(request, "dashboard/profitability.html", {"years_list": []})
-
-    return render(request, "dashboard/profitability.html", context)
-
 # -----------------------------------------------------------------------------
-# Report view – stejný context, jiná šablona (tabulky + tlačítko exportu)
+# Report view – stejný context, jiná šablona (grafy + tlačítko exportu)
 # -----------------------------------------------------------------------------
 @login_required(login_url="/login/")
 def report_view(request):
-    context = build_profitability_context(request)
-    return render(request, "dashboard/report.html", context)
+    def data():
+        context = build_profitability_context(request)
+        return {"charts": {
+            "years": context["years"],
+            "datasets": {label: series_list(context, key, missing=None) for label, key in REPORT_CHART_SERIES},
+        }}
+
+    return render(request, "dashboard/report.html", {
+        "data_version": metrics_cache_version(request.user.id),
+        "fragment_timeout": settings.DASHBOARD_CACHE_TIMEOUT,
+        "report": SimpleLazyObject(data),
+    })
 
 
 # -----------------------------------------------------------------------------
@@ -398,9 +401,8 @@ def export_pdf(request):
                 elements.append(Paragraph(f"⚠️ Nepodařilo se načíst {key}: {e}", styles["Normal"]))
 
     # --- 2) získání dat pro tabulky
-    years = sorted(
-        set(FinancialMetric.objects.filter(document__owner=request.user).values_list("year", flat=True))
-    )
+    index = MetricIndex(request.user)
+    years = index.years
     if not years:
         elements.append(Paragraph("Žádná data nenalezena.", styles["Normal"]))
         doc.build(elements)
@@ -408,10 +410,7 @@ def export_pdf(request):
         return FileResponse(buffer, as_attachment=True, filename="report.pdf")
 
     def val(year: int, key: str) -> Optional[float]:
-        fm = FinancialMetric.objects.filter(
-            document__owner=request.user, year=year, derived_key=key, is_derived=True
-        ).first()
-        return fm.value if fm else None
+        return index.derived(year, key)
 
     # Profit tabulka
     profit_rows = [
@@ -484,17 +483,36 @@ def export_pdf(request):
     return FileResponse(buffer, as_attachment=True, filename="profitability_report.pdf")
 
 
+@login_required(login_url="/login/")
+@require_POST
 def update_metric(request, metric_id):
-    if request.method == "POST" and request.user.is_superuser:
-        metric = get_object_or_404(FinancialMetric, id=metric_id)
-        new_value = request.POST.get("value")
-
-        if new_value is not None:
-            try:
-                metric.value = float(new_value)  # pokud číslo
-            except ValueError:
-                metric.value = new_value  # fallback na text
-            metric.save()
-            return JsonResponse({"success": True, "new_value": metric.value})
+    """
+    Ruční oprava raw metriky (jen superuser). Přepočítá pouze derived metriky dokumentu,
+    které na kódu závisí (ingestion.utils.recalculate_derived) – vše v jedné transakci.
+    Metriku jiného vlastníka určí POST pole "owner" (id) – s TENANT_DATABASES je
+    v jeho databázi, ne v databázi přihlášeného superusera.
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({"success": False}, status=403)
+
+    try:
+        new_value = float(request.POST.get("value", ""))
+        owner_id = int(request.POST.get("owner") or request.user.pk)
+    except ValueError:
+        return JsonResponse({"success": False}, status=400)
+
+    lookup = {"id": metric_id}
+    if "owner" in request.POST:
+        lookup["owner_id"] = owner_id
+    with use_tenant(owner_id):
+        metric = get_object_or_404(FinancialMetric.objects.select_related("document"), **lookup)
+        with transaction.atomic(using=metric._state.db):
+            metric.value = new_value
+            metric.save(update_fields=["value"])
+            if metric.is_derived:
+                transaction.on_commit(lambda: invalidate_metrics_cache(metric.owner_id), using=metric._state.db)
+                derived = {}
+            else:
+                derived = recalculate_derived(metric.document, [metric.code], metric.source)
 
-    return JsonResponse({"success": False}, status=400)
\ No newline at end of file
+    return JsonResponse({"success": True, "new_value": metric.value, "derived": derived})
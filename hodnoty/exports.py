@@ -0,0 +1,182 @@
+"""
+Export FinancialMetric do CSV a Parquetu.
+
+Obojí se generuje průběžně: metriky se čtou přes .iterator(chunk_size) a ven
+jdou po částech, takže paměť nezávisí na velikosti exportu (HTTP přes
+StreamingHttpResponse, command export_metrics do souboru).
+
+CSV má jeden řádek na metriku. Parquet je pivot rok × metrika: jeden řádek na
+(vlastník, rok), sloupec na každou metriku – surové řádky jako
+"<doc_type>_<code>" (např. income_01), dopočítané pod svým derived_key.
+Parquet potřebuje volitelný balíček pyarrow (extra "parquet" v pyproject.toml).
+
+S TENANT_DATABASES jsou metriky v souborech vlastníků a uživatelé v hlavní DB:
+jména se pak dohledávají zvlášť (ne JOINem) a export všech prochází soubory
+vlastníků postupně (scb.tenants.split_by_tenant).
+"""
+import csv
+
+from django.contrib.auth import get_user_model
+
+from ingestion.models import FinancialMetric
+from scb import tenants
+
+CHUNK_SIZE = 2000
+
+# počet pivot řádků (vlastník × rok) v jedné row group Parquetu
+PARQUET_ROW_GROUP = 1000
+
+CSV_COLUMNS = (
+    "owner", "year", "doc_type", "code", "label", "value", "is_derived", "derived_key", "source", "document_id",
+)
+
+_CSV_FIELDS = (
+    "year", "document__doc_type", "code", "label", "value",
+    "is_derived", "derived_key", "source", "document_id",
+)
+
+
+class ExportUnavailable(Exception):
+    """Formát nejde vytvořit (chybí volitelná závislost)."""
+
+
+def metrics_for(user, everyone=False):
+    """Metriky uživatele; everyone=True (jen staff / command) = všech uživatelů."""
+    if everyone:
+        return FinancialMetric.objects.all()
+    # explicitní DB – StreamingHttpResponse čte až po doběhnutí middlewaru
+    return FinancialMetric.objects.using(tenants.db_for(user)).filter(owner=user)
+
+
+class _Usernames(dict):
+    """
+    owner_id -> username. Řádky jdou seřazené podle vlastníka, takže chybějící jméno
+    se načte s dávkou následujících uživatelů – jeden dotaz na USERNAME_BATCH vlastníků.
+    """
+
+    USERNAME_BATCH = 1000
+
+    def __missing__(self, owner_id):
+        users = get_user_model().objects.filter(pk__gte=owner_id).order_by("pk")
+        self.update(users.values_list("pk", "username")[:self.USERNAME_BATCH])
+        return self.setdefault(owner_id, None)
+
+
+def _owner_rows(queryset, fields, chunk_size):
+    """(username vlastníka, *fields) řazené vlastník → rok → id, přes všechny DB s metrikami."""
+    if not tenants.enabled():
+        rows = queryset.order_by("owner_id", "year", "id").values_list("owner__username", *fields)
+        yield from rows.iterator(chunk_size=chunk_size)
+        return
+    usernames = _Usernames()
+    for qs in tenants.split_by_tenant(queryset):
+        rows = qs.order_by("owner_id", "year", "id").values_list("owner_id", *fields)
+        for owner_id, *rest in rows.iterator(chunk_size=chunk_size):
+            yield (usernames[owner_id], *rest)
+
+
+class _Echo:
+    """Pseudo-soubor pro csv.writer – write() jen vrátí řádek (viz Django docs)."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=CHUNK_SIZE):
+    """Generuje CSV po řádcích; řazeno vlastník → rok → id."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in _owner_rows(queryset, _CSV_FIELDS, chunk_size):
+        yield writer.writerow(row)
+
+
+def metric_column(doc_type, code, is_derived, derived_key) -> str:
+    return derived_key if is_derived else f"{doc_type}_{code}"
+
+
+class _ChunkSink:
+    """Zapisovatelný "soubor" pro ParquetWriter, ze kterého se průběžně odebírají bajty."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_parquet(queryset, chunk_size=CHUNK_SIZE, row_group=PARQUET_ROW_GROUP):
+    """
+    Generuje Parquet (pivot rok × metrika) po row groups. Sloupce se zjistí
+    jedním DISTINCT dotazem, pak se metriky čtou seřazené podle (vlastník, rok)
+    a v paměti je vždy jen jedna row group.
+
+    Chybějící pyarrow hlásí ExportUnavailable hned při volání (ne až při
+    iteraci), aby view mohlo vrátit chybu dřív, než začne streamovat.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportUnavailable("Export do Parquetu vyžaduje balíček pyarrow (poetry install -E parquet, případně pip install pyarrow).") from exc
+    return _parquet_chunks(pa, pq, queryset, chunk_size, row_group)
+
+
+def _parquet_chunks(pa, pq, queryset, chunk_size, row_group):
+    key_fields = ("document__doc_type", "code", "is_derived", "derived_key")
+    columns = sorted({
+        metric_column(*key)
+        for qs in tenants.split_by_tenant(queryset)
+        for key in qs.order_by().values_list(*key_fields).distinct().iterator(chunk_size=chunk_size)
+    })
+    schema = pa.schema(
+        [("owner", pa.string()), ("year", pa.int32())] + [(c, pa.float64()) for c in columns]
+    )
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    batch = {name: [] for name in schema.names}
+
+    def flush_batch():
+        writer.write_table(pa.table(batch, schema=schema))
+        for values in batch.values():
+            values.clear()
+        return sink.drain()
+
+    current = None
+    rows = _owner_rows(queryset, ("year", *key_fields, "value"), chunk_size)
+    for username, year, doc_type, code, is_derived, derived_key, value in rows:
+        if (username, year) != current:
+            if len(batch["owner"]) >= row_group:
+                yield flush_batch()
+            current = (username, year)
+            batch["owner"].append(username)
+            batch["year"].append(year)
+            for name in columns:
+                batch[name].append(None)
+        # u duplicit (víc dokumentů stejného typu za rok) vyhrává poslední
+        batch[metric_column(doc_type, code, is_derived, derived_key)][-1] = value
+
+    if batch["owner"]:
+        yield flush_batch()
+    writer.close()
+    yield sink.drain()
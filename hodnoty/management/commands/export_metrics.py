@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from hodnoty.exports import CHUNK_SIZE, ExportUnavailable, iter_csv, iter_parquet, metrics_for
+
+
+class Command(BaseCommand):
+    help = "Vyexportuje FinancialMetric do CSV nebo Parquetu (pivot rok × metrika), průběžně po částech."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Cílový soubor.")
+        parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+        parser.add_argument("--user", help="Jen metriky tohoto uživatele (username); jinak všech.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Počet řádků na jeden fetch z DB.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Uživatel {options['user']} neexistuje.")
+        queryset = metrics_for(user, everyone=user is None)
+
+        if options["format"] == "parquet":
+            try:
+                chunks = iter_parquet(queryset, chunk_size=options["chunk_size"])
+            except ExportUnavailable as e:
+                raise CommandError(str(e))
+            with open(options["output"], "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                for line in iter_csv(queryset, chunk_size=options["chunk_size"]):
+                    f.write(line)
+
+        self.stdout.write(self.style.SUCCESS(f"Export uložen do {options['output']}."))
@@ -1,3 +1,85 @@
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from ingestion.models import Document, FinancialMetric
+from ingestion.views import calculate_and_store_derived
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # volitelná závislost
+    pq = None
+
+
+class MetricsExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        self.other = User.objects.create_user("other", password="x")
+        for user in (self.user, self.other):
+            for year in (2022, 2023):
+                doc = Document.objects.create(
+                    file="documents/test.pdf", original_filename="test.pdf",
+                    owner=user, year=year, doc_type="income",
+                )
+                FinancialMetric.objects.bulk_create([
+                    FinancialMetric(document=doc, owner=user, code=c, value=float(year), year=year)
+                    for c in ("01", "02", "04")
+                ])
+                calculate_and_store_derived(doc)
+        self.client.force_login(self.user)
+
+    def _csv(self, response):
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+
+    def test_csv_contains_only_own_metrics(self):
+        rows = self._csv(self.client.get(reverse("hodnoty:export_csv"), {"scope": "all"}))
+        self.assertEqual({r["owner"] for r in rows}, {"owner"})
+        self.assertEqual(len(rows), FinancialMetric.objects.filter(owner=self.user).count())
+        self.assertEqual([r["year"] for r in rows], sorted(r["year"] for r in rows))
+
+    def test_staff_can_export_everyone(self):
+        self.user.is_staff = True
+        self.user.save()
+        rows = self._csv(self.client.get(reverse("hodnoty:export_csv"), {"scope": "all"}))
+        self.assertEqual({r["owner"] for r in rows}, {"owner", "other"})
+        self.assertEqual(len(rows), FinancialMetric.objects.count())
+
+    @unittest.skipIf(pq is None, "pyarrow není nainstalovaný")
+    def test_parquet_is_pivoted_by_year(self):
+        response = self.client.get(reverse("hodnoty:export_parquet"))
+        table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(table.column("year").to_pylist(), [2022, 2023])
+        self.assertEqual(table.column("income_01").to_pylist(), [2022.0, 2023.0])
+        self.assertIn("revenue", table.column_names)
+
+    @unittest.skipIf(pq is None, "pyarrow není nainstalovaný")
+    def test_command_writes_row_groups(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.parquet")
+            call_command("export_metrics", path, format="parquet", chunk_size=5, stdout=io.StringIO())
+            table = pq.read_table(path)
+        self.assertEqual(sorted(set(table.column("owner").to_pylist())), ["other", "owner"])
+        self.assertEqual(table.num_rows, 4)
+
+    @mock.patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None})
+    def test_command_without_pyarrow_names_the_extra(self):
+        with tempfile.TemporaryDirectory() as tmp, self.assertRaisesMessage(CommandError, "poetry install -E parquet"):
+            call_command("export_metrics", os.path.join(tmp, "metrics.parquet"), format="parquet", stdout=io.StringIO())
 
-# Create your tests here.
+    def test_command_csv_for_single_user(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.csv")
+            call_command("export_metrics", path, user="other", stdout=io.StringIO())
+            with open(path, encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual({r["owner"] for r in rows}, {"other"})
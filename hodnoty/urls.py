@@ -5,4 +5,6 @@ app_name = "hodnoty"
 
 urlpatterns = [
     path("", views.values_list, name="list"),
+    path("export.csv", views.export_csv, name="export_csv"),
+    path("export.parquet", views.export_parquet, name="export_parquet"),
 ]
\ No newline at end of file
@@ -1,14 +1,18 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
 from ingestion.models import FinancialMetric
 
+from .exports import ExportUnavailable, iter_csv, iter_parquet, metrics_for
+
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def values_list(request):
     # vezme všechny dopočítané metriky uživatele
     metrics = FinancialMetric.objects.filter(
-        document__owner=request.user
+        owner=request.user
     ).order_by("year", "label")
 
     # seskupíme podle roku
@@ -19,3 +23,29 @@ def values_list(request):
         years[m.year][m.label] = m.value
 
     return render(request, "hodnoty/list.html", {"years": years})
+
+
+def _export_queryset(request):
+    # staff si může přes ?scope=all stáhnout data všech uživatelů
+    everyone = request.user.is_staff and request.GET.get("scope") == "all"
+    return metrics_for(request.user, everyone=everyone)
+
+
+def _attachment(response, extension):
+    response["Content-Disposition"] = f'attachment; filename="metrics-{timezone.localdate():%Y%m%d}.{extension}"'
+    return response
+
+
+@login_required
+def export_csv(request):
+    response = StreamingHttpResponse(iter_csv(_export_queryset(request)), content_type="text/csv; charset=utf-8")
+    return _attachment(response, "csv")
+
+
+@login_required
+def export_parquet(request):
+    try:
+        chunks = iter_parquet(_export_queryset(request))
+    except ExportUnavailable as e:
+        return HttpResponse(str(e), status=501, content_type="text/plain; charset=utf-8")
+    return _attachment(StreamingHttpResponse(chunks, content_type="application/vnd.apache.parquet"), "parquet")
@@ -1,25 +1,116 @@
 from django.contrib import admin
-from .models import Document, ExtractedTable, ExtractedRow, FinancialMetric
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+
+from scb import tenants
+from .models import Document, ExtractedTable, ExtractedRow, ExtractedText, FinancialMetric
+
+
+def _selected_owner(request):
+    """Vlastník z filtru ?owner= (na detailu z _changelist_filters, které admin přenáší)."""
+    params = request.GET
+    if "_changelist_filters" in params:
+        params = QueryDict(params["_changelist_filters"])
+    owner = params.get("owner", "")
+    return int(owner) if owner.isdigit() else None
+
+
+class OwnerFilter(admin.SimpleListFilter):
+    title = "vlastník"
+    parameter_name = "owner"
+
+    def __init__(self, request, params, model, model_admin):
+        self.owner_lookup = model_admin.owner_lookup
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return get_user_model().objects.order_by("username").values_list("pk", "username")
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.owner_lookup: self.value()})
+        return queryset
+
+
+class TenantAdmin(admin.ModelAdmin):
+    """
+    Admin dat vlastníků (scb.tenants.TENANT_MODELS). S TENANT_DATABASES se čte a zapisuje
+    do souboru vlastníka vybraného filtrem (bez filtru přihlášeného uživatele) a uživatelé
+    se nedotahují JOINem – jejich tabulka je v hlavní DB.
+    """
+    owner_lookup = "owner"
+    # JOINy, které zůstávají uvnitř souboru vlastníka (select_related() by šel až na uživatele)
+    tenant_select_related = ()
+    # uživatelé zvlášť jedním dotazem do hlavní DB
+    tenant_prefetch_related = ()
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if tenants.enabled() and self.tenant_prefetch_related:
+            queryset = queryset.prefetch_related(*self.tenant_prefetch_related)
+        return queryset
+
+    def get_list_select_related(self, request):
+        if tenants.enabled():
+            return self.tenant_select_related
+        return super().get_list_select_related(request)
+
+    def _in_owner_database(self, view, request, *args, **kwargs):
+        owner = _selected_owner(request)
+        # neexistující soubor se nezakládá – filtr pak v DB přihlášeného uživatele nic nenajde
+        if not tenants.enabled() or owner is None or not tenants.tenant_path(owner).exists():
+            return view(request, *args, **kwargs)
+        with tenants.use_tenant(owner):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()  # líné dotazy šablony ještě v DB vlastníka
+            return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self._in_owner_database(super().changelist_view, request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        return self._in_owner_database(super().changeform_view, request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self._in_owner_database(super().delete_view, request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        return self._in_owner_database(super().history_view, request, object_id, extra_context)
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(TenantAdmin):
     list_display = ("id","original_filename","owner","year","doc_type","uploaded_at")
-    list_filter = ("doc_type","year","owner")
+    list_filter = ("doc_type","year",OwnerFilter)
     search_fields = ("original_filename",)
+    tenant_prefetch_related = ("owner",)
 
 @admin.register(ExtractedTable)
-class ExtractedTableAdmin(admin.ModelAdmin):
+class ExtractedTableAdmin(TenantAdmin):
     list_display = ("id","document","method","page_number","table_index","created_at")
-    list_filter = ("method",)
+    list_filter = ("method",OwnerFilter)
+    owner_lookup = "document__owner"
+    tenant_select_related = ("document",)
 
 @admin.register(ExtractedRow)
-class ExtractedRowAdmin(admin.ModelAdmin):
+class ExtractedRowAdmin(TenantAdmin):
     list_display = ("id","table","code","label","value","section","created_at")
-    list_filter = ("section",)
+    list_filter = ("section",OwnerFilter)
     search_fields = ("code","label")
+    owner_lookup = "table__document__owner"
+    tenant_select_related = ("table",)
 
 @admin.register(FinancialMetric)
-class FinancialMetricAdmin(admin.ModelAdmin):
-    list_display = ("id","document","code","derived_key","value","is_derived","year","created_at")
-    list_filter = ("is_derived","year")
+class FinancialMetricAdmin(TenantAdmin):
+    list_display = ("id","document","owner","code","derived_key","value","is_derived","year","source","created_at")
+    list_filter = ("is_derived","source","year",OwnerFilter)
     search_fields = ("code","derived_key","label")
+    tenant_select_related = ("document",)
+    tenant_prefetch_related = ("owner",)
+
+@admin.register(ExtractedText)
+class ExtractedTextAdmin(admin.ModelAdmin):
+    list_display = ("id","sha256","backend","page_count","created_at")
+    list_filter = ("backend",)
+    search_fields = ("sha256",)
+    exclude = ("data",)
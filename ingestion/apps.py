@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+from scb import tenants
+
+
+def _drop_owner_database(sender, instance, using, **kwargs):
+    # s TENANT_DATABASES nemají data vlastníka v hlavní DB co smazat kaskádou – smaže se jeho soubor,
+    # ale až po commitu (rollback mazání uživatele jeho data zachová, jako u souborů dokumentů)
+    if tenants.enabled():
+        owner_id = instance.pk
+        transaction.on_commit(lambda: tenants.drop_tenant(owner_id), using=using)
 
 
 class IngestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingestion'
+
+    def ready(self):
+        post_delete.connect(_drop_owner_database, sender=settings.AUTH_USER_MODEL, dispatch_uid="ingestion_drop_owner_db")
@@ -0,0 +1,95 @@
+"""
+Rychlé lokální rozpoznání nahraného výkazu z textu první stránky (bez volání modelu):
+typ výkazu (rozvaha / výsledovka), účetní rok (datum "ke dni") a IČO účetní jednotky.
+
+Upload podle toho soubory bez zvoleného typu zařadí sám a soubory, jejichž typ, rok
+nebo IČO nesedí s formulářem (případně s ostatními soubory / dřívějšími dokumenty),
+odmítne dřív, než se zaplatí extrakce. První stránka přes PDFium trvá jednotky ms.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import pypdfium2
+
+# nadpisy výkazů; rozhoduje ten, který je v textu nejdřív (nadpis je nahoře stránky)
+TYPE_PATTERNS = (
+    ("balance", re.compile(r"\bROZVAHA\b|\bAKTIVA\b.*\bPASIVA\b", re.S)),
+    ("income", re.compile(r"\bVÝKAZ\s+ZISKU\s+A\s+ZTRÁTY\b|\bVÝSLEDOVKA\b")),
+)
+# rozvahový den / konec období: "ke dni: 31.12.2022", "k 30. 6. 2023", "za období … do 31.12.2022"
+PERIOD_END_RE = re.compile(
+    r"(?:\bke\s+dni|\bk\s+datu|\bk|\bdo)\s*:?\s*(\d{1,2})\s*\.\s*(\d{1,2})\s*\.\s*((?:19|20)\d{2})\b", re.I
+)
+YEAR_RE = re.compile(r"\b(?:za\s+(?:účetní\s+)?(?:rok|období)|rok)\s*:?\s*((?:19|20)\d{2})\b", re.I)
+ICO_RE = re.compile(r"\bIČO?\s*:?\s*((?:\d\s?){8})(?!\d)")
+
+
+@dataclass
+class Classification:
+    doc_type: Optional[str] = None
+    year: Optional[int] = None
+    ico: Optional[str] = None
+
+
+def valid_ico(ico: str) -> bool:
+    """Kontrolní číslice IČO (vážený součet modulo 11)."""
+    if not re.fullmatch(r"\d{8}", ico or ""):
+        return False
+    total = sum(int(d) * w for d, w in zip(ico[:7], range(8, 1, -1)))
+    return (11 - total % 11) % 10 == int(ico[7])
+
+
+def detect_type(text: str) -> Optional[str]:
+    upper = text.upper()
+    found = [(m.start(), doc_type) for doc_type, rx in TYPE_PATTERNS for m in [rx.search(upper)] if m]
+    return min(found)[1] if found else None
+
+
+def detect_year(text: str) -> Optional[int]:
+    match = PERIOD_END_RE.search(text)
+    if match:
+        return int(match.group(3))
+    match = YEAR_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+def detect_ico(text: str) -> Optional[str]:
+    for match in ICO_RE.finditer(text):
+        ico = re.sub(r"\s", "", match.group(1))
+        if valid_ico(ico):
+            return ico
+    return None
+
+
+def classify_text(text: str) -> Classification:
+    return Classification(doc_type=detect_type(text), year=detect_year(text), ico=detect_ico(text))
+
+
+def first_page_text(source) -> str:
+    """Text první stránky PDF; source = cesta, bajty nebo soubor (UploadedFile se vrátí na začátek)."""
+    if hasattr(source, "read"):
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+    else:
+        data = source
+    try:
+        pdf = pypdfium2.PdfDocument(data)
+    except pypdfium2.PdfiumError:
+        return ""  # poškozené / nepodporované PDF – rozhodne až pipeline
+    try:
+        if not len(pdf):
+            return ""
+        page = pdf[0]
+        textpage = page.get_textpage()
+        text = textpage.get_text_bounded()
+        textpage.close()
+        page.close()
+        return text
+    finally:
+        pdf.close()
+
+
+def classify_pdf(source) -> Classification:
+    return classify_text(first_page_text(source))
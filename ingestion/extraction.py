@@ -0,0 +1,271 @@
+"""
+Backendy pro extrakci textu z PDF výkazů (po stránkách).
+
+    pdfplumber       – pdfminer, pomalý, ale s rozložením řádků podle souřadnic (původní chování)
+    pypdfium2        – PDFium (závislost pdfplumberu), o řád rychlejší, text v pořadí obsahu stránky
+    camelot-lattice  – tabulky s linkami (volitelný balíček camelot-py), řádek tabulky = řádek textu
+    camelot-stream   – tabulky bez linek podle mezer mezi sloupci (camelot-py)
+    auto             – podle dokumentu: nejrychlejší backend, jehož text obsahuje řádky výkazu
+
+Backend se volí nastavením PDF_EXTRACTION_BACKEND (výchozí "pdfplumber"), porovnání
+rychlosti a úspěšnosti na ukázkových výkazech: python -m benchmarks.extraction.
+
+Výsledek (text stránek + slova se souřadnicemi) se ukládá do ExtractedText podle SHA-256
+souboru a backendu, takže opakované zpracování stejného PDF už ho neparsuje
+(vypnutí: PDF_TEXT_CACHE = False).
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+import pdfplumber
+import pypdfium2
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import ExtractedText
+
+try:
+    import camelot
+except ImportError:  # volitelná závislost
+    camelot = None
+
+DEFAULT_BACKEND = "pdfplumber"
+
+# řádek výkazu končí číslem řádku (01, 037, …) a aspoň jednou částkou ("… 37 1 707 0 1 707 1 048")
+ROW_LINE_RE = re.compile(r"(?:^|\s)\d{2,3}\s+-?\d[\d\s-]*$")
+# méně řádků výkazu než tolik = text je rozházený, auto zkusí další backend
+MIN_ROW_LINES = 5
+
+
+def row_lines(text: str) -> List[str]:
+    """Řádky textu, které vypadají jako řádek výkazu (kód řádku + částky)."""
+    return [line for line in text.splitlines() if ROW_LINE_RE.search(line.rstrip())]
+
+
+# nadpisy výkazů podle doc_type (celá slova, "AKTIVA" nesmí chytit "Aktivace" ve výsledovce)
+STATEMENT_KEYWORDS = {
+    "balance": re.compile(r"\b(?:ROZVAHA|AKTIVA|PASIVA)\b"),
+    "income": re.compile(r"\b(?:VÝKAZ ZISKU A ZTRÁTY|VÝSLEDOVKA)\b"),
+}
+# stránka výkazu: aspoň tolik řádků výkazu a aspoň takový podíl mezi neprázdnými řádky
+# (přílohy a komentáře s čísly mají řádků výkazu málo)
+MIN_PAGE_ROWS = 3
+MIN_ROW_DENSITY = 0.2
+
+
+def statement_pages(pages: List[str], doc_type: Optional[str] = None) -> List[int]:
+    """
+    Čísla stránek (od 1) s výkazem – stránky s hustotou řádků výkazu, kromě stránek
+    s nadpisem jiného výkazu (PDF s rozvahou i výsledovkou). Titulní strany, přílohy
+    a podpisy se vynechají; když nevyhoví žádná stránka, vrací všechny.
+    """
+    own = STATEMENT_KEYWORDS.get(doc_type)
+    foreign = [rx for key, rx in STATEMENT_KEYWORDS.items() if key != doc_type]
+    selected = []
+    for number, text in enumerate(pages, 1):
+        lines = [line for line in text.splitlines() if line.strip()]
+        rows = len(row_lines(text))
+        if rows < MIN_PAGE_ROWS or rows < MIN_ROW_DENSITY * len(lines):
+            continue
+        upper = text.upper()
+        if own is not None and not own.search(upper) and any(rx.search(upper) for rx in foreign):
+            continue
+        selected.append(number)
+    return selected or list(range(1, len(pages) + 1))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Extraction(NamedTuple):
+    pages: List[str]
+    # slova každé stránky jako [x0, top, x1, bottom, text] v bodech od levého horního rohu
+    # (souřadnice jako u pdfplumberu); backend bez slov (Camelot) vrací prázdné seznamy
+    words: List[List[list]]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.pages)
+
+
+class ExtractionBackend:
+    name = ""
+
+    def available(self) -> bool:
+        return True
+
+    def extract(self, path: str) -> Extraction:
+        raise NotImplementedError
+
+    def extract_pages(self, path: str) -> List[str]:
+        """Text každé stránky zvlášť (prázdný řetězec pro stránku bez textu)."""
+        return self.extract(path).pages
+
+
+def _box(x0, top, x1, bottom, text) -> list:
+    return [round(x0, 2), round(top, 2), round(x1, 2), round(bottom, 2), text]
+
+
+class PdfplumberBackend(ExtractionBackend):
+    name = "pdfplumber"
+
+    def extract(self, path: str) -> Extraction:
+        pages, words = [], []
+        with pdfplumber.open(path) as pdf:
+            for p in pdf.pages:
+                pages.append(p.extract_text() or "")
+                words.append([_box(w["x0"], w["top"], w["x1"], w["bottom"], w["text"]) for w in p.extract_words()])
+        return Extraction(pages, words)
+
+
+class PdfiumBackend(ExtractionBackend):
+    name = "pypdfium2"
+
+    def extract(self, path: str) -> Extraction:
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            pages, words = [], []
+            for page in pdf:
+                textpage = page.get_textpage()
+                # PDFium odděluje řádky \r\n a řádky tabulky odsazuje mezerou
+                pages.append("\n".join(line.strip() for line in textpage.get_text_bounded().splitlines()))
+                words.append(self._words(textpage, page.get_height()))
+                textpage.close()
+                page.close()
+            return Extraction(pages, words)
+        finally:
+            pdf.close()
+
+    @staticmethod
+    def _words(textpage, height: float) -> List[list]:
+        """Slova = souvislé úseky znaků bez mezer; box je sjednocení boxů znaků (PDF má osu y zdola)."""
+        text = textpage.get_text_range()
+        words, current = [], None
+        for i, ch in enumerate(text):
+            if ch.isspace():
+                if current:
+                    words.append(_box(*current))
+                current = None
+                continue
+            left, bottom, right, top = textpage.get_charbox(i)
+            if current is None:
+                current = [left, height - top, right, height - bottom, ch]
+            else:
+                current[0] = min(current[0], left)
+                current[1] = min(current[1], height - top)
+                current[2] = max(current[2], right)
+                current[3] = max(current[3], height - bottom)
+                current[4] += ch
+        if current:
+            words.append(_box(*current))
+        return words
+
+
+class CamelotBackend(ExtractionBackend):
+    def __init__(self, flavor: str):
+        self.flavor = flavor
+        self.name = f"camelot-{flavor}"
+
+    def available(self) -> bool:
+        return camelot is not None
+
+    def extract(self, path: str) -> Extraction:
+        if camelot is None:
+            raise ImproperlyConfigured(f"Backend {self.name} vyžaduje balíček camelot-py.")
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            pages: List[List[str]] = [[] for _ in range(len(pdf))]
+        finally:
+            pdf.close()
+        for table in camelot.read_pdf(path, pages="all", flavor=self.flavor):
+            lines = pages[int(table.page) - 1]
+            for cells in table.df.values.tolist():
+                line = " ".join(str(c).replace("\n", " ").strip() for c in cells if str(c).strip())
+                if line:
+                    lines.append(line)
+        return Extraction(["\n".join(lines) for lines in pages], [[] for _ in pages])
+
+
+class AutoBackend(ExtractionBackend):
+    """
+    Volba podle dokumentu: bez textové vrstvy (sken) nepomůže žádný backend, vrací se
+    výsledek nejrychlejšího; jinak první backend z CANDIDATES, v jehož textu je aspoň
+    MIN_ROW_LINES řádků výkazu, případně ten s nejvíc řádky.
+    """
+    name = "auto"
+    CANDIDATES = ("pypdfium2", "pdfplumber", "camelot-lattice")
+
+    def extract(self, path: str) -> Extraction:
+        best: Optional[tuple] = None
+        for name in self.CANDIDATES:
+            backend = BACKENDS[name]
+            if not backend.available():
+                continue
+            result = backend.extract(path)
+            if best is None and not any(p.strip() for p in result.pages):
+                return result
+            found = sum(len(row_lines(p)) for p in result.pages)
+            if found >= MIN_ROW_LINES:
+                return result
+            if best is None or found > best[0]:
+                best = (found, result)
+        return best[1] if best else Extraction([], [])
+
+
+BACKENDS: Dict[str, ExtractionBackend] = {
+    b.name: b
+    for b in (
+        PdfplumberBackend(),
+        PdfiumBackend(),
+        CamelotBackend("lattice"),
+        CamelotBackend("stream"),
+        AutoBackend(),
+    )
+}
+
+
+def get_backend(name: Optional[str] = None) -> ExtractionBackend:
+    name = name or getattr(settings, "PDF_EXTRACTION_BACKEND", None) or DEFAULT_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Neznámý PDF_EXTRACTION_BACKEND {name!r} (možnosti: {', '.join(BACKENDS)})."
+        ) from None
+
+
+def extract(path: str, backend: Optional[str] = None) -> Extraction:
+    """Text a slova PDF – z cache ExtractedText, jinak backendem (a výsledek se uloží)."""
+    backend = get_backend(backend)
+    if not getattr(settings, "PDF_TEXT_CACHE", True):
+        return backend.extract(path)
+
+    sha256 = file_sha256(path)
+    cached = ExtractedText.objects.filter(sha256=sha256, backend=backend.name).first()
+    if cached is not None:
+        data = cached.unpack()
+        return Extraction(data["pages"], data["words"])
+
+    result = backend.extract(path)
+    # get_or_create: souběžné zpracování stejného souboru nespadne na unikátním klíči
+    ExtractedText.objects.get_or_create(
+        sha256=sha256, backend=backend.name,
+        defaults={"page_count": len(result.pages), "data": ExtractedText.pack(result.pages, result.words)},
+    )
+    return result
+
+
+def extract_pages(path: str, backend: Optional[str] = None) -> List[str]:
+    return extract(path, backend).pages
+
+
+def extract_text(path: str, backend: Optional[str] = None) -> str:
+    return extract(path, backend).text
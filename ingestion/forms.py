@@ -47,10 +47,17 @@ class MultipleFileField(forms.FileField):
 class MultiUploadForm(forms.Form):
     year = forms.IntegerField(
         label="Rok",
-        required=True,
+        required=False,
+        help_text="Nepovinné – rok se čte z výkazu (rozvahový den); vyplňte, pokud ho výkaz neuvádí.",
         widget=forms.NumberInput(attrs={"class": "form-control"}),
     )
 
+    # typ (a rok) se rozpozná z první stránky – viz ingestion.classify
+    auto_files = MultipleFileField(
+        label="Soubory – rozpoznat automaticky",
+        required=False,
+    )
+
     # ✅ Použijeme naše MultipleFileField – vrací LIST souborů
     balance_files = MultipleFileField(
         label="Soubory – Rozvaha",
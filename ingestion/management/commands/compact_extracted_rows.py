@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ingestion.models import ExtractedRow, ExtractedTable
+from scb.tenants import databases
+
+
+class Command(BaseCommand):
+    help = "Převede řádky ExtractedRow do kompaktního ExtractedTable.row_data a původní řádky smaže."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Počet tabulek na jednu transakci.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        converted = 0
+        for db in databases():  # s TENANT_DATABASES i soubory všech vlastníků
+            qs = ExtractedTable.objects.using(db).filter(row_data__isnull=True).order_by("id")
+            while True:
+                tables = list(qs[:batch_size].prefetch_related("rows"))
+                if not tables:
+                    break
+                with transaction.atomic(using=db):
+                    for table in tables:
+                        table.set_rows(
+                            {"code": r.code or "", "label": r.label or "", "value": r.value, "section": r.section}
+                            for r in sorted(table.rows.all(), key=lambda r: r.id)
+                        )
+                        table.save(update_fields=["row_data", "meta"])
+                    ExtractedRow.objects.using(db).filter(table__in=tables).delete()
+                converted += len(tables)
+        self.stdout.write(self.style.SUCCESS(f"Převedeno {converted} tabulek."))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ingestion.synthetic import clear, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Vygeneruje syntetické uživatele s výsledovkami a rozvahami (Document, ExtractedTable, "
+        "FinancialMetric vč. dopočítaných) pro zátěžové testy. Zapisuje přes bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="Počet uživatelů (firem).")
+        parser.add_argument("--years", type=int, default=5, help="Počet let na uživatele.")
+        parser.add_argument("--start-year", type=int, help="První rok (výchozí: tak, aby poslední byl loňský).")
+        parser.add_argument("--prefix", default="synthetic", help="Prefix username syntetických uživatelů.")
+        parser.add_argument("--seed", type=int, help="Seed generátoru (opakovatelná data).")
+        parser.add_argument("--batch-users", type=int, default=50, help="Uživatelů na jednu transakci.")
+        parser.add_argument(
+            "--legacy-rows", action="store_true",
+            help="Řádky tabulek uložit jako ExtractedRow (starý formát) místo row_data.",
+        )
+        parser.add_argument("--clear", action="store_true", help="Nejdřív smazat dříve vygenerované uživatele.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            removed = clear(options["prefix"])
+            self.stdout.write(f"Smazáno {removed} syntetických uživatelů.")
+
+        years = options["years"]
+        start_year = options["start_year"] or timezone.now().year - years
+        started = time.monotonic()
+
+        def progress(counts):
+            self.stdout.write(
+                f"  {counts['users']}/{options['users']} uživatelů, {counts['metrics']} metrik "
+                f"({time.monotonic() - started:.1f} s)"
+            )
+
+        counts = generate(
+            options["users"], years, start_year,
+            prefix=options["prefix"],
+            seed=options["seed"],
+            batch_users=options["batch_users"],
+            legacy_rows=options["legacy_rows"],
+            progress=progress if options["verbosity"] >= 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Hotovo za {time.monotonic() - started:.1f} s: {counts['users']} uživatelů, "
+            f"{counts['documents']} dokumentů, {counts['rows']} řádků tabulek, {counts['metrics']} metrik."
+        ))
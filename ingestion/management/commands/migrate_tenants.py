@@ -0,0 +1,35 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from scb import tenants
+
+
+class Command(BaseCommand):
+    help = (
+        "Spustí migrate nad hlavní databází a postupně nad SQLite soubory všech vlastníků "
+        "(TENANT_DATABASES, viz scb.tenants). Argumenty app_label / migration_name jako u migrate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("app_label", nargs="?", help="Migrovat jen tuto aplikaci.")
+        parser.add_argument("migration_name", nargs="?", help="Cílová migrace (jako u migrate).")
+        parser.add_argument("--owner", type=int, action="append", help="Jen soubor tohoto vlastníka (id, lze opakovat).")
+        parser.add_argument("--skip-default", action="store_true", help="Hlavní databázi nemigrovat.")
+
+    def handle(self, *args, **options):
+        if not tenants.enabled():
+            raise CommandError("TENANT_DATABASES je vypnuté – použijte manage.py migrate.")
+        positional = [a for a in (options["app_label"], options["migration_name"]) if a]
+        verbosity = options["verbosity"]
+
+        aliases = [] if options["skip_default"] else [DEFAULT_DB_ALIAS]
+        aliases += [tenants.tenant_alias(owner) for owner in options["owner"] or tenants.owner_ids()]
+        for alias in aliases:
+            if verbosity >= 1:
+                self.stdout.write(f"Migrace {alias} …")
+            call_command(
+                "migrate", *positional, database=alias, interactive=False,
+                verbosity=max(0, verbosity - 1), stdout=self.stdout,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Zmigrováno {len(aliases)} databází."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="financialmetric",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="financial_metrics",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="financialmetric",
+            index=models.Index(
+                fields=["owner", "year", "derived_key", "is_derived"],
+                name="ingestion_f_owner_i_8ebc2a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="financialmetric",
+            index=models.Index(
+                fields=["owner", "year", "code"], name="ingestion_f_owner_i_9a8c29_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owner(apps, schema_editor):
+    """Doplní FinancialMetric.owner z Document.owner (jeden UPDATE)."""
+    db_alias = schema_editor.connection.alias  # i při migrate_tenants do souboru vlastníka
+    Document = apps.get_model("ingestion", "Document")
+    FinancialMetric = apps.get_model("ingestion", "FinancialMetric")
+    owner_sq = Document.objects.using(db_alias).filter(pk=OuterRef("document_id")).values("owner_id")[:1]
+    FinancialMetric.objects.using(db_alias).filter(owner__isnull=True).update(owner_id=Subquery(owner_sq))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0002_financialmetric_owner_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+    ]
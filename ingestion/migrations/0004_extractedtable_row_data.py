@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0003_backfill_financialmetric_owner"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractedtable",
+            name="row_data",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
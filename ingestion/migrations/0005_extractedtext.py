@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0004_extractedtable_row_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExtractedText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64)),
+                ("backend", models.CharField(max_length=32)),
+                ("page_count", models.PositiveIntegerField(default=0)),
+                ("data", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("sha256", "backend"),
+                        name="extractedtext_sha256_backend_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
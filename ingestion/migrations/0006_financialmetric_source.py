@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0005_extractedtext"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="financialmetric",
+            name="source",
+            field=models.CharField(
+                choices=[
+                    ("reported", "Výkaz daného roku"),
+                    ("prior_period", "Minulé období z výkazu dalšího roku"),
+                ],
+                default="reported",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0006_financialmetric_source"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="ico",
+            field=models.CharField(
+                blank=True, default="", max_length=8, verbose_name="IČO"
+            ),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from __future__ import annotations
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
+from typing import NamedTuple, Optional
+import json
 import os
+import zlib
 
 def _delete_file(path: str):
     try:
@@ -22,6 +25,8 @@ class Document(models.Model):
         db_index=True,
     )
     notes = models.TextField(blank=True, null=True)
+    # IČO účetní jednotky rozpoznané z první stránky při uploadu (ingestion.classify), "" = nerozpoznáno
+    ico = models.CharField("IČO", max_length=8, blank=True, default="")
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="documents")
 
     class Meta:
@@ -33,11 +38,23 @@ class Document(models.Model):
         return f"{self.original_filename} ({self.year}, {self.doc_type})"
 
     def delete(self, *args, **kwargs):
-        # smazat soubor z úložiště
+        # smazat soubor z úložiště – až po commitu (při rollbacku soubor zůstane)
         path = getattr(self.file, "path", None)
-        super().delete(*args, **kwargs)
+        result = super().delete(*args, **kwargs)
         if path:
-            _delete_file(path)
+            transaction.on_commit(lambda: _delete_file(path), using=self._state.db)
+        return result
+
+# Pořadí sloupců v kompaktním (sloupcovém) uložení řádků tabulky
+ROW_FIELDS = ("code", "label", "value", "section", "prior_value")
+
+class CompactRow(NamedTuple):
+    """Lehký řádek z ExtractedTable.row_data (stejné atributy jako ExtractedRow + hodnota minulého období)."""
+    code: str
+    label: str
+    value: Optional[float]
+    section: Optional[str]
+    prior_value: Optional[float] = None
 
 class ExtractedTable(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="tables")
@@ -46,11 +63,32 @@ class ExtractedTable(models.Model):
     method = models.CharField(max_length=50, default="gpt-4o-mini")
     columns = models.JSONField(default=list)
     meta = models.JSONField(default=dict, blank=True)
+    # řádky jako paralelní pole {"code": [...], "label": [...], ...}, zlib-komprimovaný JSON;
+    # None = starší tabulka, jejíž řádky jsou v ExtractedRow
+    row_data = models.BinaryField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [models.Index(fields=["document", "page_number"])]
 
+    def set_rows(self, rows) -> None:
+        """Zabalí list dictů (code/label/value/section) do row_data. Neukládá."""
+        rows = list(rows)
+        columns = {f: [r.get(f) for r in rows] for f in ROW_FIELDS}
+        payload = json.dumps(columns, ensure_ascii=False, separators=(",", ":"))
+        self.row_data = zlib.compress(payload.encode("utf-8"))
+        self.meta = {**(self.meta or {}), "rows": len(rows), "storage": "columnar"}
+
+    def iter_rows(self):
+        """Líně vrací řádky tabulky – CompactRow z row_data, jinak ExtractedRow."""
+        if self.row_data is None:
+            yield from self.rows.all()
+            return
+        columns = json.loads(zlib.decompress(bytes(self.row_data)))
+        count = len(columns["code"])
+        # starší row_data nemají všechny sloupce (prior_value) – doplní se None
+        yield from (CompactRow(*vals) for vals in zip(*(columns.get(f) or [None] * count for f in ROW_FIELDS)))
+
 class ExtractedRow(models.Model):
     table = models.ForeignKey(ExtractedTable, on_delete=models.CASCADE, related_name="rows")
     code = models.CharField(max_length=50, null=True, blank=True, db_index=True)
@@ -70,12 +108,25 @@ class ExtractedRow(models.Model):
 # Normalizovaná tabulka (přepsaná) – klíčem je VŽDY číslo řádku (code)
 class FinancialMetric(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="metrics")
+    # denormalizovaný vlastník dokumentu – dashboardy filtrují bez JOINu na Document
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="financial_metrics",
+        null=True, blank=True,
+    )
     code = models.CharField(max_length=50, db_index=True)     # číslo řádku (např. "001", "02", "IV")
     label = models.CharField(max_length=255, blank=True, default="")  # původní label z řádku
     value = models.FloatField(null=True, blank=True)
     year = models.PositiveIntegerField(null=True, blank=True, db_index=True)
     is_derived = models.BooleanField(default=False)           # True = dopočítaná metrika
     derived_key = models.CharField(max_length=100, blank=True, default="")  # např. "gross_margin"
+    # původ hodnoty: výkaz daného roku, nebo srovnávací sloupec (minulé období) výkazu roku year + 1
+    SOURCE_REPORTED = "reported"
+    SOURCE_PRIOR_PERIOD = "prior_period"
+    source = models.CharField(
+        max_length=20,
+        choices=[(SOURCE_REPORTED, "Výkaz daného roku"), (SOURCE_PRIOR_PERIOD, "Minulé období z výkazu dalšího roku")],
+        default=SOURCE_REPORTED,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -84,9 +135,46 @@ class FinancialMetric(models.Model):
             models.Index(fields=["year"]),
             models.Index(fields=["is_derived"]),
             models.Index(fields=["derived_key"]),
+            # přístupové vzory dashboardů (derived klíče / raw kódy za rok)
+            models.Index(fields=["owner", "year", "derived_key", "is_derived"]),
+            models.Index(fields=["owner", "year", "code"]),
         ]
 
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.document_id is not None:
+            self.owner_id = Document.objects.db_manager(self._state.db).filter(pk=self.document_id).values_list("owner_id", flat=True).first()
+        super().save(*args, **kwargs)
+
     def __str__(self):
+        prior = " [PRIOR]" if self.source == self.SOURCE_PRIOR_PERIOD else ""
         if self.is_derived:
-            return f"[DERIVED] {self.derived_key}={self.value} ({self.year})"
-        return f"{self.code}={self.value} ({self.year})"
+            return f"[DERIVED] {self.derived_key}={self.value} ({self.year}){prior}"
+        return f"{self.code}={self.value} ({self.year}){prior}"
+
+class ExtractedText(models.Model):
+    """
+    Cache extrahovaného textu PDF podle SHA-256 obsahu souboru a backendu extrakce –
+    opakované zpracování (nový prompt, model, vzorce) už PDF neparsuje. Viz ingestion.extraction.
+    """
+    sha256 = models.CharField(max_length=64)
+    backend = models.CharField(max_length=32)
+    page_count = models.PositiveIntegerField(default=0)
+    # zlib-komprimovaný JSON {"pages": [text stránky, ...], "words": [[[x0, top, x1, bottom, text], ...], ...]}
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sha256", "backend"], name="extractedtext_sha256_backend_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.backend}, {self.page_count} str.)"
+
+    @staticmethod
+    def pack(pages, words) -> bytes:
+        payload = json.dumps({"pages": pages, "words": words}, ensure_ascii=False, separators=(",", ":"))
+        return zlib.compress(payload.encode("utf-8"))
+
+    def unpack(self) -> dict:
+        return json.loads(zlib.decompress(bytes(self.data)))
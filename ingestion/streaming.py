@@ -0,0 +1,60 @@
+"""
+Inkrementální parsování JSON odpovědi modelu během streamování.
+
+Model vrací {"rows": [{...}, {...}, ...]} (případně rovnou pole). RowStreamParser
+dostává text po kouscích, jak chodí ze streamu, a vrací řádky (objekty v poli
+řádků) hned, jak se jejich "}" uzavře – nemusí se čekat na konec odpovědi.
+Řetězce a escapy se sledují, takže závorky v labelu parser nezmatou.
+"""
+import json
+from typing import Any, Dict, List
+
+
+class RowStreamParser:
+    def __init__(self):
+        self._buffer: List[str] = []  # text rozpracovaného řádku
+        self._stack: List[str] = []   # otevřené kontejnery "{" / "["
+        self._in_string = False
+        self._escape = False
+        self.rows = 0
+        self.skipped = 0              # uzavřené řádky, které nešly naparsovat
+
+    def _row_depth(self) -> bool:
+        # řádek = objekt přímo v poli, které je kořenem nebo leží v kořenovém objektu
+        return len(self._stack) in (1, 2) and self._stack[-1] == "["
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Zpracuje další kus textu; vrací řádky, které se v něm uzavřely."""
+        done = []
+        for ch in chunk:
+            collecting = bool(self._buffer)
+            if collecting:
+                self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and not collecting and self._row_depth():
+                    self._buffer.append(ch)
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and collecting and self._row_depth():
+                    text, self._buffer = "".join(self._buffer), []
+                    try:
+                        row = json.loads(text)
+                    except ValueError:
+                        self.skipped += 1
+                        continue
+                    if isinstance(row, dict):
+                        self.rows += 1
+                        done.append(row)
+        return done
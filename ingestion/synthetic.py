@@ -0,0 +1,255 @@
+"""
+Syntetická data pro zátěžové a škálovací testy (viz manage.py generate_synthetic_data).
+
+Výkazy kopírují strukturu, se kterou počítá DERIVED_FORMULAS: výsledovka má
+dvoumístné kódy řádků ("01"…), rozvaha trojmístné ("001"…, aktiva do ř. 077,
+pasiva od ř. 078). Řádky z DERIVED_FORMULAS dostanou hodnoty odvozené od
+velikosti firmy (tržby rostou meziročně), ostatní řádky jsou výplň. Dopočítané
+metriky se ukládají stejně jako v pipeline (compute_derived + DERIVED_LABELS).
+Uživatelé, dokumenty a tabulky jdou přes bulk_create; metriky a řádky (miliony
+záznamů) přímo přes executemany – vytváření modelových instancí by bylo
+několikanásobně pomalejší než samotný zápis. Zapisuje se po dávkách uživatelů.
+"""
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from scb.tenants import db_for
+
+from .models import Document, ExtractedRow, ExtractedTable, FinancialMetric
+from .utils import DERIVED_FORMULAS, DERIVED_LABELS, compute_derived
+
+INCOME_LABELS = {
+    "01": "Tržby z prodeje výrobků a služeb",
+    "02": "Tržby za prodej zboží",
+    "04": "Náklady vynaložené na prodané zboží",
+    "05": "Spotřeba materiálu a energie",
+    "12": "Osobní náklady",
+    "13": "Daně a poplatky",
+    "15": "Jiné provozní výnosy",
+    "16": "Ostatní provozní náklady",
+    "17": "Úpravy hodnot – odpisy",
+    "18": "Ostatní náklady",
+    "20": "Výnosové úroky a podobné výnosy",
+    "21": "Nákladové úroky a podobné náklady",
+    "40": "Daň z příjmů",
+}
+
+BALANCE_LABELS = {
+    "055": "Materiál",
+    "056": "Nedokončená výroba a polotovary",
+    "057": "Výrobky a zboží",
+    "065": "Pohledávky z obchodních vztahů – dlouhodobé",
+    "066": "Pohledávky z obchodních vztahů – krátkodobé",
+    "105": "Závazky z obchodních vztahů – dlouhodobé",
+    "106": "Závazky z obchodních vztahů – krátkodobé",
+}
+
+# počet řádků výkazu (kódy 01..N / 001..N)
+STATEMENT_ROWS = {"income": 55, "balance": 140}
+
+# poslední řádek aktiv v rozvaze
+LAST_ASSET_CODE = 77
+
+# podíl na tržbách (min, max) pro řádky, se kterými počítají vzorce
+_INCOME_SHARES = {
+    "05": (0.20, 0.35),
+    "12": (0.15, 0.25),
+    "13": (0.005, 0.015),
+    "15": (0.0, 0.02),
+    "16": (0.01, 0.03),
+    "17": (0.02, 0.05),
+    "18": (0.005, 0.02),
+    "20": (0.0, 0.004),
+    "21": (0.001, 0.01),
+}
+_BALANCE_SHARES = {
+    "055": (0.01, 0.03),
+    "056": (0.0, 0.02),
+    "057": (0.01, 0.04),
+    "065": (0.0, 0.02),
+    "066": (0.05, 0.12),
+    "105": (0.0, 0.02),
+    "106": (0.04, 0.09),
+}
+
+TAX_RATE = 0.19
+
+
+def _code(doc_type: str, number: int) -> str:
+    return f"{number:02d}" if doc_type == "income" else f"{number:03d}"
+
+
+def _label(doc_type: str, code: str) -> str:
+    labels = INCOME_LABELS if doc_type == "income" else BALANCE_LABELS
+    return labels.get(code, f"Řádek {code}")
+
+
+def _section(doc_type: str, code: str) -> Optional[str]:
+    if doc_type != "balance":
+        return None
+    return "asset" if int(code) <= LAST_ASSET_CODE else "liability"
+
+
+def statement_values(doc_type: str, revenue: float, rng: random.Random) -> Dict[str, float]:
+    """Kód řádku -> hodnota pro jeden výkaz firmy s danými tržbami."""
+    values: Dict[str, float] = {}
+    for number in range(1, STATEMENT_ROWS[doc_type] + 1):
+        values[_code(doc_type, number)] = round(revenue * rng.uniform(0.0, 0.05))
+
+    if doc_type == "income":
+        goods_share = rng.uniform(0.1, 0.5)
+        values["01"] = round(revenue * (1 - goods_share))
+        values["02"] = round(revenue * goods_share)
+        values["04"] = round(values["02"] * rng.uniform(0.6, 0.85))
+        for code, (lo, hi) in _INCOME_SHARES.items():
+            values[code] = round(revenue * rng.uniform(lo, hi))
+        # daň z kladného zisku před zdaněním
+        values["40"] = 0.0
+        net = compute_derived(values, "income")["net_profit"] or 0.0
+        values["40"] = round(max(net, 0.0) * TAX_RATE)
+    else:
+        for code, (lo, hi) in _BALANCE_SHARES.items():
+            values[code] = round(revenue * rng.uniform(lo, hi))
+    return values
+
+
+def statement_rows(doc_type: str, values: Dict[str, float]) -> List[dict]:
+    """Řádky výkazu ve tvaru, jaký vrací parse_pdf_with_gpt (code/label/value/section)."""
+    return [
+        {"code": c, "label": _label(doc_type, c), "value": v, "section": _section(doc_type, c)}
+        for c, v in values.items()
+    ]
+
+
+METRIC_FIELDS = (
+    "document", "owner", "code", "label", "value", "year", "is_derived", "derived_key", "source", "created_at",
+)
+ROW_FIELDS = ("table", "code", "label", "value", "section", "raw_data", "created_at")
+
+
+def _insert(model, fields, rows: List[tuple], batch_size: int = 5000, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Hromadný INSERT n-tic (v pořadí `fields`) bez vytváření instancí modelu."""
+    connection = connections[using]
+    meta = model._meta
+    columns = ", ".join(connection.ops.quote_name(meta.get_field(f).column) for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    sql = f"INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columns}) VALUES ({placeholders})"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+REPORTED = FinancialMetric.SOURCE_REPORTED
+
+
+def _metric_rows(doc: Document, values: Dict[str, float], created_at) -> List[tuple]:
+    rows = [
+        (doc.pk, doc.owner_id, code, _label(doc.doc_type, code), value, doc.year, False, "", REPORTED, created_at)
+        for code, value in values.items()
+    ]
+    derived = compute_derived(values, doc.doc_type)
+    rows.extend(
+        (doc.pk, doc.owner_id, "", label, derived[key], doc.year, True, key, REPORTED, created_at)
+        for key, label in DERIVED_LABELS.items()
+        if derived[key] is not None
+    )
+    return rows
+
+
+def _write_statements(db: str, plans: list, legacy_rows: bool):
+    """Dokumenty, tabulky (případně ExtractedRow) a metriky plánu do databáze `db`."""
+    Document.objects.using(db).bulk_create([doc for doc, _ in plans])
+
+    tables = []
+    for doc, values in plans:
+        table = ExtractedTable(document=doc, method="synthetic", columns=["code", "label", "value"])
+        if not legacy_rows:
+            table.set_rows(statement_rows(doc.doc_type, values))
+        tables.append(table)
+    ExtractedTable.objects.using(db).bulk_create(tables)
+
+    created_at = connections[db].ops.adapt_datetimefield_value(timezone.now())
+    if legacy_rows:
+        _insert(ExtractedRow, ROW_FIELDS, [
+            (table.pk, c, _label(doc.doc_type, c), v, _section(doc.doc_type, c), "{}", created_at)
+            for table, (doc, values) in zip(tables, plans)
+            for c, v in values.items()
+        ], using=db)
+
+    metrics = [row for doc, values in plans for row in _metric_rows(doc, values, created_at)]
+    _insert(FinancialMetric, METRIC_FIELDS, metrics, using=db)
+    return tables, metrics
+
+
+def generate(
+    users: int,
+    years: int,
+    start_year: int,
+    *,
+    prefix: str = "synthetic",
+    seed: Optional[int] = None,
+    batch_users: int = 50,
+    legacy_rows: bool = False,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Vytvoří `users` uživatelů (<prefix>_0001…) a každému výsledovku + rozvahu
+    za `years` let od `start_year`. legacy_rows=True uloží řádky tabulek jako
+    ExtractedRow (starý formát) místo row_data. Vrací počty vytvořených záznamů.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    counts = {"users": 0, "documents": 0, "tables": 0, "rows": 0, "metrics": 0}
+    doc_types = [t for t in ("income", "balance") if t in DERIVED_FORMULAS]
+
+    for first in range(0, users, batch_users):
+        numbers = range(first + 1, min(first + batch_users, users) + 1)
+        with transaction.atomic():
+            batch = User.objects.bulk_create([User(username=f"{prefix}_{n:04d}", password="!") for n in numbers])
+
+            plans = []  # (Document, hodnoty řádků)
+            for user in batch:
+                revenue = rng.lognormvariate(16.5, 1.0)  # medián ~15 mil. Kč
+                for year in range(start_year, start_year + years):
+                    for doc_type in doc_types:
+                        doc = Document(
+                            file=f"synthetic/{user.username}/{year}-{doc_type}.pdf",
+                            original_filename=f"{year}-{doc_type}.pdf",
+                            owner=user, year=year, doc_type=doc_type, notes="synthetic",
+                        )
+                        plans.append((doc, statement_values(doc_type, revenue, rng)))
+                    revenue *= max(0.5, rng.gauss(1.05, 0.12))
+            # s TENANT_DATABASES jdou data každého uživatele do jeho souboru (scb.tenants)
+            by_db: Dict[str, list] = defaultdict(list)
+            for doc, values in plans:
+                by_db[db_for(doc.owner_id)].append((doc, values))
+            tables, metrics = [], []
+            for db, db_plans in by_db.items():
+                with transaction.atomic(using=db):
+                    db_tables, db_metrics = _write_statements(db, db_plans, legacy_rows)
+                tables += db_tables
+                metrics += db_metrics
+
+        counts["users"] += len(batch)
+        counts["documents"] += len(plans)
+        counts["tables"] += len(tables)
+        counts["rows"] += sum(len(values) for _, values in plans)
+        counts["metrics"] += len(metrics)
+        if progress:
+            progress(counts)
+    return counts
+
+
+def clear(prefix: str = "synthetic") -> int:
+    """Smaže syntetické uživatele (a kaskádou jejich data). Vrací počet smazaných uživatelů."""
+    users = get_user_model().objects.filter(username__startswith=f"{prefix}_")
+    count = users.count()
+    users.delete()
+    return count
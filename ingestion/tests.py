@@ -0,0 +1,627 @@
+import io
+import json
+import os
+import tempfile
+import zlib
+from unittest import mock, skipIf
+
+import openai
+import pypdfium2
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from benchmarks.fake_openai import FakeOpenAI, patch_clients
+
+from . import classify, extraction
+from .models import Document, ExtractedRow, ExtractedTable, ExtractedText, FinancialMetric
+from .streaming import RowStreamParser
+from .synthetic import STATEMENT_ROWS
+from .utils import (
+    DERIVED_LABELS, affected_derived_keys, compute_derived, document_code_map, metrics_cache_version,
+    recalculate_derived,
+)
+from .views import (
+    STREAM_BATCH_SIZE, _process_document, _replace_document, calculate_and_store_derived, extract_text_from_pdf,
+    rewrite_to_metrics,
+)
+
+
+def _index_name(fields):
+    for idx in FinancialMetric._meta.indexes:
+        if list(idx.fields) == fields:
+            return idx.name
+    raise AssertionError(f"Index {fields} neexistuje")
+
+
+class FinancialMetricOwnerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        self.other = User.objects.create_user("other", password="x")
+        for user in (self.user, self.other):
+            for year in (2021, 2022, 2023):
+                doc = Document.objects.create(
+                    file="documents/test.pdf", original_filename="test.pdf",
+                    owner=user, year=year, doc_type="income",
+                )
+                FinancialMetric.objects.bulk_create([
+                    FinancialMetric(document=doc, owner=user, code=c, value=100.0, year=year)
+                    for c in ("01", "02", "04", "05", "12", "17", "20", "21", "40")
+                ])
+                calculate_and_store_derived(doc)
+
+    def test_owner_populated_on_write(self):
+        doc = Document.objects.filter(owner=self.user).first()
+        metric = FinancialMetric.objects.create(document=doc, code="99", value=1.0, year=doc.year)
+        self.assertEqual(metric.owner_id, self.user.id)
+        self.assertFalse(FinancialMetric.objects.filter(owner__isnull=True).exists())
+
+    def test_rewrite_to_metrics_sets_owner(self):
+        doc = Document.objects.filter(owner=self.other).first()
+        rewrite_to_metrics(doc)
+        calculate_and_store_derived(doc)
+        self.assertTrue(FinancialMetric.objects.filter(document=doc, is_derived=True).exists())
+        self.assertEqual(
+            set(FinancialMetric.objects.filter(document=doc).values_list("owner_id", flat=True)),
+            {self.other.id},
+        )
+
+    def test_derived_lookup_uses_composite_index(self):
+        qs = FinancialMetric.objects.filter(owner=self.user, year=2022, is_derived=True, derived_key="revenue")
+        plan = qs.explain()
+        self.assertIn(_index_name(["owner", "year", "derived_key", "is_derived"]), plan)
+        self.assertNotIn("ingestion_document", plan)
+
+    def test_raw_code_lookup_uses_composite_index(self):
+        qs = FinancialMetric.objects.filter(
+            owner=self.user, year=2022, is_derived=False, code__in=["20", "21"]
+        ).values_list("value", flat=True)
+        self.assertIn(_index_name(["owner", "year", "code"]), qs.explain())
+
+
+SAMPLE_ROWS = [
+    {"code": "01", "label": "Tržby z prodeje výrobků a služeb", "value": 1000.0, "section": None},
+    {"code": "02", "label": "Tržby za prodej zboží", "value": 500.0, "section": None},
+    {"code": "04", "label": "Náklady vynaložené na prodané zboží", "value": 300.0, "section": None},
+    {"code": "", "label": "Bez kódu", "value": None, "section": None},
+]
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ColumnarRowStorageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+
+    def test_set_rows_round_trip(self):
+        table = ExtractedTable()
+        table.set_rows(SAMPLE_ROWS)
+        self.assertEqual(table.meta["rows"], 4)
+        self.assertEqual([r._asdict() for r in table.iter_rows()], [{**r, "prior_value": None} for r in SAMPLE_ROWS])
+
+    def test_row_data_without_prior_column(self):
+        table = ExtractedTable()
+        columns = {f: [r[f] for r in SAMPLE_ROWS] for f in ("code", "label", "value", "section")}
+        table.row_data = zlib.compress(json.dumps(columns).encode("utf-8"))
+        self.assertEqual([(r.code, r.prior_value) for r in table.iter_rows()], [(r["code"], None) for r in SAMPLE_ROWS])
+
+    def test_process_document_writes_single_table_without_row_records(self):
+        pdf = SimpleUploadedFile("vykaz.pdf", b"%PDF-1.4", content_type="application/pdf")
+        with mock.patch("ingestion.views.parse_pdf_with_gpt", return_value=SAMPLE_ROWS):
+            self.assertEqual(_process_document(pdf, self.user, 2023, "income"), 1)
+
+        table = ExtractedTable.objects.get()
+        self.assertFalse(ExtractedRow.objects.exists())
+        self.assertEqual([r.code for r in table.iter_rows()], ["01", "02", "04", ""])
+        revenue = FinancialMetric.objects.get(owner=self.user, derived_key="revenue")
+        self.assertEqual(revenue.value, 1500.0)
+        self.assertEqual(FinancialMetric.objects.filter(is_derived=False).count(), 3)
+
+    def test_compact_command_converts_legacy_rows(self):
+        doc = Document.objects.create(
+            file="documents/test.pdf", original_filename="test.pdf",
+            owner=self.user, year=2022, doc_type="income",
+        )
+        table = ExtractedTable.objects.create(document=doc)
+        ExtractedRow.objects.bulk_create([
+            ExtractedRow(table=table, code=r["code"], label=r["label"], value=r["value"], raw_data=r)
+            for r in SAMPLE_ROWS
+        ])
+        legacy = [(r.code, r.value) for r in table.iter_rows()]
+
+        call_command("compact_extracted_rows", stdout=mock.MagicMock())
+
+        table.refresh_from_db()
+        self.assertFalse(ExtractedRow.objects.exists())
+        self.assertEqual([(r.code, r.value) for r in table.iter_rows()], legacy)
+
+
+class IncrementalRecalculationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        self.doc = Document.objects.create(
+            file="documents/test.pdf", original_filename="test.pdf",
+            owner=self.user, year=2023, doc_type="income",
+        )
+        FinancialMetric.objects.bulk_create([
+            FinancialMetric(document=self.doc, owner=self.user, code=c, value=v, year=2023)
+            for c, v in (("01", 1000.0), ("04", 400.0), ("12", 200.0), ("20", 50.0), ("40", 30.0))
+        ])
+        calculate_and_store_derived(self.doc)
+
+    def _derived(self):
+        return dict(
+            FinancialMetric.objects.filter(document=self.doc, is_derived=True).values_list("derived_key", "value")
+        )
+
+    def test_dependency_graph(self):
+        self.assertEqual(affected_derived_keys("income", ["40"]), {"net_profit", "net_profit_pct"})
+        self.assertEqual(
+            affected_derived_keys("income", ["12"]),
+            {"overheads", "ebit", "net_profit", "operating_profit_pct", "net_profit_pct"},
+        )
+        self.assertEqual(
+            affected_derived_keys("income", ["01"]),
+            set(DERIVED_LABELS) - {"cogs", "overheads"},
+        )
+        self.assertEqual(affected_derived_keys("income", ["99"]), set())
+        self.assertEqual(affected_derived_keys("balance", ["055"]), set())
+
+    def test_incremental_matches_full_recalculation(self):
+        untouched = FinancialMetric.objects.get(document=self.doc, derived_key="gross_margin").pk
+        version = metrics_cache_version(self.user.id)
+
+        FinancialMetric.objects.filter(document=self.doc, code="40").update(value=130.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = recalculate_derived(self.doc, ["40"])
+        incremental = self._derived()
+
+        self.assertEqual(changed, {"net_profit": 320.0, "net_profit_pct": 32.0})
+        self.assertEqual(FinancialMetric.objects.get(document=self.doc, derived_key="gross_margin").pk, untouched)
+        self.assertGreater(metrics_cache_version(self.user.id), version)
+
+        calculate_and_store_derived(self.doc)
+        self.assertEqual(incremental, self._derived())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DocumentReplacementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+
+    def _document_with_rows(self, rows):
+        doc = Document.objects.create(
+            file=SimpleUploadedFile("stary.pdf", b"%PDF-1.4"), original_filename="stary.pdf",
+            owner=self.user, year=2022, doc_type="income",
+        )
+        table = ExtractedTable.objects.create(document=doc)
+        ExtractedRow.objects.bulk_create(
+            [ExtractedRow(table=table, code=str(i), value=float(i)) for i in range(rows)], batch_size=500
+        )
+        FinancialMetric.objects.bulk_create(
+            [FinancialMetric(document=doc, owner=self.user, code=str(i), value=float(i), year=2022) for i in range(rows)],
+            batch_size=500,
+        )
+        return doc
+
+    def _delete_queries(self, doc):
+        with CaptureQueriesContext(connection) as ctx:
+            doc.delete()
+        return len(ctx.captured_queries)
+
+    def test_delete_query_count_does_not_grow_with_rows(self):
+        self.assertEqual(
+            self._delete_queries(self._document_with_rows(10)),
+            self._delete_queries(self._document_with_rows(3000)),
+        )
+        self.assertFalse(ExtractedRow.objects.exists())
+        self.assertFalse(FinancialMetric.objects.exists())
+
+    def test_file_removed_only_after_commit(self):
+        doc = self._document_with_rows(1)
+        path = doc.file.path
+        with self.captureOnCommitCallbacks() as callbacks:
+            doc.delete()
+            self.assertTrue(os.path.exists(path))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.exists(path))
+
+    def test_replace_processes_new_document_before_removing_old(self):
+        old = self._document_with_rows(5)
+        seen = []
+
+        def parse(path, doc_type, meta=None):
+            seen.append(Document.objects.filter(pk=old.pk).exists())
+            return SAMPLE_ROWS
+
+        pdf = SimpleUploadedFile("novy.pdf", b"%PDF-1.4")
+        with mock.patch("ingestion.views.parse_pdf_with_gpt", side_effect=parse):
+            self.assertEqual(_replace_document(pdf, self.user, 2022, "income"), 1)
+
+        self.assertEqual(seen, [True])
+        self.assertEqual(list(Document.objects.values_list("original_filename", flat=True)), ["novy.pdf"])
+        self.assertEqual(FinancialMetric.objects.get(derived_key="revenue").value, 1500.0)
+
+
+class SyntheticDataTests(TestCase):
+    def test_generates_consistent_statements(self):
+        out = io.StringIO()
+        call_command("generate_synthetic_data", users=2, years=3, start_year=2020, seed=7, stdout=out)
+
+        self.assertEqual(User.objects.filter(username__startswith="synthetic_").count(), 2)
+        self.assertEqual(Document.objects.count(), 2 * 3 * 2)
+        table = ExtractedTable.objects.select_related("document").filter(document__doc_type="balance").first()
+        rows = list(table.iter_rows())
+        self.assertEqual(len(rows), table.meta["rows"])
+        self.assertEqual({r.section for r in rows}, {"asset", "liability"})
+
+        doc = Document.objects.filter(doc_type="income").first()
+        stored = dict(
+            FinancialMetric.objects.filter(document=doc, is_derived=True).values_list("derived_key", "value")
+        )
+        expected = compute_derived(document_code_map(doc), "income")
+        self.assertEqual(stored.keys(), DERIVED_LABELS.keys())
+        for key, value in stored.items():
+            self.assertAlmostEqual(value, expected[key])
+        self.assertGreater(stored["revenue"], 0)
+        self.assertEqual(set(FinancialMetric.objects.values_list("owner_id", flat=True)),
+                         set(Document.objects.values_list("owner_id", flat=True)))
+
+    def test_legacy_rows_and_clear(self):
+        call_command("generate_synthetic_data", users=1, years=1, legacy_rows=True, stdout=io.StringIO())
+        self.assertTrue(ExtractedTable.objects.filter(row_data__isnull=True).exists())
+        self.assertEqual(ExtractedRow.objects.count(), sum(STATEMENT_ROWS.values()))
+
+        call_command("generate_synthetic_data", users=1, years=1, clear=True, stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(ExtractedRow.objects.count(), 0)
+
+
+SAMPLE_PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "media", "documents")
+
+
+def _sample_pdf(prefix):
+    for root, _, files in os.walk(SAMPLE_PDF_DIR):
+        for name in sorted(files):
+            if name.startswith(prefix):
+                return os.path.join(root, name)
+    raise AssertionError(f"Ukázkové PDF {prefix}* chybí")
+
+
+class ExtractionBackendTests(TestCase):
+    def test_backends_recover_statement_rows(self):
+        path = _sample_pdf("Vykaz")
+        for name in ("pdfplumber", "pypdfium2", "auto"):
+            with self.subTest(backend=name):
+                text = extraction.extract_text(path, name)
+                lines = extraction.row_lines(text)
+                self.assertGreaterEqual(len(lines), 20)
+                self.assertTrue(any(line.endswith("01 4 913 2 938") for line in lines))
+
+    @override_settings(PDF_TEXT_CACHE=False)
+    def test_setting_selects_backend(self):
+        result = extraction.Extraction(["a", "b"], [[], []])
+        with override_settings(PDF_EXTRACTION_BACKEND="pypdfium2"), \
+                mock.patch.object(extraction.PdfiumBackend, "extract", return_value=result) as pdfium:
+            self.assertEqual(extract_text_from_pdf("x.pdf"), "a\nb")
+        pdfium.assert_called_once_with("x.pdf")
+        with override_settings(PDF_EXTRACTION_BACKEND="tesseract"), self.assertRaises(ImproperlyConfigured):
+            extract_text_from_pdf("x.pdf")
+
+    @override_settings(PDF_TEXT_CACHE=False)
+    def test_auto_falls_back_when_rows_are_scattered(self):
+        scattered = extraction.Extraction(["Rozvaha\n01\n1 707"], [[]])
+        rows = extraction.Extraction(["\n".join(f"Položka {i:02d} {i} 000 1" for i in range(1, 8))], [[]])
+        with mock.patch.object(extraction.PdfiumBackend, "extract", return_value=scattered), \
+                mock.patch.object(extraction.PdfplumberBackend, "extract", return_value=rows):
+            self.assertEqual(extraction.extract("x.pdf", "auto"), rows)
+        # sken bez textové vrstvy – další backendy nepomůžou
+        empty = extraction.Extraction(["", ""], [[], []])
+        with mock.patch.object(extraction.PdfiumBackend, "extract", return_value=empty), \
+                mock.patch.object(extraction.PdfplumberBackend, "extract") as plumber:
+            self.assertEqual(extraction.extract("x.pdf", "auto"), empty)
+        plumber.assert_not_called()
+
+    def test_text_cache_reused_by_file_hash(self):
+        path = _sample_pdf("Vykaz")
+        backend = extraction.BACKENDS["pypdfium2"]
+        with mock.patch.object(extraction.PdfiumBackend, "extract", wraps=backend.extract) as parse:
+            first = extraction.extract(path, "pypdfium2")
+            with CaptureQueriesContext(connection) as ctx:
+                second = extraction.extract(path, "pypdfium2")
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(second, first)
+
+        cached = ExtractedText.objects.get(sha256=extraction.file_sha256(path), backend="pypdfium2")
+        self.assertEqual(cached.page_count, 1)
+        self.assertLess(len(bytes(cached.data)), len(zlib.decompress(bytes(cached.data))) / 2)
+        # slova se souřadnicemi – částka řádku 01 leží napravo od jeho kódu na stejném řádku
+        words = first.words[0]
+        code = next(w for w in words if w[4] == "01")
+        amount = next(w for w in words if w[4] == "913" and abs(w[1] - code[1]) < 2)
+        self.assertGreater(amount[0], code[2])
+
+        # jiný backend = samostatný záznam
+        extraction.extract(path, "pdfplumber")
+        self.assertEqual(ExtractedText.objects.count(), 2)
+
+    def test_statement_pages_skip_cover_notes_and_other_statement(self):
+        balance_rows = "\n".join(f"Položka {i:02d} {i} 000 {i}" for i in range(1, 6))
+        income_rows = "\n".join(f"Aktivace {i:02d} {i} 000 {i}" for i in range(1, 6))
+        pages = [
+            "Účetní závěrka 2022\nBusiness Laboratory s.r.o.\nIČ: 07266961",
+            "ROZVAHA v plném rozsahu\nAKTIVA\n" + balance_rows,
+            balance_rows,  # pokračování (PASIVA bez nadpisu)
+            "VÝKAZ ZISKU A ZTRÁTY\n" + income_rows,
+            "Příloha\n" + "\n".join(f"Komentář {i} k položkám" for i in range(20)) + "\nZaměstnanci 12 3\nRok 2022 15",
+        ]
+        self.assertEqual(extraction.statement_pages(pages, "balance"), [2, 3])
+        self.assertEqual(extraction.statement_pages(pages, "income"), [3, 4])
+        self.assertEqual(extraction.statement_pages(pages), [2, 3, 4])
+        # nic nevypadá jako výkaz – raději celý dokument
+        self.assertEqual(extraction.statement_pages(pages[:1] + pages[-1:], "balance"), [1, 2])
+
+    @skipIf(extraction.camelot is not None, "camelot-py je nainstalovaný")
+    def test_camelot_requires_package(self):
+        self.assertFalse(extraction.BACKENDS["camelot-lattice"].available())
+        with self.assertRaises(ImproperlyConfigured):
+            extraction.extract_pages(_sample_pdf("Vykaz"), "camelot-stream")
+
+
+class RowStreamParserTests(TestCase):
+    def test_rows_emitted_as_soon_as_they_close(self):
+        body = json.dumps({"rows": [
+            {"code": "01", "label": "Tržby {brutto} [\"A\"]", "value": 4913},
+            {"code": "03", "label": "Výkonová spotřeba", "value": None, "extra": {"a": [1, {"b": 2}]}},
+        ]}, ensure_ascii=False)
+        parser = RowStreamParser()
+        emitted = []
+        for i, ch in enumerate(body):
+            for row in parser.feed(ch):
+                emitted.append((i, row))
+
+        self.assertEqual([row for _, row in emitted], json.loads(body)["rows"])
+        # první řádek je k dispozici dřív, než dorazí konec odpovědi
+        self.assertLess(emitted[0][0], body.index('"03"'))
+
+    def test_root_array_and_broken_row(self):
+        parser = RowStreamParser()
+        rows = parser.feed('[{"code": "01", "value": 1}, {"code": 02}, ')
+        rows += parser.feed('{"code": "03", "value": 3}]')
+        self.assertEqual([r["code"] for r in rows], ["01", "03"])
+        self.assertEqual((parser.rows, parser.skipped), (2, 1))
+
+
+class FakeOpenAITests(TestCase):
+    """Pipeline přes skutečného klienta OpenAI nad benchmarks.fake_openai (bez sítě)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _upload(self, year, prefix="Vykaz"):
+        with open(_sample_pdf(prefix), "rb") as f:
+            pdf = SimpleUploadedFile("vykaz.pdf", f.read(), content_type="application/pdf")
+        return _process_document(pdf, self.user, year, "income")
+
+    def _revenue(self, year):
+        return FinancialMetric.objects.get(owner=self.user, year=year, derived_key="revenue").value
+
+    def test_synthesized_statement_is_deterministic(self):
+        with patch_clients() as fake:
+            self.assertEqual(self._upload(2022), 1)
+            self.assertEqual(self._upload(2023), 1)
+        self.assertEqual(fake.statuses, {200: 2})
+        self.assertEqual(self._revenue(2022), self._revenue(2023))
+        self.assertGreater(self._revenue(2022), 0)
+
+    def test_client_retries_rate_limit_and_server_error(self):
+        with patch_clients() as fake:
+            fake.fail_next(429)
+            fake.fail_next(500)
+            self.assertEqual(self._upload(2022), 1)
+        self.assertEqual(fake.statuses, {429: 1, 500: 1, 200: 1})
+
+    def test_error_propagates_when_retries_exhausted(self):
+        with patch_clients(max_retries=0) as fake:
+            fake.fail_next(429)
+            with self.assertRaises(openai.RateLimitError):
+                self._upload(2022)
+
+    def test_prompt_uses_statement_pages_only(self):
+        # titulní a závěrečná prázdná stránka kolem výsledovky
+        source = pypdfium2.PdfDocument(_sample_pdf("Vykaz"))
+        merged = pypdfium2.PdfDocument.new()
+        merged.new_page(595, 842).close()
+        merged.import_pages(source)
+        merged.new_page(595, 842).close()
+        buf = io.BytesIO()
+        merged.save(buf)
+        merged.close()
+        source.close()
+
+        with patch_clients():
+            _process_document(SimpleUploadedFile("zaverka.pdf", buf.getvalue()), self.user, 2022, "income")
+        table = ExtractedTable.objects.get(document__owner=self.user)
+        self.assertEqual(table.meta["pages"], [2])
+        self.assertEqual(table.meta["page_count"], 3)
+        self.assertEqual(table.page_number, 2)
+        self.assertEqual(table.meta["storage"], "columnar")
+
+    def test_streaming_ingest_matches_blocking(self):
+        with patch_clients(chunk_delay=0.005):
+            self._upload(2022)
+            with override_settings(OPENAI_STREAM_ROWS=True), CaptureQueriesContext(connection) as ctx:
+                self._upload(2023)
+
+        def metrics(year):
+            return sorted(FinancialMetric.objects.filter(owner=self.user, year=year)
+                          .values_list("is_derived", "code", "derived_key", "label", "value"))
+
+        self.assertEqual(metrics(2022), metrics(2023))
+        rows = ExtractedTable.objects.get(document__year=2022).meta["rows"]
+        stream = ExtractedTable.objects.get(document__year=2023).meta["stream"]
+        self.assertLess(stream["first_row_ms"], stream["total_ms"])
+        self.assertLessEqual(stream["first_token_ms"], stream["first_row_ms"])
+        self.assertEqual(stream["batches"], -(-rows // STREAM_BATCH_SIZE))
+        # raw metriky jdou po dávkách (žádný INSERT po řádcích)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "ingestion_financialmetric"')]
+        self.assertEqual(len(inserts), stream["batches"] + 1)  # + derived
+
+    def test_prior_period_backfills_missing_year(self):
+        def prior(year, derived=False):
+            return FinancialMetric.objects.filter(
+                owner=self.user, year=year, source=FinancialMetric.SOURCE_PRIOR_PERIOD, is_derived=derived,
+            )
+
+        with patch_clients():
+            self._upload(2024)
+            doc_2024 = Document.objects.get(year=2024)
+            rows = list(ExtractedTable.objects.get(document=doc_2024).iter_rows())
+            expected = {r.code: r.prior_value for r in rows if r.code}
+            self.assertEqual(dict(prior(2023).values_list("code", "value")), expected)
+            self.assertTrue(prior(2023).filter(document=doc_2024).exists())
+            self.assertEqual(prior(2023, derived=True).get(derived_key="revenue").value,
+                             compute_derived(expected, "income")["revenue"])
+            meta = ExtractedTable.objects.get(document=doc_2024).meta
+            self.assertEqual(meta["prior_period"], {"year": 2023, "metrics": len(expected)})
+
+            # vlastní výkaz 2023 nahradí doplněná data a sám doplní rok 2022
+            self._upload(2023)
+            self.assertFalse(FinancialMetric.objects.filter(year=2023, source=FinancialMetric.SOURCE_PRIOR_PERIOD).exists())
+            self.assertTrue(FinancialMetric.objects.filter(year=2023, source=FinancialMetric.SOURCE_REPORTED).exists())
+            self.assertTrue(prior(2022).exists())
+
+            # rok, za který výkaz existuje, se nepřepisuje
+            with open(_sample_pdf("Vykaz"), "rb") as f:
+                _replace_document(SimpleUploadedFile("vykaz.pdf", f.read()), self.user, 2024, "income")
+        self.assertFalse(prior(2023).exists())
+        self.assertEqual(FinancialMetric.objects.filter(year=2023, derived_key="revenue").count(), 1)
+
+    def test_replays_recording(self):
+        rows = [{"code": "01", "label": "Tržby", "value": 777.0}]
+        with tempfile.TemporaryDirectory() as tmp:
+            cassette = os.path.join(tmp, "openai.json")
+            recorder = FakeOpenAI(cassette=cassette)
+            with mock.patch.object(FakeOpenAI, "_upstream", return_value=json.dumps({"rows": rows})):
+                recorder.record = True
+                with patch_clients(recorder):
+                    self._upload(2022)
+
+            with patch_clients(cassette=cassette, strict=True, max_retries=0) as replay:
+                self._upload(2023)
+                self.assertEqual(replay.sources, {"replay": 1})
+                with self.assertRaises(openai.InternalServerError):
+                    self._upload(2024, prefix="Rozvaha")  # jiný prompt = bez nahrávky
+        self.assertEqual(self._revenue(2023), 777.0)
+
+
+class ClassifierTests(TestCase):
+    def test_sample_statements(self):
+        for prefix, doc_type in (("Rozvaha", "balance"), ("Vykaz", "income")):
+            with self.subTest(prefix=prefix):
+                with open(_sample_pdf(prefix), "rb") as f:
+                    upload = SimpleUploadedFile("x.pdf", f.read())
+                found = classify.classify_pdf(upload)
+                self.assertEqual((found.doc_type, found.year, found.ico), (doc_type, 2022, "07266961"))
+                self.assertEqual(upload.tell(), 0)  # soubor se dá dál uložit
+
+    def test_text_rules(self):
+        found = classify.classify_text("VÝKAZ ZISKU A ZTRÁTY\nAktivace\nk 30. 6. 2023\nIČO: 072 669 61")
+        self.assertEqual((found.doc_type, found.year, found.ico), ("income", 2023, "07266961"))
+        self.assertIsNone(classify.detect_ico("IČO 07266962"))  # špatná kontrolní číslice
+        self.assertIsNone(classify.detect_type("Aktivace nákladů"))
+        self.assertEqual(classify.classify_pdf(b"not a pdf"), classify.Classification())
+
+
+class UploadRoutingTests(TestCase):
+    """Upload s lokálním rozpoznáním: nesoulad se odmítne bez volání modelu."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="x")
+        self.client.force_login(self.user)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _post(self, **fields):
+        data = {}
+        for field, prefixes in fields.items():
+            if not isinstance(prefixes, list):  # rok, potvrzení přepsání
+                data[field] = prefixes
+                continue
+            data[field] = []
+            for prefix in prefixes:
+                with open(_sample_pdf(prefix), "rb") as f:
+                    data[field].append(SimpleUploadedFile(f"{prefix}.pdf", f.read(), content_type="application/pdf"))
+        with patch_clients() as fake:
+            response = self.client.post(reverse("ingestion:upload_pdf"), data)
+        return response, fake
+
+    def test_auto_files_are_routed_without_year(self):
+        response, fake = self._post(auto_files=["Rozvaha", "Vykaz"])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(fake.calls, 2)
+        self.assertEqual(
+            sorted(Document.objects.values_list("doc_type", "year", "ico")),
+            [("balance", 2022, "07266961"), ("income", 2022, "07266961")],
+        )
+
+    def test_overwrite_is_confirmed_per_type_and_year(self):
+        for doc_type in ("balance", "income"):
+            Document.objects.create(owner=self.user, file="x.pdf", original_filename=f"{doc_type}.pdf",
+                                    doc_type=doc_type, year=2022)
+        response, fake = self._post(auto_files=["Rozvaha", "Vykaz"], confirm_overwrite_income_2021="yes")
+        self.assertEqual(fake.calls, 0)
+        self.assertEqual([(c["doc_type"], c["year"]) for c in response.context["conflicts"]],
+                         [("balance", 2022), ("income", 2022)])
+        self.assertContains(response, 'name="confirm_overwrite_balance_2022"')
+
+        response, fake = self._post(auto_files=["Rozvaha", "Vykaz"], confirm_overwrite_income_2022="yes")
+        self.assertEqual([c["doc_type"] for c in response.context["conflicts"]], ["balance"])
+
+        response, fake = self._post(auto_files=["Rozvaha", "Vykaz"], confirm_overwrite_balance_2022="yes",
+                                    confirm_overwrite_income_2022="yes")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(fake.calls, 2)
+        self.assertEqual(sorted(Document.objects.values_list("original_filename", flat=True)),
+                         ["Rozvaha.pdf", "Vykaz.pdf"])
+
+    def test_ico_mismatch_is_confirmed_before_llm(self):
+        Document.objects.create(owner=self.user, file="x.pdf", doc_type="income", year=2020, ico="25596641")
+        response, fake = self._post(auto_files=["Vykaz"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fake.calls, 0)
+        self.assertEqual([(m["ico"], m["expected_ico"]) for m in response.context["ico_conflicts"]],
+                         [("07266961", "25596641")])
+        self.assertContains(response, 'name="confirm_ico_07266961"')
+
+        response, fake = self._post(auto_files=["Vykaz"], confirm_ico_07266961="yes")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(fake.calls, 1)
+        self.assertEqual(Document.objects.filter(ico="07266961").count(), 1)
+
+    def test_mismatches_are_rejected_before_llm(self):
+        Document.objects.create(owner=self.user, file="x.pdf", doc_type="income", year=2020, ico="25596641")
+        for fields in (
+            {"income_files": ["Rozvaha"]},                # typ
+            {"balance_files": ["Rozvaha"], "year": 2021},  # rok
+        ):
+            with self.subTest(fields=fields):
+                response, fake = self._post(**fields)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(fake.calls, 0)
+                self.assertEqual(Document.objects.count(), 1)
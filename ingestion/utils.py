@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Iterable
+from typing import Dict, List, Optional, Iterable, Set
+import time
 import unicodedata
-from ingestion.models import ExtractedRow, FinancialMetric
+from django.core.cache import cache
+from django.db import transaction
+from ingestion.models import ExtractedTable, FinancialMetric
 
 # ---------------------------------------------------------------------
 # Alias / normalizace textu (zatím nepoužíváme, kódujeme podle "code")
@@ -35,6 +38,29 @@ DERIVED_FORMULAS = {
     },
 }
 
+# Dopočítané metriky (derived_key -> label), v pořadí výpočtu
+DERIVED_LABELS: Dict[str, str] = {
+    "revenue": "Revenue",
+    "cogs": "COGS",
+    "overheads": "Overheads",
+    "gross_margin": "Gross Margin",
+    "gross_margin_pct": "Gross Margin %",
+    "ebit": "EBIT",
+    "net_profit": "Net Profit",
+    "operating_profit_pct": "EBIT Margin %",
+    "net_profit_pct": "Net Profit %",
+}
+
+# Graf závislostí: derived_key -> vstupy (klíče z DERIVED_FORMULAS nebo jiné derived klíče)
+DERIVED_DEPENDENCIES: Dict[str, List[str]] = {
+    "gross_margin": ["revenue", "cogs"],
+    "gross_margin_pct": ["gross_margin", "revenue"],
+    "ebit": ["gross_margin", "overheads"],
+    "net_profit": ["ebit", "fin_income", "fin_expense", "tax"],
+    "operating_profit_pct": ["ebit", "revenue"],
+    "net_profit_pct": ["net_profit", "revenue"],
+}
+
 # ---------------------------------------------------------------------
 # Utility funkce
 # ---------------------------------------------------------------------
@@ -58,12 +84,136 @@ def safe_div(numerator: float, denominator: float) -> float:
         return 0.0
     return numerator / denominator
 
+# ---------------------------------------------------------------------
+# Výpočet derived metrik + inkrementální přepočet
+# ---------------------------------------------------------------------
+def compute_derived(code_map: Dict[str, Optional[float]], doc_type: str) -> Dict[str, Optional[float]]:
+    """
+    Spočítá všechny derived metriky (klíče DERIVED_LABELS) z mapy raw kód -> hodnota.
+    None = metriku nelze spočítat (např. marže při nulových tržbách).
+    """
+    formulas = DERIVED_FORMULAS.get(doc_type, {})
+
+    revenue   = sum_codes(code_map, formulas.get("revenue", []))
+    cogs      = sum_codes(code_map, formulas.get("cogs", []))
+    overheads = sum_codes(code_map, formulas.get("overheads", []))
+
+    # Gross Margin (abs i %), EBIT = GM − Overheads
+    gross_margin = (revenue - cogs) if (revenue is not None and cogs is not None) else None
+    gross_margin_pct = (gross_margin / revenue * 100.0) if (gross_margin is not None and revenue) else None
+    ebit = (gross_margin - overheads) if (gross_margin is not None and overheads is not None) else None
+
+    # Net Profit = EBT − tax; EBT = EBIT + (fin_income − fin_expense)
+    fin_income  = sum_codes(code_map, formulas.get("fin_income", []))
+    fin_expense = sum_codes(code_map, formulas.get("fin_expense", []))
+    tax         = sum_codes(code_map, formulas.get("tax", []))
+    ebt = (ebit + (fin_income or 0) - (fin_expense or 0)) if ebit is not None else None
+    net_profit = (ebt - (tax or 0)) if ebt is not None else None
+
+    return {
+        "revenue": revenue,
+        "cogs": cogs,
+        "overheads": overheads,
+        "gross_margin": gross_margin,
+        "gross_margin_pct": gross_margin_pct,
+        "ebit": ebit,
+        "net_profit": net_profit,
+        "operating_profit_pct": (ebit / revenue * 100.0) if (ebit is not None and revenue) else None,
+        "net_profit_pct": (net_profit / revenue * 100.0) if (net_profit is not None and revenue) else None,
+    }
+
+def affected_derived_keys(doc_type: str, codes: Iterable[str]) -> Set[str]:
+    """Derived klíče, které (i tranzitivně) závisí na některém ze zadaných raw kódů."""
+    codes = set(codes)
+    dirty = {key for key, key_codes in DERIVED_FORMULAS.get(doc_type, {}).items() if codes & set(key_codes)}
+    changed = True
+    while changed:
+        changed = False
+        for key, deps in DERIVED_DEPENDENCIES.items():
+            if key not in dirty and dirty.intersection(deps):
+                dirty.add(key)
+                changed = True
+    return dirty & DERIVED_LABELS.keys()
+
+REPORTED = FinancialMetric.SOURCE_REPORTED
+PRIOR_PERIOD = FinancialMetric.SOURCE_PRIOR_PERIOD
+
+def metrics_year(document, source: str = REPORTED) -> Optional[int]:
+    """Rok metrik dokumentu: vlastní rok, u srovnávacího sloupce (minulé období) rok předchozí."""
+    if source == PRIOR_PERIOD:
+        return document.year - 1 if document.year else None
+    return document.year
+
+def document_code_map(document, source: str = REPORTED) -> Dict[str, Optional[float]]:
+    """Raw kód -> hodnota pro dokument (u duplicitních kódů vyhrává poslední vyplněná hodnota)."""
+    code_map: Dict[str, Optional[float]] = {}
+    metrics = FinancialMetric.objects.filter(document=document, is_derived=False, source=source)
+    for code, value in metrics.values_list("code", "value"):
+        if code:
+            code_map[code] = value if value is not None else code_map.get(code, None)
+    return code_map
+
+def recalculate_derived(document, codes: Iterable[str], source: str = REPORTED) -> Dict[str, Optional[float]]:
+    """
+    Po změně raw kódů přepočítá jen ty derived metriky dokumentu, které na nich závisí.
+    source = které metriky dokumentu (vlastní rok / doplněné minulé období).
+    Volat uvnitř transakce; cache dashboardu se zneplatní po commitu.
+    Vrací {derived_key: nová hodnota} přepočítaných metrik.
+    """
+    affected = affected_derived_keys(document.doc_type, codes)
+    if not affected:
+        return {}
+
+    values = compute_derived(document_code_map(document, source), document.doc_type)
+    FinancialMetric.objects.filter(
+        document=document, is_derived=True, source=source, derived_key__in=affected,
+    ).delete()
+    FinancialMetric.objects.bulk_create([
+        FinancialMetric(
+            document=document,
+            owner_id=document.owner_id,
+            code="",
+            label=DERIVED_LABELS[key],
+            value=values[key],
+            year=metrics_year(document, source),
+            is_derived=True,
+            derived_key=key,
+            source=source,
+        )
+        for key in DERIVED_LABELS
+        if key in affected and values[key] is not None
+    ])
+    owner_id = document.owner_id
+    transaction.on_commit(lambda: invalidate_metrics_cache(owner_id), using=document._state.db)
+    return {key: values[key] for key in affected}
+
+# ---------------------------------------------------------------------
+# Verze dat pro cache dashboardů (per vlastník)
+# ---------------------------------------------------------------------
+def _metrics_version_key(owner_id: int) -> str:
+    return f"metrics-version:{owner_id}"
+
+def metrics_cache_version(owner_id: int) -> int:
+    """
+    Aktuální verze metrik vlastníka – součást klíčů cachovaných dashboard dat.
+    Chybějící (vypršelý, vytlačený) klíč začne od času v ns, ne od 1 – nová verze
+    se tak nikdy nepotká se starými fragmenty, které v cache ještě zůstaly.
+    """
+    return cache.get_or_set(_metrics_version_key(owner_id), time.time_ns, timeout=None)
+
+def invalidate_metrics_cache(owner_id: int) -> None:
+    """Zneplatní cachovaná dashboard data vlastníka (posunem verze)."""
+    try:
+        cache.incr(_metrics_version_key(owner_id))
+    except ValueError:
+        cache.set(_metrics_version_key(owner_id), time.time_ns(), timeout=None)
+
 # ---------------------------------------------------------------------
 # Uložení metrik (raw + derived) pro 1 dokument
 # ---------------------------------------------------------------------
 def save_financial_metrics(document):
     """
-    Vezme raw ExtractedRow → uloží jako FinancialMetric(is_derived=False).
+    Vezme raw řádky tabulek → uloží jako FinancialMetric(is_derived=False).
     Pak podle DERIVED_FORMULAS spočítá a uloží derived metriky (is_derived=True).
     """
     owner = document.owner
@@ -73,7 +223,8 @@ def save_financial_metrics(document):
     FinancialMetric.objects.filter(document=document).delete()
 
     # 2) RAW metriky
-    rows = ExtractedRow.objects.filter(table__document=document)
+    tables = ExtractedTable.objects.filter(document=document).prefetch_related("rows")
+    rows = [r for t in tables for r in t.iter_rows()]
     code_map: Dict[str, Optional[float]] = {}
     for r in rows:
         code_map[r.code] = r.value
@@ -1,8 +1,9 @@
 # ingestion/views.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import json
-import pdfplumber
+import logging
+import time
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -10,39 +11,52 @@ from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from openai import OpenAI
+from scb.tenants import db_for, tenant_atomic
+from . import extraction
+from .classify import classify_pdf
 from .forms import MultiUploadForm
-from .models import Document, ExtractedTable, ExtractedRow, FinancialMetric
-from .utils import DERIVED_FORMULAS, sum_codes
-from ingestion.utils import save_financial_metrics
+from .models import Document, ExtractedTable, FinancialMetric
+from .streaming import RowStreamParser
+from .utils import (
+    DERIVED_LABELS, PRIOR_PERIOD, REPORTED, compute_derived, document_code_map, invalidate_metrics_cache,
+    metrics_year,
+)
 
 
 client = OpenAI(api_key=getattr(settings, "OPENAI_API_KEY", None))
 
+logger = logging.getLogger(__name__)
+
+# po kolika streamovaných řádcích se zapisuje dávka FinancialMetric
+STREAM_BATCH_SIZE = 20
+
 # -------------------------
 # PDF text extraction
 # -------------------------
 
 def extract_text_from_pdf(path: str) -> str:
     """
-    Otevře PDF pomocí pdfplumber a vrátí text všech stránek jako jeden string.
+    Vrátí text všech stránek PDF jako jeden string (backend podle PDF_EXTRACTION_BACKEND,
+    viz ingestion.extraction).
     """
-    parts: list[str] = []
-    with pdfplumber.open(path) as pdf:
-        for p in pdf.pages:
-            parts.append(p.extract_text() or "")
-    return "\n".join(parts)
+    return extraction.extract_text(path)
 
-# -------------------------
-# OpenAI parsing
-# -------------------------
 
-def parse_pdf_with_gpt(pdf_path: str, doc_type: str) -> List[Dict[str, Any]]:
+def extract_statement_text(path: str, doc_type: str) -> Tuple[str, Dict[str, Any]]:
     """
-    Pošle text PDF do GPT a vrátí seznam řádků:
-    {"code": "001", "label": "...", "value": 123456.0, "section": "asset/liability/other"}
+    Text jen ze stránek s výkazem (viz extraction.statement_pages) + info pro ExtractedTable.meta:
+    {"pages": [použité stránky od 1], "page_count": počet stránek PDF}.
     """
-    text = extract_text_from_pdf(pdf_path)
+    pages = extraction.extract_pages(path)
+    used = extraction.statement_pages(pages, doc_type)
+    return "\n".join(pages[i - 1] for i in used), {"pages": used, "page_count": len(pages)}
+
+# -------------------------
+# OpenAI parsing
+# -------------------------
 
+def build_messages(text: str, doc_type: str) -> List[Dict[str, str]]:
+    """Prompt pro extrakci řádků výkazu z textu (rozvaha / výsledovka)."""
     if doc_type == "balance":
         # Rozvaha = speciální prompt
         prompt = f"""
@@ -51,12 +65,14 @@ def parse_pdf_with_gpt(pdf_path: str, doc_type: str) -> List[Dict[str, Any]]:
         Each row MUST have these keys:
         - "code": string row number like "001" or "" if missing
         - "label": string item name
-        - "value": float (use null if empty)
+        - "value": float for the CURRENT period (use null if empty)
+        - "prior_value": float for the PREVIOUS period (Minulé období / Stav v minulém účetním období), null if empty
         - "section": one of ["asset", "liability"]
 
         Rules:
         - Rows related to Aktiva (assets) → section = "asset"
         - Rows related to Pasiva or Vlastní kapitál (liabilities/equity) → section = "liability"
+        - For assets use the Netto columns (current and previous period)
         - Return ONLY valid JSON. No explanations.
 
         Text:
@@ -69,19 +85,59 @@ def parse_pdf_with_gpt(pdf_path: str, doc_type: str) -> List[Dict[str, Any]]:
         Each row MUST be an object with keys:
         - "code": string row number like "001" or "01"
         - "label": string item name
-        - "value": float or null for the CURRENT period
+        - "value": float or null for the CURRENT period (běžném)
+        - "prior_value": float or null for the PREVIOUS period (minulém)
         Return ONLY valid JSON. No explanations.
 
         Text:
         {text}
         """
 
+    return [
+        {"role": "system", "content": "You are an expert in Czech accounting. Output JSON only."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _number(val: Any) -> Optional[float]:
+    try:
+        return float(val) if val is not None else None
+    except Exception:
+        return None
+
+
+def sanitize_row(r: Any, doc_type: str) -> Optional[Dict[str, Any]]:
+    """Řádek od modelu -> {code, label, value, section, prior_value}; None, když nemá kód ani hodnotu."""
+    if not isinstance(r, dict):
+        return None
+    code = str(r.get("code") or "").strip()
+    label = str(r.get("label") or "").strip()
+    section = r.get("section") if doc_type == "balance" else None
+    val = _number(r.get("value"))
+    if code or (val is not None):
+        return {
+            "code": code,
+            "label": label,
+            "value": val,
+            "section": section,
+            "prior_value": _number(r.get("prior_value")),
+        }
+    return None
+
+
+def parse_pdf_with_gpt(pdf_path: str, doc_type: str, meta: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Pošle text stránek s výkazem do GPT a vrátí seznam řádků:
+    {"code": "001", "label": "...", "value": 123456.0, "section": "asset/liability/other"}
+    Do meta (je-li předané) doplní použité stránky PDF.
+    """
+    text, pages_info = extract_statement_text(pdf_path, doc_type)
+    if meta is not None:
+        meta.update(pages_info)
+
     resp = client.chat.completions.create(
         model=settings.OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": "You are an expert in Czech accounting. Output JSON only."},
-            {"role": "user", "content": prompt}
-        ],
+        messages=build_messages(text, doc_type),
         response_format={"type": "json_object"}
     )
 
@@ -99,49 +155,112 @@ def parse_pdf_with_gpt(pdf_path: str, doc_type: str) -> List[Dict[str, Any]]:
     # Sanitace
     out: List[Dict[str, Any]] = []
     for r in rows or []:
-        code = str(r.get("code") or "").strip()
-        label = str(r.get("label") or "").strip()
-        section = r.get("section") if doc_type == "balance" else None
-        val = r.get("value")
-        try:
-            val = float(val) if val is not None else None
-        except Exception:
-            val = None
-        if code or (val is not None):
-            out.append({
-                "code": code,
-                "label": label,
-                "value": val,
-                "section": section
-            })
+        row = sanitize_row(r, doc_type)
+        if row is not None:
+            out.append(row)
     return out
 
+
+def stream_pdf_rows(pdf_path: str, doc_type: str, meta: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Jako parse_pdf_with_gpt, ale odpověď se streamuje a sanitizované řádky se vrací
+    hned, jak je model dopíše (ingestion.streaming.RowStreamParser). Do meta["stream"]
+    zapíše časy v ms od odeslání požadavku: first_token_ms, first_row_ms, total_ms.
+    """
+    text, pages_info = extract_statement_text(pdf_path, doc_type)
+    if meta is not None:
+        meta.update(pages_info)
+
+    started = time.perf_counter()
+    timings: Dict[str, Any] = {"first_token_ms": None, "first_row_ms": None}
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    stream = client.chat.completions.create(
+        model=settings.OPENAI_MODEL,
+        messages=build_messages(text, doc_type),
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    parser = RowStreamParser()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if timings["first_token_ms"] is None:
+            timings["first_token_ms"] = elapsed_ms()
+        for r in parser.feed(delta):
+            row = sanitize_row(r, doc_type)
+            if row is None:
+                continue
+            if timings["first_row_ms"] is None:
+                timings["first_row_ms"] = elapsed_ms()
+            yield row
+
+    timings["total_ms"] = elapsed_ms()
+    if parser.skipped:
+        timings["skipped"] = parser.skipped
+    logger.info(
+        "Streamovaná extrakce %s: první řádek za %s ms, celkem %s ms, %s řádků",
+        pdf_path, timings["first_row_ms"], timings["total_ms"], parser.rows,
+    )
+    if meta is not None:
+        meta["stream"] = timings
+
 # -------------------------
 # Normalizace + výpočty
 # -------------------------
 
-def rewrite_to_metrics(document: Document) -> None:
-    """Přepíše ExtractedRow -> FinancialMetric (per kód)."""
-    FinancialMetric.objects.filter(document=document, is_derived=False).delete()
+def _raw_metric(document: Document, code, label, value, source: str = REPORTED) -> FinancialMetric:
+    return FinancialMetric(
+        document=document,
+        owner_id=document.owner_id,
+        code=(code or "").strip(),
+        label=(label or "").strip(),
+        value=value,
+        year=metrics_year(document, source),
+        is_derived=False,
+        derived_key="",
+        source=source,
+    )
 
-    rows = ExtractedRow.objects.filter(table__document=document)
-    bulk: List[FinancialMetric] = []
-    for r in rows:
-        if not (r.code or r.value is not None):
-            continue
-        bulk.append(FinancialMetric(
-            document=document,
-            code=(r.code or "").strip(),
-            label=(r.label or "").strip(),
-            value=r.value,
-            year=document.year,
-            is_derived=False,
-            derived_key=""
-        ))
+def rewrite_to_metrics(document: Document) -> None:
+    """Přepíše řádky tabulek dokumentu -> FinancialMetric (per kód)."""
+    FinancialMetric.objects.filter(document=document, is_derived=False, source=REPORTED).delete()
+
+    tables = ExtractedTable.objects.filter(document=document).prefetch_related("rows")
+    bulk: List[FinancialMetric] = [
+        _raw_metric(document, r.code, r.label, r.value)
+        for t in tables for r in t.iter_rows()
+        if r.code or r.value is not None
+    ]
     if bulk:
         FinancialMetric.objects.bulk_create(bulk, batch_size=100)
 
-def calculate_and_store_derived(document: Document) -> None:
+def _stream_to_metrics(document: Document, rows: Iterator[Dict[str, Any]], meta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Streamované řádky rovnou do FinancialMetric po dávkách STREAM_BATCH_SIZE – zápis běží,
+    zatímco model generuje další řádky. Vrací všechny řádky (pro ExtractedTable.row_data).
+    """
+    out: List[Dict[str, Any]] = []
+    batch: List[FinancialMetric] = []
+    batches = 0
+    for row in rows:
+        out.append(row)
+        batch.append(_raw_metric(document, row["code"], row["label"], row["value"]))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            FinancialMetric.objects.bulk_create(batch)
+            batch, batches = [], batches + 1
+    if batch:
+        FinancialMetric.objects.bulk_create(batch)
+        batches += 1
+    meta.setdefault("stream", {})["batches"] = batches
+    return out
+
+def calculate_and_store_derived(document: Document, source: str = REPORTED) -> None:
     """
     Dopočítané metriky (uloží se jako is_derived=True) podle sjednaného mappingu:
     - Revenue, COGS, Overheads
@@ -149,76 +268,66 @@ def calculate_and_store_derived(document: Document) -> None:
     - EBIT (Operating Profit) = Gross Margin − Overheads
     - Net Profit = (EBIT + (fin_income - fin_expense)) - tax
     - EBIT margin %, Net Profit margin %
+    source=PRIOR_PERIOD = z doplněného minulého období (rok year - 1).
     """
-    # 1) Smaž staré derived metriky pro daný dokument
-    FinancialMetric.objects.filter(document=document, is_derived=True).delete()
-
-    # 2) Namapuj raw kódy -> hodnoty
-    code_map: Dict[str, Optional[float]] = {}
-    for m in FinancialMetric.objects.filter(document=document, is_derived=False):
-        if m.code:
-            code_map[m.code] = m.value if m.value is not None else code_map.get(m.code, None)
-
-    formulas = DERIVED_FORMULAS.get(document.doc_type, {})
-    derived_bulk: List[FinancialMetric] = []
-
-    def add_metric(key: str, value: Optional[float], label: str):
-        """Helper: přidá derived metriku jen pokud má hodnotu."""
-        if value is not None:
-            derived_bulk.append(FinancialMetric(
-                document=document,
-                code="",
-                label=label,
-                value=value,
-                year=document.year,
-                is_derived=True,
-                derived_key=key
-            ))
-
-    # ---- Základní bloky
-    revenue   = sum_codes(code_map, formulas.get("revenue", []))
-    cogs      = sum_codes(code_map, formulas.get("cogs", []))
-    overheads = sum_codes(code_map, formulas.get("overheads", []))
-
-    add_metric("revenue", revenue, "Revenue")
-    add_metric("cogs", cogs, "COGS")
-    add_metric("overheads", overheads, "Overheads")
-
-    # ---- Gross Margin (abs i %)
-    gross_margin = (revenue - cogs) if (revenue is not None and cogs is not None) else None
-    gross_margin_pct = (gross_margin / revenue * 100.0) if (gross_margin is not None and revenue) else None
-    add_metric("gross_margin", gross_margin, "Gross Margin")
-    add_metric("gross_margin_pct", gross_margin_pct, "Gross Margin %")
-
-    # ---- EBIT (Varianta A: GM − Overheads)
-    ebit = (gross_margin - overheads) if (gross_margin is not None and overheads is not None) else None
-    add_metric("ebit", ebit, "EBIT")
-
-    # ---- Net Profit (EBT - tax)
-    fin_income  = sum_codes(code_map, formulas.get("fin_income", []))
-    fin_expense = sum_codes(code_map, formulas.get("fin_expense", []))
-    tax         = sum_codes(code_map, formulas.get("tax", []))
-
-    ebt = (ebit + (fin_income or 0) - (fin_expense or 0)) if ebit is not None else None
-    net_profit = (ebt - (tax or 0)) if ebt is not None else None
-    add_metric("net_profit", net_profit, "Net Profit")
-
-    # ---- Margin %
-    ebit_margin_pct = (ebit / revenue * 100.0) if (ebit is not None and revenue) else None
-    net_profit_pct  = (net_profit / revenue * 100.0) if (net_profit is not None and revenue) else None
-    add_metric("operating_profit_pct", ebit_margin_pct, "EBIT Margin %")
-    add_metric("net_profit_pct", net_profit_pct, "Net Profit %")
-
-    # ---- Ulož vše
+    # 1) Smaž staré derived metriky pro daný dokument a zdroj
+    FinancialMetric.objects.filter(document=document, is_derived=True, source=source).delete()
+
+    # 2) Namapuj raw kódy -> hodnoty a spočítej (viz ingestion.utils.compute_derived)
+    values = compute_derived(document_code_map(document, source), document.doc_type)
+
+    # 3) Ulož jen metriky, které mají hodnotu
+    derived_bulk: List[FinancialMetric] = [
+        FinancialMetric(
+            document=document,
+            owner_id=document.owner_id,
+            code="",
+            label=label,
+            value=values[key],
+            year=metrics_year(document, source),
+            is_derived=True,
+            derived_key=key,
+            source=source,
+        )
+        for key, label in DERIVED_LABELS.items()
+        if values[key] is not None
+    ]
     if derived_bulk:
         FinancialMetric.objects.bulk_create(derived_bulk, batch_size=100)
 
+def backfill_prior_period(document: Document, rows: List[Dict[str, Any]]) -> int:
+    """
+    Srovnávací sloupec výkazu (minulé období) -> FinancialMetric roku year - 1 se
+    source=prior_period, navázané na tento dokument. Jen když vlastník za ten rok
+    vlastní výkaz stejného typu nemá; dřívější doplnění z jiného dokumentu (nižší
+    spolehlivost než nový výkaz) se nahradí. Vrací počet uložených raw metrik.
+    """
+    prior_year = metrics_year(document, PRIOR_PERIOD)
+    if prior_year is None:
+        return 0
+    if Document.objects.filter(owner_id=document.owner_id, year=prior_year, doc_type=document.doc_type).exists():
+        return 0
+
+    FinancialMetric.objects.filter(
+        owner_id=document.owner_id, year=prior_year, document__doc_type=document.doc_type, source=PRIOR_PERIOD,
+    ).delete()
+    bulk = [
+        _raw_metric(document, r["code"], r["label"], r["prior_value"], source=PRIOR_PERIOD)
+        for r in rows
+        if r.get("prior_value") is not None
+    ]
+    if not bulk:
+        return 0
+    FinancialMetric.objects.bulk_create(bulk, batch_size=100)
+    calculate_and_store_derived(document, source=PRIOR_PERIOD)
+    return len(bulk)
+
 # -------------------------
 # Hlavní pipeline
 # -------------------------
 
-def _process_document(pdf_file, user, year, doc_type, notes=None) -> int:
-    """Pipeline: vytvoří Document -> GPT parsing -> ExtractedRow -> FinancialMetric -> Derived."""
+def _process_document(pdf_file, user, year, doc_type, notes=None, ico="") -> int:
+    """Pipeline: vytvoří Document -> GPT parsing -> ExtractedTable (řádky v row_data) -> FinancialMetric -> Derived."""
     doc = Document.objects.create(
         file=pdf_file,
         original_filename=getattr(pdf_file, "name", "upload.pdf"),
@@ -226,36 +335,47 @@ def _process_document(pdf_file, user, year, doc_type, notes=None) -> int:
         doc_type=doc_type,
         year=year,
         notes=notes,
+        ico=ico or "",
     )
 
     path = doc.file.path
-    rows = parse_pdf_with_gpt(path, doc_type)
+    meta: Dict[str, Any] = {}
+    streamed = getattr(settings, "OPENAI_STREAM_ROWS", False)
+    if streamed:
+        rows = _stream_to_metrics(doc, stream_pdf_rows(path, doc_type, meta=meta), meta)
+    else:
+        rows = parse_pdf_with_gpt(path, doc_type, meta=meta)
     if not rows:
         return 0
 
-    table = ExtractedTable.objects.create(
+    # vlastní výkaz roku má přednost před hodnotami doplněnými z minulého období jiného výkazu
+    FinancialMetric.objects.filter(
+        owner_id=user.id, year=year, document__doc_type=doc_type, source=PRIOR_PERIOD,
+    ).exclude(document=doc).delete()
+    prior = backfill_prior_period(doc, rows)
+    if prior:
+        meta["prior_period"] = {"year": metrics_year(doc, PRIOR_PERIOD), "metrics": prior}
+
+    # celá tabulka = jeden INSERT (řádky sloupcově v row_data, dotazovatelná data jsou ve FinancialMetric)
+    table = ExtractedTable(
         document=doc,
-        page_number=1,
+        page_number=(meta.get("pages") or [1])[0],
         table_index=1,
         method="gpt-4o-mini",
         columns=["code", "label", "value"],
-        meta={"rows": len(rows)},
+        meta=meta,
     )
-
-    bulk_rows: List[ExtractedRow] = []
-    for r in rows:
-        bulk_rows.append(ExtractedRow(
-            table=table,
-            code=str(r.get("code") or "").strip(),
-            label=str(r.get("label") or "").strip(),
-            value=(float(r.get("value")) if r.get("value") is not None else None),
-            section=r.get("section") if "section" in r else None,
-            raw_data=r
-        ))
-    if bulk_rows:
-        ExtractedRow.objects.bulk_create(bulk_rows, batch_size=200)
-
-    rewrite_to_metrics(doc)
+    table.set_rows({
+        "code": str(r.get("code") or "").strip(),
+        "label": str(r.get("label") or "").strip(),
+        "value": (float(r.get("value")) if r.get("value") is not None else None),
+        "section": r.get("section"),
+        "prior_value": r.get("prior_value"),
+    } for r in rows)
+    table.save()
+
+    if not streamed:  # při streamování jsou raw metriky už zapsané
+        rewrite_to_metrics(doc)
     calculate_and_store_derived(doc)
 
     return 1
@@ -270,12 +390,85 @@ def _existing_doc(owner, year, doc_type) -> Optional[Document]:
     except Document.DoesNotExist:
         return None
 
+def _replace_document(pdf_file, user, year, doc_type, notes=None, ico="") -> int:
+    """
+    Přepis dokumentu pro rok/typ: nový dokument se nejdřív celý zpracuje a teprve pak
+    se smaže starý, takže dashboardy nikdy nevidí rok bez dat. Mazání závislých
+    tabulek/metrik jde hromadnými DELETE (Django collector bez signálů), soubor
+    starého dokumentu se smaže až po commitu (Document.delete).
+    """
+    old = _existing_doc(user, year, doc_type)
+    saved = _process_document(pdf_file, user, year, doc_type, notes, ico)
+    if old:
+        old.delete()
+    return saved
+
 # -------------------------
 # Views
 # -------------------------
 
+DOC_TYPE_NAMES = {"balance": "rozvaha", "income": "výsledovka"}
+
+def overwrite_field(doc_type: str, year: int) -> str:
+    """Název pole formuláře, kterým uživatel potvrdí přepsání dokumentu (typ, rok)."""
+    return f"confirm_overwrite_{doc_type}_{year}"
+
+def ico_field(ico: str) -> str:
+    """Název pole formuláře, kterým uživatel potvrdí výkaz s jiným IČO než dřívější výkazy."""
+    return f"confirm_ico_{ico}"
+
+def _plan_uploads(user, form: MultiUploadForm) -> Tuple[List[tuple], List[str], List[dict]]:
+    """
+    Typ, rok a IČO každého nahraného souboru podle formuláře a lokálního rozpoznání
+    první stránky (ingestion.classify) – ještě před voláním modelu.
+    Vrací ([(soubor, doc_type, rok, ičo)], [chybové hlášky], [nesoulady IČO]); chyba =
+    rozpoznaný typ nebo rok nesedí s formulářem, případně typ či rok nejde určit.
+    IČO jiné než u ostatních souborů / posledního dokumentu není chyba (firma mohla
+    změnit IČO, dokument může být opravdu jiné firmy) – view ho nechá potvrdit.
+    """
+    form_year = form.cleaned_data.get("year")
+    expected_ico = (
+        Document.objects.filter(owner=user).exclude(ico="")
+        .order_by("-uploaded_at").values_list("ico", flat=True).first()
+    )
+    plan: List[tuple] = []
+    errors: List[str] = []
+    ico_mismatches: List[dict] = []
+    for declared, field in (("balance", "balance_files"), ("income", "income_files"), (None, "auto_files")):
+        for pdf in form.cleaned_data.get(field) or []:
+            found = classify_pdf(pdf)
+            name = getattr(pdf, "name", "soubor")
+            doc_type = declared or found.doc_type
+            year = found.year or form_year
+
+            if doc_type is None:
+                errors.append(f"{name}: typ výkazu se nepodařilo rozpoznat – nahrajte ho jako rozvahu, nebo výsledovku.")
+                continue
+            if declared and found.doc_type and found.doc_type != declared:
+                errors.append(f"{name}: soubor vypadá jako {DOC_TYPE_NAMES[found.doc_type]}, ne {DOC_TYPE_NAMES[declared]}.")
+                continue
+            if found.year and form_year and found.year != form_year:
+                errors.append(f"{name}: výkaz je za rok {found.year}, ve formuláři je {form_year}.")
+                continue
+            if year is None:
+                errors.append(f"{name}: rok výkazu se nepodařilo rozpoznat – vyplňte pole Rok.")
+                continue
+            if found.ico:
+                if expected_ico and found.ico != expected_ico:
+                    ico_mismatches.append({
+                        "name": name,
+                        "ico": found.ico,
+                        "expected_ico": expected_ico,
+                        "conf_name": ico_field(found.ico),
+                    })
+                else:
+                    expected_ico = found.ico
+            plan.append((pdf, doc_type, year, found.ico or ""))
+    return plan, errors, ico_mismatches
+
+
 @login_required(login_url="/login/")
-@transaction.atomic
+@tenant_atomic
 def upload_pdf(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = MultiUploadForm(request.POST, request.FILES)
@@ -283,46 +476,48 @@ def upload_pdf(request: HttpRequest) -> HttpResponse:
             messages.error(request, "Formulář není validní.")
             return render(request, "ingestion/upload.html", {"form": form})
 
-        year = form.cleaned_data.get("year")
         notes = form.cleaned_data.get("notes")
-        balance_files = form.cleaned_data.get("balance_files") or []
-        income_files = form.cleaned_data.get("income_files") or []
+        plan, errors, ico_mismatches = _plan_uploads(request.user, form)
 
-        if not balance_files and not income_files:
+        if not plan and not errors:
             messages.error(request, "Nebyl vybrán žádný soubor.")
             return render(request, "ingestion/upload.html", {"form": form})
+        if errors:
+            # nesoulad typu / roku – nic se nezpracuje (a nezaplatí) a formulář se vrátí
+            for error in errors:
+                messages.error(request, error)
+            return render(request, "ingestion/upload.html", {"form": form})
 
-        for doc_type, files in (("balance", balance_files), ("income", income_files)):
-            if not files:
-                continue
+        # potvrzení přepsání platí jen pro konkrétní (typ, rok) – ne pro všechny roky daného typu
+        conflicts = []
+        for doc_type, year in sorted({(doc_type, year) for _, doc_type, year, _ in plan}):
             exists = _existing_doc(request.user, year, doc_type)
-            if exists and request.POST.get(f"confirm_overwrite_{doc_type}") != "yes":
-                return render(request, "ingestion/confirm_overwrite.html", {
-                    "form": form,
+            if exists and request.POST.get(overwrite_field(doc_type, year)) != "yes":
+                conflicts.append({
                     "year": year,
                     "doc_type": doc_type,
+                    "doc_type_name": DOC_TYPE_NAMES[doc_type],
                     "existing_doc": exists,
-                    "conf_name": f"confirm_overwrite_{doc_type}",
-                    "message": f"Pro rok {year} a typ {doc_type} již existuje dokument: {exists.original_filename}. Přejete si ho přepsat?",
+                    "conf_name": overwrite_field(doc_type, year),
                 })
+        # jiné IČO se potvrzuje pro konkrétní IČO, stejně jako přepsání pro (typ, rok)
+        ico_conflicts = [m for m in ico_mismatches if request.POST.get(m["conf_name"]) != "yes"]
+        if conflicts or ico_conflicts:
+            return render(request, "ingestion/confirm_overwrite.html", {
+                "form": form,
+                "conflicts": conflicts,
+                "ico_conflicts": ico_conflicts,
+                "message": "Pro tyto roky a typy výkazů už dokumenty existují. Přejete si je přepsat?",
+            })
 
         created_docs = 0
         saved_tables = 0
 
-        for pdf in balance_files:
-            created_docs += 1
-            old = _existing_doc(request.user, year, "balance")
-            if old:
-                old.delete()
-            saved_tables += _process_document(pdf, request.user, year, "balance", notes)
-
-        for pdf in income_files:
+        for pdf, doc_type, year, ico in plan:
             created_docs += 1
-            old = _existing_doc(request.user, year, "income")
-            if old:
-                old.delete()
-            saved_tables += _process_document(pdf, request.user, year, "income", notes)
+            saved_tables += _replace_document(pdf, request.user, year, doc_type, notes, ico)
 
+        transaction.on_commit(lambda: invalidate_metrics_cache(request.user.id), using=db_for(request.user))
         if saved_tables > 0:
             messages.success(request, f"Nahráno {created_docs} souborů, uloženo {saved_tables} tabulek.")
         else:
@@ -345,41 +540,47 @@ def documents_list(request: HttpRequest) -> HttpResponse:
 @login_required(login_url="/login/")
 def document_detail(request: HttpRequest, doc_id: int) -> HttpResponse:
     doc = get_object_or_404(Document, id=doc_id, owner=request.user)
-    rows = ExtractedRow.objects.filter(table__document=doc).order_by("id")
-    metrics_base = FinancialMetric.objects.filter(document=doc, is_derived=False).order_by("code")
-    metrics_derived = FinancialMetric.objects.filter(document=doc, is_derived=True).order_by("derived_key")
+    tables = doc.tables.order_by("page_number", "table_index").prefetch_related("rows")
+    rows = [r for t in tables for r in t.iter_rows()]
+    # jeden dotaz na všechny metriky dokumentu, rozdělení podle druhu a zdroje v Pythonu
+    metrics = list(FinancialMetric.objects.filter(document=doc).order_by("code", "derived_key"))
+    reported = [m for m in metrics if m.source == REPORTED]
     return render(request, "ingestion/document_detail.html", {
         "doc": doc,
         "rows": rows,
-        "metrics_base": metrics_base,
-        "metrics_derived": metrics_derived,
+        "metrics_base": [m for m in reported if not m.is_derived],
+        "metrics_derived": [m for m in reported if m.is_derived],
+        "prior_year": metrics_year(doc, PRIOR_PERIOD),
+        "prior_count": sum(1 for m in metrics if m.source == PRIOR_PERIOD and not m.is_derived),
     })
 
 @login_required(login_url="/login/")
 def table_detail(request: HttpRequest, table_id: int) -> HttpResponse:
     table = get_object_or_404(ExtractedTable, id=table_id, document__owner=request.user)
-    rows = table.rows.all().order_by("id")
-    base_metrics = FinancialMetric.objects.filter(document=table.document, is_derived=False).exclude(value__isnull=True).order_by("-value")[:20]
+    rows = list(table.iter_rows())
+    base_metrics = FinancialMetric.objects.filter(document=table.document, is_derived=False, source=REPORTED).exclude(value__isnull=True).order_by("-value")[:20]
     return render(request, "ingestion/table_detail.html", {"table": table, "rows": rows, "base_metrics": base_metrics})
 
 @login_required(login_url="/login/")
-@transaction.atomic
+@tenant_atomic
 def delete_document(request: HttpRequest, doc_id: int) -> HttpResponse:
     doc = get_object_or_404(Document, id=doc_id, owner=request.user)
     if request.method == "POST":
         filename = doc.original_filename
-        doc.delete()  # smaže i file z uložiště
+        doc.delete()  # smaže i file z uložiště (po commitu)
+        transaction.on_commit(lambda: invalidate_metrics_cache(request.user.id), using=db_for(request.user))
         messages.success(request, f"Dokument {filename} byl smazán (včetně souboru v úložišti).")
         return redirect("ingestion:documents")
     return render(request, "ingestion/confirm_delete.html", {"object": doc, "type": "dokument"})
 
 @login_required(login_url="/login/")
-@transaction.atomic
+@tenant_atomic
 def delete_table(request: HttpRequest, table_id: int) -> HttpResponse:
     table = get_object_or_404(ExtractedTable, id=table_id, document__owner=request.user)
     if request.method == "POST":
         doc_id = table.document.id
         table.delete()
+        transaction.on_commit(lambda: invalidate_metrics_cache(request.user.id), using=db_for(request.user))
         messages.success(request, "Tabulka byla smazána.")
         return redirect("ingestion:document_detail", doc_id=doc_id)
     return render(request, "ingestion/confirm_delete.html", {"object": table, "type": "tabulka"})
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class ScbConfig(AppConfig):
+    name = "scb"
+
+    def ready(self):
+        from .database import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid="scb_sqlite_pragmas")
@@ -0,0 +1,77 @@
+"""
+Profily databáze (nastavení DATABASE_PROFILE) a pragmy SQLite.
+
+    sqlite      – db.sqlite3 s výchozím chováním Djanga (vývoj)
+    sqlite-wal  – produkce na SQLite: WAL (čtení neblokuje zápis), synchronous=NORMAL,
+                  mmap a větší cache stránek, busy_timeout, transakce BEGIN IMMEDIATE
+                  a trvalá spojení (CONN_MAX_AGE)
+    postgres    – PostgreSQL z proměnných POSTGRES_* (volitelný balíček psycopg),
+                  trvalá spojení s health checkem
+
+Pragmy jsou v klíči "PRAGMAS" konfigurace spojení a na každém novém spojení je
+nastaví apply_sqlite_pragmas (signál connection_created, viz scb.apps). Převezmou
+je i soubory vlastníků (scb.tenants kopíruje konfiguraci hlavní DB). Srovnání profilů
+při souběžných zápisech a čteních z více procesů: python -m benchmarks.db_contention.
+"""
+import os
+import re
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ("sqlite", "sqlite-wal", "postgres")
+
+SQLITE_WAL_PRAGMAS = {
+    "journal_mode": "WAL",     # čtenáři nečekají na zápis a zápis na čtenáře
+    "synchronous": "NORMAL",   # ve WAL bez rizika poškození, fsync až při checkpointu
+    "busy_timeout": 20000,     # ms čekání na zámek místo okamžitého "database is locked"
+    "cache_size": -65536,      # záporné = KiB, tj. 64 MiB cache stránek na spojení
+    "mmap_size": 268435456,    # čtení až 256 MiB souboru přes mmap
+    "temp_store": "MEMORY",
+}
+
+PRAGMA_NAME_RE = re.compile(r"^[a-z_]+$")
+
+
+def database_profile(name: str, base_dir, env=os.environ) -> dict:
+    """Konfigurace hlavní DB (položka DATABASES["default"]) pro profil `name`."""
+    sqlite = {"ENGINE": "django.db.backends.sqlite3", "NAME": env.get("SQLITE_PATH") or base_dir / "db.sqlite3"}
+    if name == "sqlite":
+        return sqlite
+    if name == "sqlite-wal":
+        options = {}
+        if django.VERSION >= (5, 1):
+            # zápis bere zámek hned na začátku transakce – přechod čtení → zápis
+            # v rozběhnuté transakci by ve WAL selhal bez čekání na busy_timeout
+            options["transaction_mode"] = "IMMEDIATE"
+        return {
+            **sqlite,
+            "OPTIONS": options,
+            "CONN_MAX_AGE": int(env.get("DB_CONN_MAX_AGE", 600)),
+            "CONN_HEALTH_CHECKS": True,
+            "PRAGMAS": dict(SQLITE_WAL_PRAGMAS),
+        }
+    if name == "postgres":
+        return {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": env.get("POSTGRES_DB", "scb"),
+            "USER": env.get("POSTGRES_USER", "scb"),
+            "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+            "HOST": env.get("POSTGRES_HOST", "localhost"),
+            "PORT": env.get("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": int(env.get("DB_CONN_MAX_AGE", 600)),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    raise ImproperlyConfigured(f"Neznámý DATABASE_PROFILE {name!r} (možnosti: {', '.join(PROFILES)}).")
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created: pragmy z konfigurace spojení ("PRAGMAS") na novém SQLite spojení."""
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME_RE.match(name):
+            raise ImproperlyConfigured(f"Neplatný název pragmy {name!r}.")
+        # přímo na sqlite3 spojení – mimo Django cursor, nepočítá se mezi dotazy požadavku
+        connection.connection.execute(f"PRAGMA {name} = {value}")
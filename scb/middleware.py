@@ -0,0 +1,56 @@
+"""
+Servírování statických souborů ze STATIC_ROOT přímo z Django (produkce bez
+samostatného webserveru pro /static/). Soubory s hashem v názvu (z manifestu
+collectstatic) dostanou Cache-Control na rok + immutable, ostatní krátkou
+platnost. Podle Accept-Encoding se vrací předkomprimovaná varianta .br / .gz
+(viz scb.storage). Při runserver má přednost jeho vlastní handler pro static.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_MAX_AGE = 60
+
+
+class StaticFilesMiddleware:
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL or "://" in settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = str(settings.STATIC_ROOT)
+        self.prefix = "/" + settings.STATIC_URL.strip("/") + "/"
+        self.immutable = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD") and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def _exists(self, name: str) -> bool:
+        try:
+            return os.path.isfile(safe_join(self.root, name))
+        except SuspiciousFileOperation:  # cesta mimo STATIC_ROOT
+            return False
+
+    def serve(self, request, name: str):
+        if not name or not self._exists(name):
+            return None
+        accept = request.headers.get("Accept-Encoding", "")
+        candidates = [name + suffix for suffix, coding in ((".br", "br"), (".gz", "gzip")) if coding in accept]
+        chosen = next((c for c in candidates if self._exists(c)), name)
+
+        response = serve(request, chosen, document_root=self.root)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if name in self.immutable:
+            response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={DEFAULT_MAX_AGE}"
+        return response
@@ -2,6 +2,8 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 
+from scb.database import database_profile
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 load_dotenv()
@@ -15,6 +17,16 @@ OPENAI_MODEL = "gpt-4o-mini"
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# extrakce textu z PDF: "pdfplumber", "pypdfium2", "camelot-lattice", "camelot-stream" nebo "auto" (viz ingestion.extraction)
+PDF_EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "pdfplumber")
+# extrahovaný text + slova se ukládají do ingestion.ExtractedText podle SHA-256 souboru (opakované zpracování bez parsování PDF)
+PDF_TEXT_CACHE = True
+# odpověď modelu při uploadu streamovat a řádky ukládat po dávkách, jak přicházejí (viz ingestion.streaming)
+OPENAI_STREAM_ROWS = os.getenv("OPENAI_STREAM_ROWS", "") == "1"
+
+# AI shrnutí suropen: "thread" (vlákno po commitu), "sync" (v požadavku) nebo "worker" (manage.py process_suropen_summaries)
+SUROPEN_SUMMARY_MODE = os.getenv("SUROPEN_SUMMARY_MODE", "thread")
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -29,16 +41,18 @@ INSTALLED_APPS = [
     "suropen",
     "survey",
     "company",
-    "hodnoty"
-    
+    "hodnoty",
+    "scb",
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'scb.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'scb.tenants.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -49,27 +63,56 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-            ],  },
+            ],
+            # zkompilované šablony se drží v paměti (runserver je při změně šablony zahodí)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
     },
 ]
 
 WSGI_APPLICATION = 'scb.wsgi.application'
 ASGI_APPLICATION = 'scb.asgi.application'
 
+# profil hlavní DB: "sqlite" (vývoj), "sqlite-wal" (produkce na SQLite – WAL, pragmy, busy timeout,
+# trvalá spojení) nebo "postgres" (POSTGRES_DB/USER/PASSWORD/HOST/PORT) – viz scb.database
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "sqlite")
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_profile(DATABASE_PROFILE, BASE_DIR),
 }
 
+# dokumenty a metriky každého vlastníka ve vlastním SQLite souboru TENANT_DB_DIR/owner_<id>.sqlite3
+# (zápisy jednoho uživatele neblokují ostatní); schéma: manage.py migrate_tenants (viz scb.tenants)
+TENANT_DATABASES = os.getenv("TENANT_DATABASES", "") == "1"
+TENANT_DB_DIR = BASE_DIR / "tenants"
+DATABASE_ROUTERS = ["scb.tenants.TenantRouter"]
+
+# cache sdílená všemi workery (verze metrik vlastníků + fragmenty dashboardů) – výchozí
+# LocMemCache je per proces a ostatní workery by po změně dat servírovaly staré fragmenty;
+# s REDIS_URL Redis, jinak soubory v CACHE_DIR
+if os.getenv("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.getenv("REDIS_URL")}}
+else:
+    CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }}
+# testy a benchmarky jedou nad vlastní LocMemCache (scb.testing), ne nad touto
+TEST_RUNNER = "scb.testing.TestRunner"
+# jak dlouho (s) smí žít cachovaný fragment dashboardu, i když se verze dat nezměnila
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", 3600))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -94,6 +137,12 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic: názvy s hashem obsahu + předkomprimované .gz/.br (scb.storage)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "scb.storage.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
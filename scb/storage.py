@@ -0,0 +1,66 @@
+"""
+Storage pro statické soubory: názvy s hashem obsahu (ManifestStaticFilesStorage)
+a při collectstatic navíc předkomprimované varianty .gz a .br (brotli jen je-li
+nainstalovaný balíček `brotli`). Servíruje je scb.middleware.StaticFilesMiddleware.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # volitelná závislost
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".html", ".xml", ".ico", ".ttf", ".otf", ".eot",
+}
+# menší soubory se nevyplatí komprimovat (hlavičky a framing převáží úsporu)
+MIN_COMPRESS_SIZE = 256
+# komprimovanou variantu ponecháme, jen když ušetří aspoň 5 %
+MAX_COMPRESSED_RATIO = 0.95
+
+
+def compress_file(path: str) -> list:
+    """Vedle souboru zapíše path.gz (a path.br); vrací seznam vytvořených cest."""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) <= len(data) * MAX_COMPRESSED_RATIO:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # bez manifestu (collectstatic ještě neběžel – vývoj, testy) odkazujeme na původní názvy
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        results = list(super().post_process(paths, dry_run=dry_run, **options))
+        if not dry_run:
+            done = set()
+            for name, hashed_name, processed in results:
+                if isinstance(processed, Exception):
+                    continue
+                for stored in (name, hashed_name):
+                    if stored and stored not in done:
+                        done.add(stored)
+                        compress_file(self.path(stored))
+        yield from results
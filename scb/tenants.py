@@ -0,0 +1,264 @@
+"""
+Volitelné oddělené SQLite databáze vlastníků (TENANT_DATABASES = True).
+
+Dokumenty, tabulky a metriky (TENANT_MODELS) každého vlastníka leží v jeho vlastním
+souboru TENANT_DB_DIR/owner_<id>.sqlite3, takže velký upload jednoho uživatele
+nezamyká zápisy ostatních. Uživatelé, sessions, dotazníky, firmy i cache textu PDF
+(ExtractedText) zůstávají v hlavní databázi.
+
+Vlastníka dotazu určí TenantRouter z instance (uživatel, dokument, metrika), jinak
+z kontextu – TenantMiddleware ho nastaví na přihlášeného uživatele, commandy a skripty
+použijí use_tenant(owner). Bez kontextu jdou dotazy do hlavní DB (tabulky tam jsou také,
+jen prázdné, takže mazání uživatele nespadne). Admin dat vlastníků (ingestion.admin.
+TenantAdmin) pracuje se souborem vlastníka zvoleného filtrem a uživatele nespojuje JOINem.
+
+Spojení se registrují za běhu pod aliasem tenant_<id> a Django je drží per vlákno jako
+ostatní (CONN_MAX_AGE se přebírá z hlavní DB). Nový soubor se při registraci zmigruje
+v dočasném souboru a teprve hotový se přesune na místo (_create_file), takže souběžné
+procesy nemigrují tentýž soubor. Změny schématu: manage.py migrate_tenants (hlavní DB
++ všechny soubory).
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from io import StringIO
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+TENANT_MODELS = frozenset({
+    "ingestion.document",
+    "ingestion.extractedtable",
+    "ingestion.extractedrow",
+    "ingestion.financialmetric",
+})
+ALIAS_PREFIX = "tenant_"
+SQLITE_ENGINE = "django.db.backends.sqlite3"
+
+_current: ContextVar[Optional[int]] = ContextVar("tenant_owner", default=None)
+_lock = threading.RLock()
+
+
+def enabled() -> bool:
+    return getattr(settings, "TENANT_DATABASES", False)
+
+
+def is_tenant_model(model) -> bool:
+    return model._meta.label_lower in TENANT_MODELS
+
+
+def _owner_id(owner) -> Optional[int]:
+    return getattr(owner, "pk", owner)
+
+
+def tenant_path(owner_id: int) -> Path:
+    return Path(settings.TENANT_DB_DIR) / f"owner_{int(owner_id)}.sqlite3"
+
+
+def owner_ids() -> List[int]:
+    """Vlastníci, kteří už mají svůj soubor v TENANT_DB_DIR (vzestupně)."""
+    root = Path(settings.TENANT_DB_DIR)
+    if not root.is_dir():
+        return []
+    ids = (path.stem[len("owner_"):] for path in root.glob("owner_*.sqlite3"))
+    return sorted(int(i) for i in ids if i.isdigit())
+
+
+def tenant_alias(owner_id) -> str:
+    """Alias spojení do souboru vlastníka; při prvním použití ho zaregistruje (nový soubor vytvoří)."""
+    alias = f"{ALIAS_PREFIX}{int(owner_id)}"
+    if alias not in connections.settings:
+        with _lock:
+            if alias not in connections.settings:
+                path = tenant_path(owner_id)
+                if not path.exists():
+                    _create_file(path, owner_id)
+                _add_alias(alias, _config(path))
+    return alias
+
+
+def _config(path: Path) -> dict:
+    base = connections.settings[DEFAULT_DB_ALIAS]
+    config = {**base, "ENGINE": SQLITE_ENGINE, "NAME": str(path), "TEST": {**base["TEST"], "NAME": None}}
+    if base["ENGINE"] != SQLITE_ENGINE:
+        # hlavní DB je server (Postgres) – z její konfigurace platí jen obecné volby
+        config.update(OPTIONS={}, USER="", PASSWORD="", HOST="", PORT="")
+    return config
+
+
+def _add_alias(alias: str, config: dict) -> None:
+    # nový slovník místo změny na místě – vlákna, která právě procházejí connections.all()
+    # (close_old_connections na konci požadavku), dál iterují ten původní
+    connections.settings = {**connections.settings, alias: config}
+
+
+def _remove_alias(alias: str) -> None:
+    """Zavře spojení (v tomto vlákně) a odregistruje alias."""
+    connections[alias].close()
+    del connections[alias]
+    connections.settings = {a: c for a, c in connections.settings.items() if a != alias}
+
+
+def _unlink(path: Path) -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def _owner_table(path: Path, owner_id: int) -> None:
+    """
+    Tabulka uživatelů v souboru vlastníka jen s jeho id. Cizí klíče owner tak mají
+    constraint i v jeho souboru (uživatelé jsou v hlavní DB) a data jiného vlastníka
+    do souboru zapsat nejde.
+    """
+    user_model = get_user_model()
+    table, pk = user_model._meta.db_table, user_model._meta.pk.column
+    with closing(sqlite3.connect(path)) as db, db:
+        db.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ("{pk}" integer NOT NULL PRIMARY KEY)')
+        db.execute(f'INSERT OR IGNORE INTO "{table}" ("{pk}") VALUES (?)', [int(owner_id)])
+
+
+def _create_file(path: Path, owner_id: int) -> None:
+    """
+    Nový soubor vlastníka: schéma se vytvoří v dočasném souboru a na místo se dostane
+    až hotový přes os.link, který selže, pokud soubor mezitím vytvořil jiný proces
+    (ten pak platí). Dva workery tak nikdy nemigrují stejný soubor a nikdo neotevře
+    napůl zmigrovaný.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex
+    tmp = path.with_name(f"{path.stem}.{token}.tmp")
+    _owner_table(tmp, owner_id)
+    alias = f"{ALIAS_PREFIX}new_{token}"
+    _add_alias(alias, _config(tmp))
+    # bez kontextu vlastníka – router by dotazy migrace poslal do ještě neexistujícího aliasu
+    context = _current.set(None)
+    try:
+        call_command("migrate", database=alias, interactive=False, verbosity=0, stdout=StringIO())
+    finally:
+        _current.reset(context)
+        _remove_alias(alias)
+    try:
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        _unlink(tmp)
+
+
+def drop_tenant(owner_id) -> None:
+    """Zavře spojení (v tomto vlákně), odregistruje alias a smaže soubor vlastníka."""
+    alias = f"{ALIAS_PREFIX}{int(owner_id)}"
+    with _lock:
+        if alias in connections.settings:
+            _remove_alias(alias)
+        _unlink(tenant_path(owner_id))
+
+
+def close_all() -> None:
+    """Zavře a odregistruje všechna spojení do souborů vlastníků (soubory nechá)."""
+    with _lock:
+        for alias in [a for a in connections.settings if a.startswith(ALIAS_PREFIX)]:
+            _remove_alias(alias)
+
+
+def db_for(owner=None) -> str:
+    """Alias DB s daty vlastníka (bez argumentu z kontextu); bez oddělení vždy "default"."""
+    owner_id = _owner_id(owner) if owner is not None else _current.get()
+    if not enabled() or owner_id is None:
+        return DEFAULT_DB_ALIAS
+    return tenant_alias(owner_id)
+
+
+def databases() -> List[str]:
+    """Všechny DB s daty vlastníků – pro commandy, které procházejí data všech."""
+    if not enabled():
+        return [DEFAULT_DB_ALIAS]
+    return [DEFAULT_DB_ALIAS] + [tenant_alias(i) for i in owner_ids()]
+
+
+def split_by_tenant(queryset) -> list:
+    """
+    Dotaz přes data všech vlastníků jako seznam dotazů – v režimu TENANT_DATABASES
+    jeden na soubor vlastníka (seřazené podle vlastníka), jinak beze změny.
+    Dotaz s explicitním .using() se nedělí.
+    """
+    if not enabled() or queryset._db is not None or not is_tenant_model(queryset.model):
+        return [queryset]
+    return [queryset.using(tenant_alias(i)) for i in owner_ids()]
+
+
+@contextmanager
+def use_tenant(owner):
+    """Dotazy na data vlastníka v bloku jdou do jeho DB; vrací její alias."""
+    token = _current.set(_owner_id(owner))
+    try:
+        yield db_for(owner)
+    finally:
+        _current.reset(token)
+
+
+def tenant_atomic(view):
+    """Jako @transaction.atomic, ale v DB přihlášeného vlastníka (bez oddělení = hlavní DB)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with transaction.atomic(using=db_for(request.user)):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class TenantRouter:
+    def _db(self, model, **hints):
+        if not enabled():
+            return None
+        if not is_tenant_model(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None:
+            if is_tenant_model(instance.__class__) and instance._state.db:
+                return instance._state.db
+            if instance._meta.label == settings.AUTH_USER_MODEL:
+                owner_id = instance.pk  # user.documents.all() apod.
+            else:
+                owner_id = getattr(instance, "owner_id", None)
+            if owner_id is not None:
+                return tenant_alias(owner_id)
+        return db_for()
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Document.owner / FinancialMetric.owner vedou do hlavní DB (v souboru vlastníka
+        # constraint drží jeho jednořádková tabulka uživatelů, viz _owner_table)
+        if enabled() and is_tenant_model(obj1.__class__) != is_tenant_model(obj2.__class__):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not db.startswith(ALIAS_PREFIX):
+            return None
+        if model_name is None:  # RunPython / RunSQL
+            return app_label == "ingestion"
+        return f"{app_label}.{model_name}" in TENANT_MODELS
+
+
+class TenantMiddleware:
+    """Po dobu požadavku směruje dotazy na data vlastníka do DB přihlášeného uživatele."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, "user", None)
+        if not enabled() or user is None or not user.is_authenticated:
+            return self.get_response(request)
+        with use_tenant(user):
+            return self.get_response(request)
@@ -0,0 +1,30 @@
+"""
+Testy a benchmarky s vlastní cache. CACHES je v provozu sdílená (soubory v CACHE_DIR
+nebo Redis) – cache.clear() v testech by ji smazal a klíče testovacích vlastníků
+(metrics-version:<id>, fragmenty) by se míchaly se skutečnými.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+ISOLATED_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "scb-isolated"},
+}
+
+
+def isolate_caches():
+    """Přepne CACHES na LocMemCache tohoto procesu; vrací funkci, která vrátí původní nastavení."""
+    override = override_settings(CACHES=ISOLATED_CACHES)
+    override.enable()
+    return override.disable
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test: testy nikdy nesahají na nakonfigurovanou cache."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._restore_caches = isolate_caches()
+
+    def teardown_test_environment(self, **kwargs):
+        self._restore_caches()
+        super().teardown_test_environment(**kwargs)
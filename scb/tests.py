@@ -0,0 +1,385 @@
+"""
+Rozpočty SQL dotazů pro všechny URL ze scb.urls.
+
+Každé URL (mimo Django admin) musí mít v QUERY_BUDGETS deklarovaný strop.
+Test ho pustí pro "malého" a "velkého" uživatele (víc let výkazů, odeslaných
+dotazníků…) a hlídá, že počet dotazů je v obou případech stejný (neroste
+s objemem dat = žádné N+1) a nepřekročí rozpočet. Nové URL bez rozpočtu test
+shodí.
+"""
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import tempfile
+import uuid
+from contextlib import closing
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, reset_queries, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from company.models import Company
+from dashboard.vendor import VENDOR_ASSETS, asset_url, cdn_url, check_vendored_assets, is_vendored
+from ingestion.models import Document, ExtractedTable, FinancialMetric
+from ingestion.synthetic import generate
+from suropen.models import OpenAnswer, OpenSubmission
+from survey.models import Question, Response, SurveySubmission
+
+from . import tenants
+from .database import SQLITE_WAL_PRAGMAS, database_profile
+from .testing import ISOLATED_CACHES
+
+# počty dotazů včetně načtení session a uživatele
+QUERY_BUDGETS = {
+    "home": 2,
+    "signup": 2,
+    "login": 2,
+    "logout": 4,
+    "ingestion:upload_pdf": 5,
+    "ingestion:documents": 3,
+    "ingestion:document_detail": 7,
+    "ingestion:table_detail": 5,
+    "ingestion:delete_document": 5,
+    "ingestion:delete_table": 5,
+    "dashboard:index": 5,
+    "dashboard:metrics": 4,
+    "dashboard:profitability": 4,
+    "dashboard:report": 4,
+    "dashboard:export_pdf": 3,
+    "dashboard:update_metric": 12,
+    "survey:questionnaire": 2,
+    "survey:summary": 3,
+    "survey:detail": 6,
+    "survey:analytics": 4,
+    "suropen:form": 2,
+    "suropen:history": 5,
+    "suropen:summary": 3,
+    "company:list": 3,
+    "company:identification": 2,
+    "company:create": 2,
+    "company:success": 2,
+    "hodnoty:list": 3,
+    "hodnoty:export_csv": 3,
+    "hodnoty:export_parquet": 4,
+}
+
+SIZES = {"small": {"years": 2, "submissions": 2}, "large": {"years": 6, "submissions": 12}}
+
+
+def _url_names(resolver=None, namespace=None):
+    """Jména všech URL (s namespace) mimo Django admin."""
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == "admin":
+                continue
+            ns = pattern.namespace
+            yield from _url_names(pattern, f"{namespace}:{ns}" if namespace and ns else (ns or namespace))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{namespace}:{pattern.name}" if namespace else pattern.name
+
+
+@override_settings(SUROPEN_SUMMARY_MODE="worker")
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        questions = Question.bank()
+        cls.fixtures = {}
+        for size, params in SIZES.items():
+            generate(1, params["years"], 2024 - params["years"], prefix=size, seed=1)
+            user = Document.objects.filter(owner__username=f"{size}_0001").first().owner
+            user.is_staff = user.is_superuser = True
+            user.save()
+
+            survey = None
+            for _ in range(params["submissions"]):
+                survey = SurveySubmission.objects.create(user=user)
+                Response.objects.bulk_create(
+                    [Response(user=user, submission=survey, question=q, score=5) for q in questions]
+                )
+            suropen = None
+            for _ in range(params["submissions"]):
+                suropen = OpenSubmission.objects.create(user=user, batch_id=uuid.uuid4(), ai_status="done")
+                OpenAnswer.objects.bulk_create([
+                    OpenAnswer(user=user, submission=suropen, section="ČAS", question=f"Otázka {i}", answer="…")
+                    for i in range(6)
+                ])
+
+            doc = Document.objects.filter(owner=user, doc_type="income").latest("year")
+            cls.fixtures[size] = {
+                "user": user,
+                "doc_id": doc.id,
+                "table_id": ExtractedTable.objects.filter(document=doc).first().id,
+                "metric_id": FinancialMetric.objects.filter(document=doc, code="01").first().id,
+                "survey_batch": survey.batch_id,
+                "suropen_batch": suropen.batch_id,
+            }
+        Company.objects.bulk_create([
+            Company(company_name=f"Firma {i}", respondent_name="R", respondent_email="r@example.com",
+                    company_size="micro", coach="coach1")
+            for i in range(40)
+        ])
+
+    def _request(self, name, fx):
+        kwargs = {
+            "ingestion:document_detail": {"doc_id": fx["doc_id"]},
+            "ingestion:delete_document": {"doc_id": fx["doc_id"]},
+            "ingestion:table_detail": {"table_id": fx["table_id"]},
+            "ingestion:delete_table": {"table_id": fx["table_id"]},
+            "dashboard:update_metric": {"metric_id": fx["metric_id"]},
+            "survey:detail": {"batch_id": fx["survey_batch"]},
+            "suropen:summary": {"batch_id": fx["suropen_batch"]},
+        }.get(name, {})
+        url = reverse(name, kwargs=kwargs)
+        if name == "dashboard:update_metric":
+            return self.client.post(url, {"value": "1234"})
+        if name == "logout":
+            return self.client.post(url)
+        return self.client.get(url)
+
+    def _count(self, name, size):
+        fx = self.fixtures[size]
+        self.client.force_login(fx["user"])
+        cache.clear()
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._request(name, fx)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 500, name)
+        return len(ctx.captured_queries)
+
+    def test_every_url_has_budget(self):
+        self.assertEqual(set(_url_names()) - QUERY_BUDGETS.keys(), set())
+
+    def test_query_counts_do_not_grow_with_data(self):
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(url=name):
+                counts = {size: self._count(name, size) for size in SIZES}
+                self.assertEqual(counts["small"], counts["large"], f"{name}: {counts}")
+                self.assertLessEqual(counts["large"], budget, f"{name}: {counts}")
+
+
+class IsolatedCacheTests(TestCase):
+    def test_tests_do_not_use_configured_cache(self):
+        self.assertEqual(caches["default"].__class__.__name__, "LocMemCache")
+        self.assertEqual(settings.CACHES, ISOLATED_CACHES)
+
+
+class StaticPipelineTests(TestCase):
+    """collectstatic (hash v názvu + .gz) a servírování přes scb.middleware.StaticFilesMiddleware."""
+
+    def setUp(self):
+        source, root = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        self.script = b"/* chart */\n" + b"window.Chart = function () { return 42; };\n" * 200
+        self.path = VENDOR_ASSETS["chart.js"]["path"]
+        os.makedirs(os.path.join(source.name, os.path.dirname(self.path)))
+        with open(os.path.join(source.name, self.path), "wb") as f:
+            f.write(self.script)
+
+        settings_override = override_settings(STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        is_vendored.cache_clear()
+        self.addCleanup(is_vendored.cache_clear)
+        call_command("collectstatic", interactive=False, verbosity=0, ignore_patterns=["admin"])
+        self.root = root.name
+
+    def test_vendored_asset_gets_hashed_compressed_name(self):
+        hashed = staticfiles_storage.stored_name(self.path)
+        self.assertNotEqual(hashed, self.path)
+        self.assertTrue(os.path.exists(os.path.join(self.root, hashed + ".gz")))
+        self.assertEqual(asset_url("chart.js"), "/static/" + hashed)
+        self.assertNotIn(cdn_url("chart.js"), asset_url("chart.js"))
+        self.assertEqual(check_vendored_assets(), [])
+
+    def test_deploy_check_warns_about_cdn_fallback(self):
+        with override_settings(STATICFILES_DIRS=[]):
+            is_vendored.cache_clear()
+            self.assertEqual([w.id for w in check_vendored_assets()], ["dashboard.W001"])
+
+    def test_serves_precompressed_with_far_future_cache(self):
+        response = self.client.get(asset_url("chart.js"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.script)
+
+    def test_unhashed_name_has_short_cache_and_no_encoding_without_accept(self):
+        response = self.client.get("/static/" + self.path)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertEqual(b"".join(response.streaming_content), self.script)
+
+    def test_path_outside_static_root_is_not_served(self):
+        self.assertEqual(self.client.get("/static/../manage.py").status_code, 404)
+
+
+class _WithTenantAliases(frozenset):
+    def __contains__(self, alias):
+        return alias.startswith(tenants.ALIAS_PREFIX) or super().__contains__(alias)
+
+
+class TenantDatabaseTests(TestCase):
+    """TENANT_DATABASES: data vlastníků v jejich SQLite souborech, uživatelé v hlavní DB."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # aliasy tenant_<id> vznikají až za běhu, TestCase by k nim spojení nepustil
+        cls.databases = _WithTenantAliases(cls.databases)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        settings_override = override_settings(TENANT_DATABASES=True, TENANT_DB_DIR=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(tenants.close_all)  # před úklidem TestCase (aliasy mimo DATABASES)
+
+        generate(2, 2, 2021, prefix="tenant", seed=1, batch_users=1)
+        self.first, self.second = User.objects.order_by("pk")
+
+    def test_owner_data_lives_in_own_file(self):
+        self.assertEqual(tenants.owner_ids(), [self.first.pk, self.second.pk])
+        self.assertEqual(Document.objects.using("default").count(), 0)
+        for user in (self.first, self.second):
+            self.assertEqual(Document.objects.using(tenants.tenant_alias(user.pk)).filter(owner=user).count(), 4)
+            with tenants.use_tenant(user):
+                self.assertEqual(set(Document.objects.values_list("owner_id", flat=True)), {user.pk})
+                self.assertEqual(user.documents.count(), 4)
+                doc = Document.objects.first()
+                self.assertEqual(doc.owner, user)  # FK do hlavní DB
+                self.assertTrue(doc.metrics.exists())
+
+        # constraint owner platí i v souboru vlastníka – cizí data do něj zapsat nejde
+        alias = tenants.tenant_alias(self.first.pk)
+        with transaction.atomic(using=alias):
+            Document.objects.using(alias).create(owner_id=self.first.pk, file="x.pdf", doc_type="income", year=2020)
+        with self.assertRaises(IntegrityError), transaction.atomic(using=alias):
+            Document.objects.using(alias).create(owner_id=self.second.pk, file="x.pdf", doc_type="income", year=2020)
+
+    def test_requests_use_logged_in_owner(self):
+        self.client.force_login(self.first)
+        response = self.client.get(reverse("dashboard:metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.context["revenue_years"]), [2021, 2022])
+
+        self.first.is_staff = True
+        self.first.save()
+        response = self.client.get(reverse("hodnoty:export_csv"), {"scope": "all"})
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([u for u in dict.fromkeys(r["owner"] for r in rows)], ["tenant_0001", "tenant_0002"])
+        self.assertEqual(len(rows), FinancialMetric.objects.using(tenants.tenant_alias(self.first.pk)).count() * 2)
+
+    def test_superuser_edits_metric_in_owners_database(self):
+        self.first.is_superuser = True
+        self.first.save()
+        self.client.force_login(self.first)
+        alias = tenants.tenant_alias(self.second.pk)
+        metric = FinancialMetric.objects.using(alias).filter(is_derived=False).exclude(code="").first()
+        url = reverse("dashboard:update_metric", args=[metric.pk])
+
+        response = self.client.post(url, {"value": "123", "owner": self.second.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FinancialMetric.objects.using(alias).get(pk=metric.pk).value, 123.0)
+        self.assertNotEqual(FinancialMetric.objects.using(tenants.tenant_alias(self.first.pk)).get(pk=metric.pk).value, 123.0)
+
+    def test_admin_lists_selected_owners_file(self):
+        admin_user = User.objects.create_superuser("admin", password="x")
+        self.client.force_login(admin_user)
+        for model in ("document", "extractedtable", "extractedrow", "financialmetric"):
+            with self.subTest(model=model):
+                url = reverse(f"admin:ingestion_{model}_changelist")
+                self.assertEqual(self.client.get(url).status_code, 200)
+                response = self.client.get(url, {"owner": self.second.pk})
+                self.assertEqual(response.status_code, 200)
+                owner_rows = response.context["cl"].model.objects.using(tenants.tenant_alias(self.second.pk))
+                self.assertEqual(response.context["cl"].result_count, owner_rows.count())
+
+        doc = Document.objects.using(tenants.tenant_alias(self.second.pk)).first()
+        url = reverse("admin:ingestion_document_change", args=[doc.pk])
+        response = self.client.get(url, {"_changelist_filters": f"owner={self.second.pk}"})
+        self.assertEqual(response.context["original"].owner_id, self.second.pk)
+
+    def test_migrate_fans_out_and_user_delete_drops_file(self):
+        out = io.StringIO()
+        call_command("migrate_tenants", "ingestion", skip_default=True, stdout=out)
+        self.assertIn("Zmigrováno 2 databází", out.getvalue())
+
+        path = tenants.tenant_path(self.second.pk)
+        self.assertTrue(path.exists())
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            User.objects.get(pk=self.second.pk).delete()
+            raise RuntimeError  # rollback – soubor zůstane
+        self.assertTrue(path.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertFalse(path.exists())
+        self.assertEqual(tenants.owner_ids(), [self.first.pk])
+
+
+    def test_new_file_is_published_whole_and_alias_added_without_mutation(self):
+        owner_id = self.second.pk + 1
+        registered = connections.settings
+        with tenants.use_tenant(owner_id) as alias:  # první použití v kontextu téhož vlastníka (požadavek)
+            pass
+        self.assertNotIn(alias, registered)  # nový slovník, ne změna toho, který jiné vlákno iteruje
+        self.assertTrue(tenants.tenant_path(owner_id).exists())
+        self.assertEqual(Document.objects.using(alias).count(), 0)
+
+        # soubor, který mezitím vytvořil jiný proces, se nepřepíše a dočasný soubor nezůstane
+        path = tenants.tenant_path(owner_id + 1)
+        with closing(sqlite3.connect(path)) as db:
+            db.execute("CREATE TABLE sentinel (id integer)")
+        tenants._create_file(path, owner_id + 1)
+        with closing(sqlite3.connect(path)) as db:
+            tables = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertEqual(tables, {"sentinel"})
+        self.assertEqual(sorted(p.name for p in Path(self.root).iterdir()),
+                         sorted(f"owner_{i}.sqlite3" for i in (self.first.pk, self.second.pk, owner_id, owner_id + 1)))
+
+
+class DatabaseProfileTests(TestCase):
+    def test_profiles(self):
+        self.assertEqual(database_profile("sqlite", Path("/srv"), env={})["NAME"], Path("/srv/db.sqlite3"))
+        self.assertNotIn("PRAGMAS", database_profile("sqlite", Path("/srv"), env={}))
+        wal = database_profile("sqlite-wal", Path("/srv"), env={"SQLITE_PATH": "/data/scb.sqlite3"})
+        self.assertEqual((wal["NAME"], wal["CONN_MAX_AGE"]), ("/data/scb.sqlite3", 600))
+        self.assertEqual(wal["PRAGMAS"]["journal_mode"], "WAL")
+        postgres = database_profile("postgres", Path("/srv"), env={"POSTGRES_HOST": "db"})
+        self.assertEqual((postgres["ENGINE"], postgres["HOST"]), ("django.db.backends.postgresql", "db"))
+        with self.assertRaises(ImproperlyConfigured):
+            database_profile("mysql", Path("/srv"), env={})
+
+    def test_pragmas_applied_on_new_connection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wal = database_profile("sqlite-wal", Path(tmp), env={})
+            conn = DatabaseWrapper({**connections.settings["default"], **wal, "TEST": {}}, alias="pragma_test")
+            try:
+                conn.ensure_connection()
+
+                def pragma(name):
+                    return conn.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+                self.assertEqual(pragma("journal_mode"), "wal")
+                self.assertEqual(pragma("busy_timeout"), SQLITE_WAL_PRAGMAS["busy_timeout"])
+                self.assertEqual(pragma("synchronous"), 1)  # NORMAL
+                self.assertEqual(pragma("cache_size"), SQLITE_WAL_PRAGMAS["cache_size"])
+            finally:
+                conn.close()
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from suropen.summaries import generate_summary, pending_submission_ids
+
+
+class Command(BaseCommand):
+    help = "Vygeneruje čekající AI shrnutí suropen (worker pro SUROPEN_SUMMARY_MODE='worker')."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Běžet trvale a čekající shrnutí průběžně zpracovávat.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Pauza mezi průchody v režimu --loop (s).")
+
+    def handle(self, *args, **options):
+        while True:
+            ids = pending_submission_ids()
+            for submission_id in ids:
+                generate_summary(submission_id)
+            if ids:
+                self.stdout.write(f"Zpracováno {len(ids)} shrnutí.")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Min
+
+
+def create_submissions(apps, schema_editor):
+    """Z každého batch_id udělá OpenSubmission (AI shrnutí jednou) a napojí na něj odpovědi."""
+    OpenAnswer = apps.get_model("suropen", "OpenAnswer")
+    OpenSubmission = apps.get_model("suropen", "OpenSubmission")
+
+    batches = OpenAnswer.objects.values("user_id", "batch_id").annotate(
+        created=Min("created_at")
+    )
+    for b in batches:
+        first = (
+            OpenAnswer.objects.filter(batch_id=b["batch_id"])
+            .exclude(ai_response__isnull=True)
+            .values_list("ai_response", flat=True)
+            .first()
+        )
+        submission = OpenSubmission.objects.create(
+            user_id=b["user_id"], batch_id=b["batch_id"], ai_response=first
+        )
+        # auto_now_add přepíše created_at – vrátíme původní čas odeslání
+        OpenSubmission.objects.filter(pk=submission.pk).update(created_at=b["created"])
+        OpenAnswer.objects.filter(batch_id=b["batch_id"]).update(submission=submission)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("suropen", "0002_opensubmission_openanswer_submission"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_submissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("suropen", "0003_backfill_opensubmission"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="openanswer",
+            name="suropen_ope_batch_i_61ae88_idx",
+        ),
+        migrations.RemoveField(
+            model_name="openanswer",
+            name="ai_response",
+        ),
+        migrations.RemoveField(
+            model_name="openanswer",
+            name="batch_id",
+        ),
+        migrations.AlterField(
+            model_name="openanswer",
+            name="submission",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="answers",
+                to="suropen.opensubmission",
+            ),
+        ),
+    ]
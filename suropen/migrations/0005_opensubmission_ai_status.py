@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+def mark_existing_done(apps, schema_editor):
+    # dosavadní shrnutí se generovala synchronně, jsou tedy hotová
+    OpenSubmission = apps.get_model("suropen", "OpenSubmission")
+    OpenSubmission.objects.update(ai_status="done")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("suropen", "0004_remove_openanswer_batch_id_ai_response"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="opensubmission",
+            name="ai_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Čeká na AI"),
+                    ("running", "AI generuje"),
+                    ("done", "Hotovo"),
+                    ("failed", "Chyba"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="opensubmission",
+            name="prompt_hash",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="opensubmission",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(mark_existing_done, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,41 @@ from django.db import models
 from django.contrib.auth.models import User
 import uuid
 
+
+class OpenSubmission(models.Model):
+    """
+    Jedno odeslání formuláře otevřených otázek.
+    AI shrnutí je uložené jen jednou (ne u každé odpovědi).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Čeká na AI"),
+        (STATUS_RUNNING, "AI generuje"),
+        (STATUS_DONE, "Hotovo"),
+        (STATUS_FAILED, "Chyba"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="open_submissions")
+    batch_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    ai_response = models.TextField(blank=True, null=True)  # během generování průběžně doplňováno
+    ai_status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    prompt_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)  # cache klíč (prompt + model)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} | {self.created_at:%d.%m.%Y %H:%M}"
+
+
 class OpenAnswer(models.Model):
     SECTION_CHOICES = [
         ("VÍCE ČASU", "VÍCE ČASU"),
@@ -10,17 +45,15 @@ class OpenAnswer(models.Model):
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    batch_id = models.UUIDField(default=uuid.uuid4, db_index=True)  # skupina odpovědí jednoho odeslání
+    submission = models.ForeignKey(OpenSubmission, on_delete=models.CASCADE, related_name="answers")
     section = models.CharField(max_length=32, choices=SECTION_CHOICES)
     question = models.TextField()
     answer = models.TextField()
-    ai_response = models.TextField(blank=True, null=True)  # stejné shrnutí uložíme ke každé odpovědi v batchi
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["user", "created_at"]),
-            models.Index(fields=["batch_id"]),
         ]
 
     def __str__(self):
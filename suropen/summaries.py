@@ -0,0 +1,214 @@
+"""
+AI shrnutí odeslaných otevřených odpovědí.
+
+Odpovědi se uloží hned, shrnutí generuje worker (vlákno po commitu, případně
+management command process_suropen_summaries) a průběžně ho zapisuje do
+OpenSubmission.ai_response, odkud si ho stránka dotahuje pollingem.
+Stejné (normalizované) odpovědi + model = stejný prompt_hash → převezme se
+hotové shrnutí bez dalšího volání OpenAI.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OpenSubmission
+
+logger = logging.getLogger(__name__)
+
+# jak často (s) se během streamování ukládá rozpracovaný text
+FLUSH_INTERVAL = 0.5
+
+# "running" déle než tohle = worker spadl, shrnutí se zpracuje znovu
+STALE_AFTER = timedelta(minutes=10)
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI()  # používá env OPENAI_API_KEY
+    return _client
+
+
+def normalize_answer(text: str) -> str:
+    """Sjednotí bílé znaky, aby drobné rozdíly ve formátování netrefily jiný prompt."""
+    return " ".join((text or "").split())
+
+
+def build_prompt(user_inputs):
+    """
+    user_inputs: list of dicts:
+      {"section": "...", "question": "...", "answer": "..."}
+    Vrátí messages pro OpenAI.
+    """
+    system = (
+        "Jsi byznysový kouč. Stručně, konkrétně a akčně shrň odpovědi zakladatele firmy, "
+        "identifikuj 3–5 hlavních zjištění a navrhni 5 krátkých, proveditelných doporučení. "
+        "Používej češtinu, buď věcný, bez floskulí."
+    )
+    # poskládáme kompaktní vstup
+    lines = []
+    for i, r in enumerate(user_inputs, 1):
+        lines.append(
+            f"{i}) [{r['section']}] {r['question']}\n→ Odpověď: {normalize_answer(r['answer'])}"
+        )
+    user_text = (
+        "Níže jsou moje otevřené odpovědi v kategoriích ČAS/PENÍZE/STRACH.\n\n" +
+        "\n\n".join(lines) +
+        "\n\nProsím: 1) krátké shrnutí, 2) klíčové překážky, 3) 5 konkrétních kroků na 14 dní."
+    )
+
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user_text},
+    ]
+
+
+def summary_model() -> str:
+    return getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
+
+
+def prompt_hash(messages, model: str) -> str:
+    payload = json.dumps({"model": model, "messages": messages}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _inputs_for(submission):
+    return [
+        {"section": a.section, "question": a.question, "answer": a.answer}
+        for a in submission.answers.order_by("id")
+    ]
+
+
+def _stream_openai(messages, model, on_text):
+    """Streamuje odpověď; on_text(dosavadní text) se volá nejvýš jednou za FLUSH_INTERVAL."""
+    stream = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0.2,
+        max_tokens=900,
+        stream=True,
+    )
+    parts = []
+    last_flush = time.monotonic()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                on_text("".join(parts))
+                last_flush = time.monotonic()
+    return "".join(parts).strip()
+
+
+def generate_summary(submission_id: int) -> None:
+    """Vygeneruje (nebo z cache převezme) AI shrnutí pro submission."""
+    claimed = OpenSubmission.objects.filter(
+        pk=submission_id, ai_status=OpenSubmission.STATUS_PENDING
+    ).update(ai_status=OpenSubmission.STATUS_RUNNING, updated_at=timezone.now())
+    if not claimed:
+        return  # už ho zpracovává / zpracoval jiný worker
+
+    current = OpenSubmission.objects.filter(pk=submission_id)
+    # po převzetí už každá chyba (prompt, cache, OpenAI) končí stavem failed – jinak by
+    # řádek zůstal "running" a stránka by čekala donekonečna
+    try:
+        submission = OpenSubmission.objects.get(pk=submission_id)
+        model = summary_model()
+        messages = build_prompt(_inputs_for(submission))
+        key = prompt_hash(messages, model)
+
+        cached = (
+            OpenSubmission.objects.filter(prompt_hash=key, ai_status=OpenSubmission.STATUS_DONE)
+            .values_list("ai_response", flat=True)
+            .first()
+        )
+        if cached is not None:
+            current.update(ai_response=cached, prompt_hash=key, ai_status=OpenSubmission.STATUS_DONE)
+            return
+
+        text = _stream_openai(
+            messages, model, lambda partial: current.update(ai_response=partial, updated_at=timezone.now())
+        )
+    except Exception as e:
+        logger.warning("AI shrnutí pro submission %s selhalo: %s", submission_id, e)
+        current.update(
+            ai_status=OpenSubmission.STATUS_FAILED,
+            ai_response=(
+                "⚠️ Nepodařilo se získat odpověď od AI. Zkontroluj nastavení OPENAI_API_KEY/OPENAI_MODEL.\n"
+                f"Detail: {type(e).__name__}: {e}"
+            ),
+        )
+        return
+    current.update(ai_response=text, prompt_hash=key, ai_status=OpenSubmission.STATUS_DONE)
+
+
+def _run_in_thread(submission_id: int) -> None:
+    def target():
+        try:
+            generate_summary(submission_id)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=target, name=f"suropen-summary-{submission_id}", daemon=True).start()
+
+
+def schedule_summary(submission) -> None:
+    """
+    Naplánuje generování shrnutí po commitu. SUROPEN_SUMMARY_MODE:
+      "thread" (výchozí) – vlákno v rámci procesu,
+      "sync" – hned v požadavku (testy, ladění),
+      "worker" – jen zůstane pending pro `manage.py process_suropen_summaries`.
+    """
+    mode = getattr(settings, "SUROPEN_SUMMARY_MODE", "thread")
+    if mode == "thread":
+        transaction.on_commit(lambda: _run_in_thread(submission.pk))
+    elif mode == "sync":
+        transaction.on_commit(lambda: generate_summary(submission.pk))
+
+
+def pending_submission_ids():
+    """Čekající shrnutí + ta, jejichž worker zřejmě spadl."""
+    stale = timezone.now() - STALE_AFTER
+    OpenSubmission.objects.filter(
+        ai_status=OpenSubmission.STATUS_RUNNING, updated_at__lt=stale
+    ).update(ai_status=OpenSubmission.STATUS_PENDING)
+    return list(
+        OpenSubmission.objects.filter(ai_status=OpenSubmission.STATUS_PENDING)
+        .order_by("created_at")
+        .values_list("pk", flat=True)
+    )
+
+
+def resume_if_stale(submission) -> bool:
+    """
+    Polling stavu: shrnutí, které je "pending"/"running" déle než STALE_AFTER (vlákno
+    zaniklo s restartem procesu), vrátí do fronty a v režimech thread/sync ho hned
+    spustí znovu; v režimu worker ho vezme command. Vrací, jestli se tak stalo.
+    """
+    active = (OpenSubmission.STATUS_PENDING, OpenSubmission.STATUS_RUNNING)
+    stale = timezone.now() - STALE_AFTER
+    if submission.ai_status not in active or submission.updated_at >= stale:
+        return False  # běžný polling bez dotazu navíc
+    requeued = OpenSubmission.objects.filter(
+        pk=submission.pk, ai_status__in=active, updated_at__lt=stale
+    ).update(ai_status=OpenSubmission.STATUS_PENDING, updated_at=timezone.now())
+    if not requeued:
+        return False  # mezitím ho převzal jiný požadavek / worker
+    mode = getattr(settings, "SUROPEN_SUMMARY_MODE", "thread")
+    if mode == "thread":
+        _run_in_thread(submission.pk)
+    elif mode == "sync":
+        generate_summary(submission.pk)
+    return True
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.fake_openai import patch_clients
+
+from .models import OpenAnswer, OpenSubmission
+from .summaries import STALE_AFTER, _stream_openai
+from .views import HISTORY_PAGE_SIZE, QUESTIONS
+
+
+class SuropenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("founder", password="x")
+        self.client.force_login(self.user)
+
+    def _seed(self, count):
+        for i in range(count):
+            submission = OpenSubmission.objects.create(user=self.user, ai_response=f"Shrnutí {i}")
+            OpenAnswer.objects.bulk_create([
+                OpenAnswer(user=self.user, submission=submission, section="VÍCE ČASU", question="Otázka", answer="Odpověď")
+                for _ in range(8)
+            ])
+
+    def _history_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("suropen:history"))
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), resp
+
+    def _post(self, data):
+        return self.client.post(reverse("suropen:form"), data)
+
+    @override_settings(SUROPEN_SUMMARY_MODE="sync")
+    def test_form_stores_summary_once_and_answers_in_bulk(self):
+        data = {"q-0-0": "Málo času na strategii", "q-2-1": "Rozjel bych export"}
+        with mock.patch("suropen.summaries._stream_openai", return_value="AI shrnutí"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._post(data)
+
+        submission = OpenSubmission.objects.get()
+        self.assertEqual(submission.ai_status, OpenSubmission.STATUS_DONE)
+        self.assertEqual(submission.ai_response, "AI shrnutí")
+        self.assertEqual(submission.answers.count(), sum(len(b["items"]) for b in QUESTIONS))
+
+        resp = self.client.get(reverse("suropen:summary", args=[submission.batch_id]))
+        self.assertEqual(resp.json(), {"status": "done", "done": True, "text": "AI shrnutí"})
+
+    @override_settings(SUROPEN_SUMMARY_MODE="sync")
+    def test_identical_normalised_answers_hit_cache(self):
+        with mock.patch("suropen.summaries._stream_openai", return_value="AI shrnutí") as stream:
+            with self.captureOnCommitCallbacks(execute=True):
+                self._post({"q-0-0": "Málo  času\n na strategii"})
+            with self.captureOnCommitCallbacks(execute=True):
+                self._post({"q-0-0": " Málo času na strategii "})
+
+        self.assertEqual(stream.call_count, 1)
+        hashes = set(OpenSubmission.objects.values_list("prompt_hash", flat=True))
+        self.assertEqual(len(hashes), 1)
+        self.assertEqual(
+            list(OpenSubmission.objects.values_list("ai_response", flat=True)), ["AI shrnutí", "AI shrnutí"]
+        )
+
+    @override_settings(SUROPEN_SUMMARY_MODE="worker")
+    def test_worker_mode_leaves_summary_for_command(self):
+        with mock.patch("suropen.summaries._stream_openai", side_effect=RuntimeError("timeout")) as stream:
+            self._post({"q-0-0": "Odpověď"})
+            submission = OpenSubmission.objects.get()
+            self.assertEqual(submission.ai_status, OpenSubmission.STATUS_PENDING)
+            self.assertFalse(self.client.get(reverse("suropen:summary", args=[submission.batch_id])).json()["done"])
+
+            with self.assertLogs("suropen.summaries", "WARNING"):
+                call_command("process_suropen_summaries", stdout=mock.MagicMock())
+
+        self.assertEqual(stream.call_count, 1)
+        submission.refresh_from_db()
+        self.assertEqual(submission.ai_status, OpenSubmission.STATUS_FAILED)
+        self.assertIn("RuntimeError", submission.ai_response)
+
+    @override_settings(SUROPEN_SUMMARY_MODE="sync")
+    def test_failure_before_openai_marks_submission_failed(self):
+        with mock.patch("suropen.summaries.build_prompt", side_effect=ValueError("bad prompt")), \
+                self.assertLogs("suropen.summaries", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._post({"q-0-0": "Odpověď"})
+
+        submission = OpenSubmission.objects.get()
+        self.assertEqual(submission.ai_status, OpenSubmission.STATUS_FAILED)
+        self.assertIn("ValueError", submission.ai_response)
+
+    @override_settings(SUROPEN_SUMMARY_MODE="sync")
+    def test_polling_resumes_stale_running_summary(self):
+        submission = OpenSubmission.objects.create(user=self.user, ai_status=OpenSubmission.STATUS_RUNNING)
+        url = reverse("suropen:summary", args=[submission.batch_id])
+        with mock.patch("suropen.summaries._stream_openai", return_value="AI shrnutí") as stream:
+            self.assertFalse(self.client.get(url).json()["done"])  # čerstvý běh se nechává být
+            OpenSubmission.objects.filter(pk=submission.pk).update(
+                updated_at=timezone.now() - STALE_AFTER - timedelta(minutes=1)
+            )
+            resp = self.client.get(url)
+
+        self.assertEqual(stream.call_count, 1)
+        self.assertEqual(resp.json(), {"status": "done", "done": True, "text": "AI shrnutí"})
+
+    def test_stream_reports_partial_text(self):
+        def chunk(text):
+            return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+        client = mock.Mock()
+        client.chat.completions.create.return_value = iter([chunk("Shrnutí"), chunk(": "), chunk("OK")])
+        seen = []
+        with mock.patch("suropen.summaries.get_client", return_value=client), \
+                mock.patch("suropen.summaries.FLUSH_INTERVAL", 0):
+            text = _stream_openai([], "gpt-4o-mini", seen.append)
+
+        self.assertEqual(text, "Shrnutí: OK")
+        self.assertEqual(seen, ["Shrnutí", "Shrnutí: ", "Shrnutí: OK"])
+        self.assertTrue(client.chat.completions.create.call_args.kwargs["stream"])
+
+    def test_history_query_count_is_constant(self):
+        self._seed(2)
+        small, _ = self._history_queries()
+        self._seed(HISTORY_PAGE_SIZE * 3)
+        large, resp = self._history_queries()
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(resp.context["batches"]), HISTORY_PAGE_SIZE)
+        self.assertEqual(resp.context["page_obj"].paginator.num_pages, 4)
+
+    def test_history_shows_only_own_submissions(self):
+        other = User.objects.create_user("other", password="x")
+        OpenSubmission.objects.create(user=other, ai_response="Cizí")
+        self._seed(1)
+        _, resp = self._history_queries()
+        self.assertEqual([b.ai_response for b in resp.context["batches"]], ["Shrnutí 0"])
+
+    def test_stream_through_fake_openai(self):
+        seen = []
+        with patch_clients(chunk_delay=0.001) as fake, mock.patch("suropen.summaries.FLUSH_INTERVAL", 0):
+            text = _stream_openai([{"role": "user", "content": "Shrň odpovědi"}], "gpt-4o-mini", seen.append)
+
+        self.assertTrue(text.startswith("Shrnutí"))
+        self.assertGreater(len(seen), 1)
+        self.assertEqual(seen[-1].strip(), text)
+        self.assertEqual(fake.statuses, {200: 1})
@@ -6,4 +6,5 @@ app_name = "suropen"
 urlpatterns = [
     path("", views.form, name="form"),          # /suropen/
     path("history/", views.history, name="history"),
+    path("summary/<uuid:batch_id>/", views.summary_status, name="summary"),
 ]
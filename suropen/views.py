@@ -1,12 +1,11 @@
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, redirect
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.db import transaction
-from .models import OpenAnswer
-
-# OpenAI client
-from openai import OpenAI
-client = OpenAI()  # používá env OPENAI_API_KEY
+from .models import OpenAnswer, OpenSubmission
+from .summaries import resume_if_stale, schedule_summary
 
 # 🔹 Otázky napevno (sekce → otázky)
 QUESTIONS = [
@@ -35,55 +34,8 @@ QUESTIONS = [
     },
 ]
 
-def _build_ai_prompt(user_inputs):
-    """
-    user_inputs: list of dicts:
-      {"section": "...", "question": "...", "answer": "..."}
-    Vrátí messages pro OpenAI.
-    """
-    system = (
-        "Jsi byznysový kouč. Stručně, konkrétně a akčně shrň odpovědi zakladatele firmy, "
-        "identifikuj 3–5 hlavních zjištění a navrhni 5 krátkých, proveditelných doporučení. "
-        "Používej češtinu, buď věcný, bez floskulí."
-    )
-    # poskládáme kompaktní vstup
-    lines = []
-    for i, r in enumerate(user_inputs, 1):
-        lines.append(
-            f"{i}) [{r['section']}] {r['question']}\n→ Odpověď: {r['answer']}"
-        )
-    user_text = (
-        "Níže jsou moje otevřené odpovědi v kategoriích ČAS/PENÍZE/STRACH.\n\n" +
-        "\n\n".join(lines) +
-        "\n\nProsím: 1) krátké shrnutí, 2) klíčové překážky, 3) 5 konkrétních kroků na 14 dní."
-    )
-
-    return [
-        {"role": "system", "content": system},
-        {"role": "user", "content": user_text},
-    ]
-
-def _ask_openai(messages, model=None):
-    model = model or getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.2,
-            max_tokens=900,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        # graceful fallback
-        return (
-            "⚠️ Nepodařilo se získat odpověď od AI. Zkontroluj nastavení OPENAI_API_KEY/OPENAI_MODEL.\n"
-            f"Detail: {type(e).__name__}: {e}"
-        )
-
 @login_required
 def form(request):
-    ai_text = None
-
     if request.method == "POST":
         # posbíráme vstupy
         collected = []
@@ -106,28 +58,27 @@ def form(request):
                 "error": "Vyplň prosím alespoň jednu odpověď.",
             })
 
-        # AI
-        messages = _build_ai_prompt(collected)
-        ai_text = _ask_openai(messages)
-
-        # Uložit do DB atomicky
-        from uuid import uuid4
-        batch_id = uuid4()
+        # Uložit do DB atomicky (odpovědi jedním INSERTem); AI shrnutí doplní worker po commitu
         with transaction.atomic():
-            for item in collected:
-                OpenAnswer.objects.create(
+            submission = OpenSubmission.objects.create(user=request.user)
+            OpenAnswer.objects.bulk_create([
+                OpenAnswer(
                     user=request.user,
-                    batch_id=batch_id,
+                    submission=submission,
                     section=item["section"],
                     question=item["question"],
                     answer=item["answer"],
-                    ai_response=ai_text,
                 )
+                for item in collected
+            ])
+            schedule_summary(submission)
 
-        # po POST zobrazíme form + AI výstup
+        # po POST zobrazíme form + AI výstup (stránka si ho dotahuje přes suropen:summary)
+        submission.refresh_from_db()
         return render(request, "suropen/form.html", {
             "questions": QUESTIONS,
-            "ai_text": ai_text,
+            "submission": submission,
+            "ai_text": submission.ai_response,
             "just_submitted": True,
         })
 
@@ -136,33 +87,33 @@ def form(request):
         "questions": QUESTIONS,
     })
 
+@login_required
+def summary_status(request, batch_id):
+    """Stav a (rozpracovaný) text AI shrnutí pro polling z formuláře."""
+    submission = get_object_or_404(OpenSubmission, user=request.user, batch_id=batch_id)
+    if resume_if_stale(submission):
+        submission.refresh_from_db()
+    return JsonResponse({
+        "status": submission.ai_status,
+        "done": submission.ai_status in (OpenSubmission.STATUS_DONE, OpenSubmission.STATUS_FAILED),
+        "text": submission.ai_response or "",
+    })
+
+HISTORY_PAGE_SIZE = 10
+
 @login_required
 def history(request):
     """
-    Jednoduchý přehled vlastních předchozích odeslání seskupený dle batch_id.
+    Přehled vlastních předchozích odeslání (stránkovaný, odpovědi přes prefetch –
+    konstantní počet dotazů bez ohledu na počet odeslání).
     Žádná data jiných uživatelů se nikdy nezobrazí.
     """
-    batches = (
-        OpenAnswer.objects
+    submissions = (
+        OpenSubmission.objects
         .filter(user=request.user)
         .order_by("-created_at")
-        .values("batch_id", "created_at")
-        .distinct()
+        .prefetch_related(Prefetch("answers", queryset=OpenAnswer.objects.order_by("id")))
     )
+    page = Paginator(submissions, HISTORY_PAGE_SIZE).get_page(request.GET.get("page"))
 
-    # načteme položky pro každý batch (jen svoje)
-    data = []
-    for b in batches:
-        items = list(
-            OpenAnswer.objects.filter(user=request.user, batch_id=b["batch_id"])
-            .order_by("created_at")
-            .values("section", "question", "answer", "ai_response")
-        )
-        data.append({
-            "batch_id": b["batch_id"],
-            "created_at": b["created_at"],
-            "items": items,
-            "ai_response": items[0]["ai_response"] if items else None,
-        })
-
-    return render(request, "suropen/history.html", {"batches": data})
+    return render(request, "suropen/history.html", {"page_obj": page, "batches": page.object_list})
@@ -1,25 +1,38 @@
 from django.contrib import admin
-from django.db.models import Avg, Max
-from .models import Response
+from django.db.models import Avg, Max, Min
+from .models import Question, Response
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_display = ("id", "version", "position", "category", "text")
+    list_filter = ("version", "category")
+    search_fields = ("text",)
 
 
 @admin.register(Response)
 class ResponseAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "question", "score", "created_at")
-    list_filter = ("user", "created_at")
-    search_fields = ("question", "user__username")
+    list_filter = ("user", "question__category", "created_at")
+    list_select_related = ("user", "question")
+    search_fields = ("question__text", "user__username")
 
     # Přidáme vlastní stránku s agregovanými výsledky
-    change_list_template = "admin/survey/response_changelist.html"
+    change_list_template = "survey/response_changelist.html"
 
     def changelist_view(self, request, extra_context=None):
-        # Souhrnné statistiky
+        # Souhrnné statistiky (vše agregované v SQL)
         qs = self.get_queryset(request)
         summary = qs.values("user__username").annotate(
             avg_score=Avg("score"),
             last_submit=Max("created_at")
         ).order_by("-last_submit")
+        category_summary = qs.values("question__category").annotate(
+            avg_score=Avg("score"),
+            first=Min("question__position")
+        ).order_by("first")
 
         extra_context = extra_context or {}
         extra_context["summary"] = summary
+        extra_context["category_summary"] = category_summary
         return super().changelist_view(request, extra_context=extra_context)
@@ -0,0 +1,134 @@
+"""
+Longitudinální analytika dotazníku – průměry kategorií v čase a změny oproti
+předchozímu odeslání (resp. měsíci). Agregace i rozdíly počítá SQL
+(GROUP BY + okenní funkce LAG), Python jen skládá výsledek do JSON struktury.
+Okno se přidává až druhým .annotate() – jinak by ho Django zařadilo do GROUP BY.
+Výsledky se cachují per uživatel; verze cache se zvedá při každém odeslání.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, F, Window
+from django.db.models.functions import Lag, Substr, TruncMonth
+
+from .models import Response
+from .questions import QUESTIONS
+
+CACHE_TIMEOUT = 60 * 60
+
+# pořadí kategorií podle banky otázek (CEO, LIDÉ, STRATEGIE, ...)
+CATEGORIES = list(dict.fromkeys(q["category"] for q in QUESTIONS))
+
+_ALL = "all"
+
+
+def _version_key(scope) -> str:
+    return f"survey-analytics-version:{scope}"
+
+
+def _version(scope) -> int:
+    # chybějící klíč začíná od času v ns (jako metrics_cache_version) – nepotká staré fragmenty
+    return cache.get_or_set(_version_key(scope), time.time_ns, timeout=None)
+
+
+def invalidate_analytics(user_id: int) -> None:
+    """Zneplatní cache analytiky uživatele i celkového přehledu (po novém odeslání)."""
+    for scope in (user_id, _ALL):
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), timeout=None)
+
+
+def _delta(value, prev):
+    return (value - prev) if (value is not None and prev is not None) else None
+
+
+def _ordered_categories(seen):
+    return CATEGORIES + sorted(c for c in seen if c not in CATEGORIES)
+
+
+def _user_trends(user_id: int) -> dict:
+    # id odeslání roste s časem, takže okna stačí řadit podle submission_id
+    # (bez joinu na submission a bez převodu UUID/datetime pro každý řádek)
+    by_category = (
+        Response.objects.filter(user_id=user_id)
+        .values("submission_id", "question__category")
+        .annotate(avg=Avg("score"))
+        .annotate(
+            prev=Window(Lag(Avg("score")), partition_by=[F("question__category")], order_by=F("submission_id").asc())
+        )
+        .order_by("submission_id")
+    )
+    overall = (
+        Response.objects.filter(user_id=user_id)
+        .values("submission_id", "submission__batch_id", "submission__created_at")
+        .annotate(avg=Avg("score"))
+        .annotate(prev=Window(Lag(Avg("score")), order_by=F("submission_id").asc()))
+        .order_by("submission_id")
+    )
+    submissions = {
+        o["submission_id"]: {
+            "batch_id": str(o["submission__batch_id"]),
+            "created_at": o["submission__created_at"].isoformat(),
+            "overall": o["avg"],
+            "overall_delta": _delta(o["avg"], o["prev"]),
+            "scores": {},
+            "deltas": {},
+        }
+        for o in overall
+    }
+    seen = set()
+    for r in by_category:
+        s = submissions[r["submission_id"]]
+        s["scores"][r["question__category"]] = r["avg"]
+        s["deltas"][r["question__category"]] = _delta(r["avg"], r["prev"])
+        seen.add(r["question__category"])
+
+    return {"categories": _ordered_categories(seen), "submissions": list(submissions.values())}
+
+
+def _month(field):
+    # TruncMonth je na SQLite pythonová funkce volaná pro každou odpověď (~7× pomalejší);
+    # datetime je tam uložený jako text "YYYY-MM-DD HH:MM:SS" v UTC, stačí prefix
+    if connection.vendor == "sqlite":
+        return Substr(field, 1, 7)
+    return TruncMonth(field)
+
+
+def _month_label(value) -> str:
+    return value if isinstance(value, str) else value.strftime("%Y-%m")
+
+
+def _global_trends() -> dict:
+    rows = (
+        Response.objects.annotate(month=_month("submission__created_at"))
+        .values("month", "question__category")
+        .annotate(avg=Avg("score"), submissions=Count("submission", distinct=True))
+        .annotate(
+            prev=Window(Lag(Avg("score")), partition_by=[F("question__category")], order_by=F("month").asc()),
+        )
+        .order_by("month")
+    )
+    months = {}
+    for r in rows:
+        m = months.setdefault(r["month"], {"month": _month_label(r["month"]), "scores": {}, "deltas": {}, "submissions": {}})
+        m["scores"][r["question__category"]] = r["avg"]
+        m["deltas"][r["question__category"]] = _delta(r["avg"], r["prev"])
+        m["submissions"][r["question__category"]] = r["submissions"]
+
+    seen = {c for m in months.values() for c in m["scores"]}
+    return {"categories": _ordered_categories(seen), "months": list(months.values())}
+
+
+def user_category_trends(user_id: int) -> dict:
+    """Průměry kategorií pro každé odeslání uživatele + změny vůči předchozímu odeslání."""
+    key = f"survey-analytics:{user_id}:{_version(user_id)}"
+    return cache.get_or_set(key, lambda: _user_trends(user_id), timeout=CACHE_TIMEOUT)
+
+
+def global_category_trends() -> dict:
+    """Průměry kategorií po měsících přes všechny firmy + změny vůči předchozímu měsíci."""
+    key = f"survey-analytics:{_ALL}:{_version(_ALL)}"
+    return cache.get_or_set(key, _global_trends, timeout=CACHE_TIMEOUT)
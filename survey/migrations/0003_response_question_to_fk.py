@@ -0,0 +1,72 @@
+import ast
+
+from django.db import migrations
+
+# banka otázek verze 1 v době migrace (zmrazená kopie – survey.questions se dál mění)
+QUESTIONS_V1 = [
+    ("CEO", "Mám dostatek času na strategická rozhodnutí a rozvoj firmy."),
+    ("CEO", "Práce v mojí firmě mě baví, naplňuje a inspiruje."),
+    ("CEO", "Firma mi poskytuje dostatečné zdroje."),
+    ("LIDÉ", "Leadership a osobní růst."),
+    ("LIDÉ", "Přitahování a získávání talentů."),
+    ("LIDÉ", "Management a firemní kultura."),
+    ("STRATEGIE", "Identita firmy, její poslání a hodnoty."),
+    ("STRATEGIE", "Vize a strategické odlišení."),
+    ("OBCHOD", "Znalost trhu a zákazníků."),
+    ("OBCHOD", "Prodejní a marketingové procesy."),
+    ("FINANCE", "Finanční řízení a plánování."),
+    ("FINANCE", "Zdroje financování."),
+    ("PROCESY", "Efektivita vnitřních procesů."),
+    ("PROCESY", "Digitalizace a technologie."),
+    ("VÝSLEDKY", "Růst a ziskovost."),
+    ("VÝSLEDKY", "Spokojenost zákazníků."),
+]
+
+
+def _question_text(raw: str) -> str:
+    # první verze questionnaire ukládala celý dict otázky jako repr()
+    if raw.startswith("{"):
+        try:
+            return ast.literal_eval(raw).get("question", raw)
+        except (ValueError, SyntaxError, AttributeError):
+            pass
+    return raw
+
+
+def link_questions(apps, schema_editor):
+    """Založí banku otázek verze 1 a napojí existující odpovědi podle textu otázky."""
+    Question = apps.get_model("survey", "Question")
+    Response = apps.get_model("survey", "Response")
+
+    by_text = {}
+    for i, (category, text) in enumerate(QUESTIONS_V1):
+        obj, _ = Question.objects.get_or_create(
+            version=1,
+            position=i,
+            defaults={"category": category, "text": text},
+        )
+        by_text[obj.text] = obj
+
+    # texty, které v aktuální bance nejsou, půjdou do "legacy" verze 0
+    legacy_position = 0
+    for raw in Response.objects.values_list("question", flat=True).distinct():
+        text = _question_text(raw)
+        question = by_text.get(text)
+        if question is None:
+            question = Question.objects.create(
+                version=0, position=legacy_position, category="", text=text
+            )
+            by_text[text] = question
+            legacy_position += 1
+        Response.objects.filter(question=raw).update(question_ref=question)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0002_question_response_question_ref"),
+    ]
+
+    operations = [
+        migrations.RunPython(link_questions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0003_response_question_to_fk"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="response",
+            name="question",
+        ),
+        migrations.RenameField(
+            model_name="response",
+            old_name="question_ref",
+            new_name="question",
+        ),
+        migrations.AlterField(
+            model_name="response",
+            name="question",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="responses",
+                to="survey.question",
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="response",
+            options={"ordering": ["id"]},
+        ),
+    ]
@@ -2,6 +2,43 @@ from django.db import models
 from django.contrib.auth.models import User
 import uuid
 
+from .questions import QUESTION_BANK_VERSION, QUESTIONS
+
+
+class Question(models.Model):
+    """
+    Otázka z verzované banky otázek (survey.questions).
+    Odpovědi na ni odkazují přes FK, takže text otázky je uložený jen jednou.
+    """
+    version = models.PositiveSmallIntegerField(default=QUESTION_BANK_VERSION)
+    position = models.PositiveSmallIntegerField()  # index v QUESTIONS (= název pole q{position})
+    category = models.CharField(max_length=32, db_index=True)
+    text = models.TextField()
+
+    class Meta:
+        ordering = ["version", "position"]
+        constraints = [
+            models.UniqueConstraint(fields=["version", "position"], name="survey_question_version_position"),
+        ]
+
+    def __str__(self):
+        return self.text
+
+    @classmethod
+    def bank(cls):
+        """Otázky aktuální verze v pořadí QUESTIONS; chybějící (nová verze) se založí."""
+        questions = list(cls.objects.filter(version=QUESTION_BANK_VERSION).order_by("position"))
+        if len(questions) < len(QUESTIONS):
+            cls.objects.bulk_create(
+                [
+                    cls(version=QUESTION_BANK_VERSION, position=i, category=q["category"], text=q["question"])
+                    for i, q in enumerate(QUESTIONS)
+                ],
+                ignore_conflicts=True,
+            )
+            questions = list(cls.objects.filter(version=QUESTION_BANK_VERSION).order_by("position"))
+        return questions
+
 
 class SurveySubmission(models.Model):
     """
@@ -29,12 +66,12 @@ class Response(models.Model):
         on_delete=models.CASCADE,
         related_name="responses"
     )
-    question = models.TextField()
+    question = models.ForeignKey(Question, on_delete=models.PROTECT, related_name="responses")
     score = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ["created_at"]
+        ordering = ["id"]  # bulk_create ukládá v pořadí otázek
 
     def __str__(self):
-        return f"{self.user.username} – {self.question[:50]}... → {self.score}"
+        return f"{self.user.username} – {self.question.text[:50]}... → {self.score}"
@@ -1,3 +1,100 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from .models import Question, Response, SurveySubmission
+from .questions import QUESTIONS
+
+
+class QuestionnaireTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("respondent", password="x")
+        self.client.force_login(self.user)
+
+    def _submit(self, scores):
+        return self.client.post(reverse("survey:questionnaire"), {f"q{i}": s for i, s in enumerate(scores)})
+
+    def test_submission_links_responses_to_question_bank(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._submit([5] * len(QUESTIONS))
+        self.assertEqual(resp.status_code, 302)
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "survey_response"')]
+        self.assertEqual(len(inserts), 1)
+        submission = SurveySubmission.objects.get()
+        self.assertEqual(submission.responses.count(), len(QUESTIONS))
+        self.assertEqual(Question.objects.count(), len(QUESTIONS))
+        self.assertEqual(
+            [r.question.text for r in submission.responses.select_related("question")],
+            [q["question"] for q in QUESTIONS],
+        )
+
+    def test_detail_category_averages(self):
+        scores = [(10 if q["category"] == "CEO" else 2) for q in QUESTIONS]
+        self._submit(scores)
+        submission = SurveySubmission.objects.get()
+
+        resp = self.client.get(reverse("survey:detail", args=[submission.batch_id]))
+        categories = {c["question__category"]: c["avg"] for c in resp.context["category_scores"]}
+        self.assertEqual(categories["CEO"], 10)
+        self.assertEqual(categories["FINANCE"], 2)
+        self.assertEqual(list(categories)[0], "CEO")
+        self.assertAlmostEqual(resp.context["avg_score"], sum(scores) / len(scores))
+
+    def test_summary_and_admin_aggregations(self):
+        self._submit([4] * len(QUESTIONS))
+        resp = self.client.get(reverse("survey:summary"))
+        self.assertEqual(resp.context["submissions"][0].avg_score, 4)
+
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resp = self.client.get(reverse("admin:survey_response_changelist"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context["category_summary"]), len({q["category"] for q in QUESTIONS}))
+        self.assertEqual(Response.objects.count(), len(QUESTIONS))
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("respondent", password="x")
+        self.client.force_login(self.user)
+
+    def _submit(self, ceo, rest):
+        scores = {f"q{i}": (ceo if q["category"] == "CEO" else rest) for i, q in enumerate(QUESTIONS)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("survey:questionnaire"), scores)
+
+    def test_category_deltas_between_submissions(self):
+        self._submit(ceo=4, rest=5)
+        self._submit(ceo=7, rest=5)
+
+        data = self.client.get(reverse("survey:analytics")).json()
+        self.assertEqual(data["categories"][0], "CEO")
+        first, second = data["submissions"]
+        self.assertEqual(first["scores"]["CEO"], 4)
+        self.assertIsNone(first["deltas"]["CEO"])
+        self.assertEqual(second["scores"]["CEO"], 7)
+        self.assertEqual(second["deltas"]["CEO"], 3)
+        self.assertEqual(second["deltas"]["FINANCE"], 0)
+        self.assertGreater(second["overall_delta"], 0)
+
+    def test_cached_until_next_submission(self):
+        self._submit(ceo=4, rest=5)
+        self.client.get(reverse("survey:analytics"))
+        with self.assertNumQueries(2):  # session + user, agregace z cache
+            self.client.get(reverse("survey:analytics"))
+
+        self._submit(ceo=6, rest=5)
+        data = self.client.get(reverse("survey:analytics")).json()
+        self.assertEqual(len(data["submissions"]), 2)
+
+    def test_global_scope_is_staff_only(self):
+        self._submit(ceo=4, rest=5)
+        self.assertEqual(self.client.get(reverse("survey:analytics"), {"scope": "all"}).status_code, 403)
+
+        self.client.force_login(User.objects.create_user("staff", password="x", is_staff=True))
+        data = self.client.get(reverse("survey:analytics"), {"scope": "all"}).json()
+        month = data["months"][0]
+        self.assertEqual(month["scores"]["CEO"], 4)
+        self.assertEqual(month["submissions"]["CEO"], 1)
@@ -7,5 +7,6 @@ urlpatterns = [
     path("", views.questionnaire, name="questionnaire"),
     path("summary/", views.survey_summary, name="summary"),  # 🔹 nový view
     path("detail/<uuid:batch_id>/", views.survey_detail, name="detail"),
+    path("analytics/", views.survey_analytics, name="analytics"),
 ]
 